@@ -0,0 +1,70 @@
+"""Benchmark directory listings of the file contents managers.
+
+Usage::
+
+    python benchmarks/contents_listing.py [--sizes 1000 10000 100000] [--repeat 3]
+
+For every size, a temporary directory is filled with that many empty files and
+listed with ``get(path)`` by both the sync and the async file contents manager.
+The best wall time over ``--repeat`` runs is reported.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from jupyter_server.services.contents.filemanager import (
+    AsyncFileContentsManager,
+    FileContentsManager,
+)
+
+
+def populate(root, count):
+    """Create ``count`` empty files in ``root/listing``, mixing notebooks and text files."""
+    os_dir = os.path.join(root, "listing")
+    os.mkdir(os_dir)
+    for i in range(count):
+        ext = ".ipynb" if i % 4 == 0 else ".txt"
+        with open(os.path.join(os_dir, f"file{i}{ext}"), "w"):
+            pass
+    return "listing"
+
+
+def best_of(repeat, cm, path, loop):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        model = cm.get(path)
+        if isinstance(cm, AsyncFileContentsManager):
+            model = loop.run_until_complete(model)
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(model["content"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'entries':>8} {'manager':>26} {'best (s)':>10} {'entries/s':>12}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as root:
+            path = populate(root, size)
+            loop = asyncio.new_event_loop()
+            try:
+                for cm_class in [FileContentsManager, AsyncFileContentsManager]:
+                    cm = cm_class(root_dir=root)
+                    elapsed, listed = best_of(args.repeat, cm, path, loop)
+                    assert listed == size, (listed, size)
+                    print(
+                        f"{size:>8} {cm_class.__name__:>26} {elapsed:>10.3f} {size / elapsed:>12.0f}"
+                    )
+            finally:
+                loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Benchmark the hidden file checks of the file contents manager.
+
+Usage::
+
+    python benchmarks/hidden_checks.py [--depths 1 5 20] [--files 1000] [--repeat 3]
+
+For every depth, ``--files`` empty files are created in a directory nested that
+deep in a temporary root, and each of them is checked with jupyter_core's
+``is_hidden`` and with ``FileContentsManager._is_hidden``, which caches the
+checks of their ancestors. The number of ``stat`` system calls and the best wall
+time over ``--repeat`` runs are reported.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from unittest import mock
+
+from jupyter_core.paths import is_hidden
+
+from jupyter_server.services.contents.filemanager import FileContentsManager
+
+
+def populate(root, depth, count):
+    """Create ``count`` empty files in a directory ``depth`` levels below ``root``."""
+    os_dir = os.path.join(root, *(f"level{i}" for i in range(depth)))
+    os.makedirs(os_dir, exist_ok=True)
+    paths = []
+    for i in range(count):
+        os_path = os.path.join(os_dir, f"file{i}.txt")
+        with open(os_path, "w"):
+            pass
+        paths.append(os_path)
+    return paths
+
+
+def best_of(repeat, check, paths):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for os_path in paths:
+            check(os_path)
+        timings.append(time.perf_counter() - start)
+    with mock.patch("os.stat", wraps=os.stat) as stat:
+        for os_path in paths:
+            check(os_path)
+    return min(timings), stat.call_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--depths", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--files", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'depth':>6} {'check':>12} {'best (s)':>10} {'stat calls':>11}")
+    for depth in args.depths:
+        with tempfile.TemporaryDirectory() as root:
+            paths = populate(root, depth, args.files)
+            cm = FileContentsManager(root_dir=root)
+
+            def cached(os_path, cm=cm):
+                return cm._is_hidden(os_path)
+
+            def uncached(os_path, root=root):
+                return is_hidden(os_path, root)
+
+            for name, check in [("is_hidden", uncached), ("_is_hidden", cached)]:
+                cm._hidden_dirs.clear()
+                elapsed, calls = best_of(args.repeat, check, paths)
+                print(f"{depth:>6} {name:>12} {elapsed:>10.3f} {calls:>11}")
+
+
+if __name__ == "__main__":
+    main()
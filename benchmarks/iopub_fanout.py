@@ -0,0 +1,105 @@
+"""Benchmark the delivery of IOPub messages to the clients of a kernel.
+
+Usage::
+
+    python benchmarks/iopub_fanout.py [--clients 1 2 5 10] [--messages 20000] [--size 100]
+
+For every number of clients, ``--messages`` stream messages with ``--size``
+bytes of text are published on a ZMQ PUB socket, standing for the IOPub channel
+of a kernel, and received by the clients and the activity tracker, either with
+one SUB socket each, or with one ``IOPubMultiplexer`` subscription shared by
+all of them. Every client parses the header of the messages, as the websocket
+connections do. The time until all the messages reached all the clients, and
+the throughput in messages per second, are reported.
+"""
+
+import argparse
+import asyncio
+import time
+
+import zmq
+from jupyter_client.session import Session
+from zmq.eventloop.zmqstream import ZMQStream
+
+from jupyter_server.services.kernels.iopub import IOPubMultiplexer
+
+
+class Client:
+    def __init__(self, session, total):
+        self.session = session
+        self.total = total
+        self.count = 0
+        self.done = asyncio.get_running_loop().create_future()
+
+    def on_recv(self, msg_list):
+        _, fed_msg_list = self.session.feed_identities(msg_list)
+        self.session.deserialize(fed_msg_list, content=False)
+        self.count += 1
+        if self.count == self.total and not self.done.done():
+            self.done.set_result(None)
+
+
+async def run(shared, clients, messages, size):
+    context = zmq.Context.instance()
+    session = Session()
+    pub = context.socket(zmq.PUB)
+    pub.setsockopt(zmq.SNDHWM, 0)
+    port = pub.bind_to_random_port("tcp://127.0.0.1")
+
+    def connect():
+        sub = context.socket(zmq.SUB)
+        sub.setsockopt(zmq.RCVHWM, 0)
+        sub.setsockopt(zmq.SUBSCRIBE, b"")
+        sub.connect(f"tcp://127.0.0.1:{port}")
+        return ZMQStream(sub)
+
+    # the clients and the activity tracker
+    receivers = [Client(session, 0) for _ in range(clients + 1)]
+    multiplexer = IOPubMultiplexer(connect)
+    streams = [multiplexer.channel() if shared else connect() for _ in receivers]
+    for receiver, stream in zip(receivers, streams, strict=True):
+        stream.on_recv(receiver.on_recv)
+
+    # wait for the subscriptions
+    while not all(receiver.count for receiver in receivers):
+        session.send(pub, "status", {"execution_state": "idle"})
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.1)
+    for receiver in receivers:
+        receiver.count = 0
+        receiver.total = messages
+
+    text = "x" * size
+    start = time.perf_counter()
+    for i in range(messages):
+        session.send(pub, "stream", {"name": "stdout", "text": text})
+        if i % 1000 == 0:
+            await asyncio.sleep(0)
+    await asyncio.gather(*(receiver.done for receiver in receivers))
+    elapsed = time.perf_counter() - start
+
+    multiplexer.close()
+    for stream in streams:
+        stream.close()
+    pub.close(linger=0)
+    return elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=100)
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'subscriptions':>14} {'time (s)':>10} {'msgs/s':>10}")
+    for clients in args.clients:
+        for shared in (False, True):
+            elapsed = await run(shared, clients, args.messages, args.size)
+            name = "shared" if shared else "per client"
+            rate = args.messages / elapsed
+            print(f"{clients:>8} {name:>14} {elapsed:>10.3f} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
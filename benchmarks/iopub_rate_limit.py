@@ -0,0 +1,58 @@
+"""Benchmark the IOPub rate limiter under output storms.
+
+Usage::
+
+    python benchmarks/iopub_rate_limit.py [--messages 100000 300000 1000000] [--rate 100000]
+
+For every number of messages, a storm of stream messages arriving at ``--rate``
+messages per second is counted by ``RateLimiter``, with no limit so that the
+whole window of 3 seconds is kept, and by the list the connections used before,
+from the head of which the messages leaving the window were deleted. The wall
+time, and the throughput in messages per second, are reported.
+"""
+
+import argparse
+import time
+
+from jupyter_server.services.kernels.ratelimit import RateLimiter
+
+
+class ListWindow:
+    """The sliding window kept in a list, as the connections did."""
+
+    def __init__(self, window):
+        self.window = window
+        self.queue = []
+        self.byte_count = 0
+
+    def consume(self, byte_count, now):
+        while self.queue and now >= self.queue[0][0]:
+            self.byte_count -= self.queue[0][1]
+            del self.queue[0]
+        self.byte_count += byte_count
+        self.queue.append((now + self.window, byte_count))
+        return True
+
+
+def run(limiter, messages, rate):
+    start = time.perf_counter()
+    for i in range(messages):
+        limiter.consume(100, i / rate)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, nargs="+", default=[100000, 300000, 1000000])
+    parser.add_argument("--rate", type=float, default=100000)
+    args = parser.parse_args()
+
+    print(f"{'messages':>10} {'window':>12} {'time (s)':>10} {'msgs/s':>10}")
+    for messages in args.messages:
+        for name, limiter in (("list", ListWindow(3)), ("RateLimiter", RateLimiter(window=3))):
+            elapsed = run(limiter, messages, args.rate)
+            print(f"{messages:>10} {name:>12} {elapsed:>10.3f} {messages / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the JSON backends of jupyter_server.jsonutil on notebooks.
+
+Usage::
+
+    python benchmarks/json_backends.py [notebook.ipynb ...] [--size-mb 50] [--repeat 3]
+
+Without notebook paths, a notebook of about ``--size-mb`` megabytes of embedded
+PNG outputs is generated. For every installed backend, the best wall time over
+``--repeat`` runs is reported for reading the notebook (``nbformat.reads``
+without validation, decoding with the backend) and for serializing its
+contents model, as ``GET /api/contents`` does.
+"""
+
+import argparse
+import base64
+import importlib.util
+import os
+import time
+
+import nbformat
+from nbformat.v4 import new_code_cell, new_notebook, new_output
+
+from jupyter_server import _tz as tz
+from jupyter_server import jsonutil
+
+
+def generate_notebook(size_mb):
+    """Generate a notebook with about size_mb megabytes of image outputs."""
+    cells = []
+    image = base64.b64encode(os.urandom(256 * 1024)).decode("ascii")
+    for i in range(max(1, int(size_mb * 1024 * 1024 / len(image)))):
+        output = new_output(
+            "display_data", data={"image/png": image, "text/plain": f"<Figure {i}>"}
+        )
+        cells.append(new_code_cell(f"plot({i})", outputs=[output], execution_count=i))
+    return nbformat.writes(new_notebook(cells=cells))
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def read(text):
+    # validation is skipped, since it does not depend on the backend
+    return nbformat.reader.reads(text, cls=jsonutil.JSONDecoder)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("notebooks", nargs="*")
+    parser.add_argument("--size-mb", type=float, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.notebooks:
+        documents = []
+        for path in args.notebooks:
+            with open(path, encoding="utf-8") as f:
+                documents.append((os.path.basename(path), f.read()))
+    else:
+        documents = [(f"generated ({args.size_mb:g} MB)", generate_notebook(args.size_mb))]
+
+    backends = [
+        name for name in jsonutil.JSON_BACKENDS if importlib.util.find_spec(name) is not None
+    ]
+    print(f"{'notebook':>24} {'backend':>8} {'MB':>7} {'read (s)':>9} {'dumps (s)':>10}")
+    try:
+        for name, text in documents:
+            for backend in backends:
+                jsonutil.set_json_backend(backend)
+                model = {
+                    "name": name,
+                    "last_modified": tz.utcnow(),
+                    "content": read(text),
+                    "format": "json",
+                }
+                read_time = best_of(args.repeat, read, text)
+                dumps_time = best_of(args.repeat, jsonutil.dumps, model)
+                size = len(text.encode("utf-8")) / 1024 / 1024
+                print(f"{name:>24} {backend:>8} {size:>7.1f} {read_time:>9.3f} {dumps_time:>10.3f}")
+    finally:
+        jsonutil.set_json_backend("json")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the serialization of kernel messages for the legacy websocket protocol.
+
+Usage::
+
+    python benchmarks/legacy_websocket.py [--messages 2000] [--repeat 3]
+
+Messages of several kinds and sizes are serialized by a kernel session, and then
+for the websocket, either by deserializing them and serializing the result with
+``jsonutil.dumps`` or ``serialize_binary_message``, as the legacy protocol did,
+or by unpacking their header only and splicing their packed parts with
+``splice_legacy_message``. The best wall time over ``--repeat`` runs, and the
+throughput in messages per second, are reported.
+"""
+
+import argparse
+import os
+import time
+
+from jupyter_client.session import Session
+
+from jupyter_server import jsonutil
+from jupyter_server.services.kernels.connection.base import (
+    serialize_binary_message,
+    splice_legacy_message,
+)
+
+
+def make_messages(session):
+    """The name and the packed parts of a few kinds of IOPub messages."""
+    parent = session.msg("execute_request", {"code": "plot()"})
+    image = os.urandom(512 * 1024).hex()
+    messages = {
+        "stream (100 B)": (session.msg("stream", {"name": "stdout", "text": "x" * 100}), []),
+        "display_data (1 MB)": (
+            session.msg("display_data", {"data": {"image/png": image}, "metadata": {}}),
+            [],
+        ),
+        "comm_msg + buffers (1 MB)": (
+            session.msg("comm_msg", {"comm_id": "c", "data": {"method": "update"}}),
+            [os.urandom(512 * 1024), os.urandom(512 * 1024)],
+        ),
+    }
+    parts = {}
+    for name, (msg, buffers) in messages.items():
+        msg["parent_header"] = parent["header"]
+        _, fed_msg_list = session.feed_identities(session.serialize(msg))
+        parts[name] = fed_msg_list + buffers
+    return parts
+
+
+def deserialize(session, msg_list):
+    msg = session.deserialize(msg_list)
+    msg["channel"] = "iopub"
+    if msg["buffers"]:
+        return serialize_binary_message(msg)
+    return jsonutil.dumps(msg)
+
+
+def splice(session, msg_list):
+    header = session.unpack(msg_list[1])
+    return splice_legacy_message(header, msg_list[1:], "iopub")
+
+
+def best_of(repeat, func, session, msg_list, messages):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(messages):
+            func(session, msg_list)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # unsigned, to measure the serialization only
+    session = Session(key=b"")
+    print(f"{'message':>26} {'path':>12} {'time (s)':>10} {'msgs/s':>10}")
+    for name, msg_list in make_messages(session).items():
+        for path, func in (("deserialize", deserialize), ("splice", splice)):
+            elapsed = best_of(args.repeat, func, session, msg_list, args.messages)
+            rate = args.messages / elapsed
+            print(f"{name:>26} {path:>12} {elapsed:>10.3f} {rate:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
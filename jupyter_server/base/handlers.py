@@ -26,7 +26,7 @@ from tornado.log import app_log
 from traitlets.config import Application
 
 import jupyter_server
-from jupyter_server import CallContext
+from jupyter_server import CallContext, jsonutil
 from jupyter_server._sysinfo import get_sys_info
 from jupyter_server._tz import utcnow
 from jupyter_server.auth.decorator import allow_unauthenticated, authorized
@@ -702,7 +702,7 @@ class JupyterHandler(AuthenticatedHandler):
         # Do we need to call body.decode('utf-8') here?
         body = self.request.body.strip().decode("utf-8")
         try:
-            model = json.loads(body)
+            model = jsonutil.loads(body)
         except Exception as e:
             self.log.debug("Bad JSON: %r", body)
             self.log.error("Couldn't parse JSON", exc_info=True)
@@ -777,7 +777,7 @@ class APIHandler(JupyterHandler):
                 # but always empty
                 reply["traceback"] = ""
         self.log.warning("wrote error: %r", reply["message"])
-        self.finish(json.dumps(reply))
+        self.finish(jsonutil.dumps(reply))
 
     def get_login_url(self) -> str:
         """Get the login url."""
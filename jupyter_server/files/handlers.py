@@ -4,7 +4,9 @@
 # Distributed under the terms of the Modified BSD License.
 from __future__ import annotations
 
+import codecs
 import mimetypes
+import os
 from base64 import decodebytes
 from typing import TYPE_CHECKING
 
@@ -13,12 +15,53 @@ from tornado import web
 
 from jupyter_server.auth.decorator import authorized
 from jupyter_server.base.handlers import JupyterHandler
+from jupyter_server.services.contents.fileio import FileManagerMixin
+from jupyter_server.services.contents.modelcache import is_racy
 
 if TYPE_CHECKING:
     from collections.abc import Awaitable
 
 AUTH_RESOURCE = "contents"
 
+# Number of leading bytes inspected to guess whether a streamed file is text.
+_SNIFF_SIZE = 8192
+
+
+def _guess_content_type(name, binary):
+    """Guess the Content-Type of a file served under ``/files/``.
+
+    ``binary`` tells whether the file content could not be decoded as UTF-8,
+    and is only used when the type cannot be guessed from the file name.
+    """
+    if name.lower().endswith(".ipynb"):
+        return "application/x-ipynb+json"
+    cur_mime, encoding = mimetypes.guess_type(name)
+    if cur_mime == "text/plain":
+        return "text/plain; charset=UTF-8"
+    # RFC 6713
+    if encoding == "gzip":
+        return "application/gzip"
+    elif encoding is not None:
+        return "application/octet-stream"
+    elif cur_mime is not None:
+        return cur_mime
+    elif binary:
+        return "application/octet-stream"
+    else:
+        return "text/plain; charset=UTF-8"
+
+
+def _is_binary_file(os_path):
+    """Whether the head of the file at os_path does not decode as UTF-8."""
+    with open(os_path, "rb") as f:
+        head = f.read(_SNIFF_SIZE)
+    try:
+        # final=False tolerates a multi-byte character cut at the sniff boundary
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return True
+    return False
+
 
 class FilesHandler(JupyterHandler, web.StaticFileHandler):
     """serve files via ContentsManager
@@ -27,6 +70,10 @@ class FilesHandler(JupyterHandler, web.StaticFileHandler):
 
     FileContentsManager subclasses use AuthenticatedFilesHandler by default,
     a subclass of StaticFileHandler.
+
+    When the ContentsManager is file-backed, files are streamed from disk in
+    chunks, with support for ``Range``, ``ETag`` and ``If-None-Match``.
+    Other ContentsManagers fall back to reading the whole file model.
     """
 
     auth_resource = AUTH_RESOURCE
@@ -64,29 +111,17 @@ class FilesHandler(JupyterHandler, web.StaticFileHandler):
         else:
             name = path
 
-        model = await ensure_async(cm.get(path, type="file", content=include_body))
-
         if self.get_argument("download", None):
             self.set_attachment_header(name)
 
-        # get mimetype from filename
-        if name.lower().endswith(".ipynb"):
-            self.set_header("Content-Type", "application/x-ipynb+json")
-        else:
-            cur_mime, encoding = mimetypes.guess_type(name)
-            if cur_mime == "text/plain":
-                self.set_header("Content-Type", "text/plain; charset=UTF-8")
-            # RFC 6713
-            if encoding == "gzip":
-                self.set_header("Content-Type", "application/gzip")
-            elif encoding is not None:
-                self.set_header("Content-Type", "application/octet-stream")
-            elif cur_mime is not None:
-                self.set_header("Content-Type", cur_mime)
-            elif model["format"] == "base64":
-                self.set_header("Content-Type", "application/octet-stream")
-            else:
-                self.set_header("Content-Type", "text/plain; charset=UTF-8")
+        if isinstance(cm, FileManagerMixin):
+            # Stream straight from disk rather than building a base64 model.
+            self.root = cm.root_dir
+            await web.StaticFileHandler.get(self, path, include_body=include_body)
+            return
+
+        model = await ensure_async(cm.get(path, type="file", content=include_body))
+        self.set_header("Content-Type", _guess_content_type(name, model["format"] == "base64"))
 
         if include_body:
             if model["format"] == "base64":
@@ -96,5 +131,27 @@ class FilesHandler(JupyterHandler, web.StaticFileHandler):
                 self.write(model["content"])
             self.flush()
 
+    def get_content_type(self):
+        """Get the content type of a file streamed from disk."""
+        assert self.absolute_path is not None
+        name = os.path.basename(self.absolute_path)
+        # only sniff the content when the name alone is not conclusive
+        binary = mimetypes.guess_type(name) == (None, None) and _is_binary_file(self.absolute_path)
+        return _guess_content_type(name, binary)
+
+    def compute_etag(self):
+        """Compute a cheap validator from stat metadata of a streamed file.
+
+        Files modified too recently to be told apart from their next version
+        by their stat metadata have none.
+        """
+        absolute_path = getattr(self, "absolute_path", None)
+        if absolute_path is None:
+            return None
+        info = os.stat(absolute_path)
+        if is_racy(info):
+            return None
+        return f'"{info.st_mtime_ns:x}-{info.st_size:x}"'
+
 
 default_handlers: list[JupyterHandler] = []
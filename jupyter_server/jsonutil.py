@@ -0,0 +1,136 @@
+"""JSON serialization with a configurable backend.
+
+The server encodes its models and kernel messages with :func:`dumps`, and
+decodes request bodies, websocket messages and notebooks with :func:`loads`.
+Both use the standard library by default; :func:`set_json_backend` switches them
+to orjson or msgspec, which are much faster on large documents.
+"""
+
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+from __future__ import annotations
+
+import json
+import typing as t
+
+try:
+    from jupyter_client.jsonutil import json_default
+except ImportError:
+    from jupyter_client.jsonutil import date_default as json_default
+
+JSON_BACKENDS = ("json", "orjson", "msgspec")
+
+
+def _json_dumps(obj: t.Any) -> str:
+    return json.dumps(obj, default=json_default)
+
+
+_backend = "json"
+_dumps: t.Callable[[t.Any], str] = _json_dumps
+_loads: t.Callable[[str | bytes], t.Any] = json.loads
+
+
+def _orjson_functions() -> tuple[t.Callable[[t.Any], str], t.Callable[[str | bytes], t.Any]]:
+    import orjson
+
+    # datetimes are passed to json_default, to format them like the standard library backend
+    option = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj: t.Any) -> str:
+        try:
+            return orjson.dumps(obj, default=json_default, option=option).decode("utf-8")
+        except TypeError:
+            # e.g. integers larger than 64 bits
+            return _json_dumps(obj)
+
+    def loads(s: str | bytes) -> t.Any:
+        try:
+            return orjson.loads(s)
+        except ValueError:
+            # e.g. NaN, which the standard library accepts; raises the same errors
+            return json.loads(s)
+
+    return dumps, loads
+
+
+def _msgspec_functions() -> tuple[t.Callable[[t.Any], str], t.Callable[[str | bytes], t.Any]]:
+    import msgspec  # type: ignore[import-not-found]
+
+    encoder = msgspec.json.Encoder(enc_hook=json_default)
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: t.Any) -> str:
+        try:
+            return t.cast("bytes", encoder.encode(obj)).decode("utf-8")
+        except (TypeError, msgspec.EncodeError):
+            return _json_dumps(obj)
+
+    def loads(s: str | bytes) -> t.Any:
+        try:
+            return decoder.decode(s)
+        except msgspec.DecodeError:
+            return json.loads(s)
+
+    return dumps, loads
+
+
+def set_json_backend(name: str) -> None:
+    """Select the library used by :func:`dumps` and :func:`loads`.
+
+    Parameters
+    ----------
+    name : str
+        One of ``"json"`` (the standard library), ``"orjson"`` or ``"msgspec"``.
+
+    Raises
+    ------
+    ValueError
+        If the backend is unknown.
+    ImportError
+        If the library of the backend is not installed.
+    """
+    global _backend, _dumps, _loads
+    if name == "json":
+        _dumps, _loads = _json_dumps, json.loads
+    elif name == "orjson":
+        _dumps, _loads = _orjson_functions()
+    elif name == "msgspec":
+        _dumps, _loads = _msgspec_functions()
+    else:
+        msg = f"Unknown JSON backend {name!r}, expected one of {JSON_BACKENDS}"
+        raise ValueError(msg)
+    _backend = name
+
+
+def get_json_backend() -> str:
+    """Get the name of the library used by :func:`dumps` and :func:`loads`."""
+    return _backend
+
+
+def dumps(obj: t.Any) -> str:
+    """Serialize obj to a JSON string, formatting dates like ``json_default``.
+
+    The output is compact with the orjson and msgspec backends, and NaN and
+    infinite floats are serialized as null instead of invalid JSON. msgspec
+    formats naive datetimes without a timezone.
+    """
+    return _dumps(obj)
+
+
+def loads(s: str | bytes) -> t.Any:
+    """Deserialize a JSON document.
+
+    Raises ValueError (json.JSONDecodeError) if it is not valid JSON.
+    """
+    return _loads(s)
+
+
+class JSONDecoder(json.JSONDecoder):
+    """A json.JSONDecoder that decodes with the configured backend.
+
+    It is meant for APIs that only let the JSON decoder class be changed, as in
+    ``nbformat.reads(s, as_version, cls=JSONDecoder)``.
+    """
+
+    def decode(self, s: str, _w: t.Any = None) -> t.Any:  # type:ignore[override]
+        return _loads(s)
@@ -5,7 +5,7 @@ Read https://prometheus.io/docs/practices/naming/ for naming
 conventions for metrics & labels.
 """
 
-from prometheus_client import Gauge, Histogram, Info
+from prometheus_client import Counter, Gauge, Histogram, Info
 
 from jupyter_server._version import version_info as server_version_info
 
@@ -69,10 +69,39 @@ ACTIVE_DURATION = Gauge(
     "jupyter_server_active_duration_seconds",
     "Number of seconds this Jupyter Server has been active",
 )
+CONTENTS_CACHE_REQUESTS_TOTAL = Counter(
+    "jupyter_server_contents_cache_requests_total",
+    "counter for lookups in the contents model cache labeled by kind of model and result",
+    ["kind", "result"],
+)
+KERNEL_MESSAGE_BUFFER_BYTES = Gauge(
+    "jupyter_server_kernel_message_buffer_bytes",
+    "bytes of kernel messages buffered for disconnected clients labeled by storage",
+    ["storage"],
+)
+KERNEL_MESSAGE_BUFFER_DROPPED_TOTAL = Counter(
+    "jupyter_server_kernel_message_buffer_dropped_total",
+    "counter for kernel messages dropped from the buffers of disconnected clients labeled by reason",
+    ["reason"],
+)
+KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL = Counter(
+    "jupyter_server_kernel_websocket_compression_bytes_total",
+    "counter for bytes of compressed kernel websocket messages labeled by stage (uncompressed or compressed)",
+    ["stage"],
+)
+KERNEL_WEBSOCKET_SEND_QUEUE_BYTES = Gauge(
+    "jupyter_server_kernel_websocket_send_queue_bytes",
+    "bytes of kernel messages written to websockets and not yet sent to the clients",
+)
 
 __all__ = [
+    "CONTENTS_CACHE_REQUESTS_TOTAL",
     "HTTP_REQUEST_DURATION_SECONDS",
     "KERNEL_CURRENTLY_RUNNING_TOTAL",
+    "KERNEL_MESSAGE_BUFFER_BYTES",
+    "KERNEL_MESSAGE_BUFFER_DROPPED_TOTAL",
+    "KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL",
+    "KERNEL_WEBSOCKET_SEND_QUEUE_BYTES",
     "SERVER_INFO",
     "TERMINAL_CURRENTLY_RUNNING_TOTAL",
 ]
@@ -9,6 +9,7 @@ import errno
 import gettext
 import hashlib
 import hmac
+import importlib.util
 import ipaddress
 import json
 import logging
@@ -83,6 +84,7 @@ from jupyter_server import (
     DEFAULT_TEMPLATE_PATH_LIST,
     JUPYTER_SERVER_EVENTS_URI,
     __version__,
+    jsonutil,
 )
 from jupyter_server._sysinfo import get_sys_info
 from jupyter_server._tz import utcnow
@@ -1257,6 +1259,29 @@ class ServerApp(JupyterApp):
         """,
     )
 
+    json_backend = Unicode(
+        "json",
+        config=True,
+        help="""
+        The library used to serialize and parse the JSON of API responses and
+        request bodies, kernel websocket messages and notebooks:
+        'json' (the standard library), 'orjson' or 'msgspec'.
+        The latter two must be installed, and are much faster on large notebooks.
+        Notebooks are still written to disk by nbformat, in its usual format.
+        """,
+    )
+
+    @validate("json_backend")
+    def _validate_json_backend(self, proposal: t.Any) -> str:
+        value = t.cast("str", proposal["value"])
+        if value not in jsonutil.JSON_BACKENDS:
+            msg = f"json_backend must be one of {jsonutil.JSON_BACKENDS}, not {value!r}"
+            raise TraitError(msg)
+        if value != "json" and importlib.util.find_spec(value) is None:
+            msg = f"json_backend {value!r} is not installed"
+            raise TraitError(msg)
+        return value
+
     password = Unicode(
         "",
         config=True,
@@ -2081,6 +2106,8 @@ class ServerApp(JupyterApp):
 
     def init_configurables(self) -> None:
         """Initialize configurables."""
+        jsonutil.set_json_backend(self.json_backend)
+
         # If gateway server is configured, replace appropriate managers to perform redirection.  To make
         # this determination, instantiate the GatewayClient config singleton.
         self.gateway_config = GatewayClient.instance(parent=self)
@@ -3220,6 +3247,9 @@ class ServerApp(JupyterApp):
             # In either case, we don't need to do anything and just want to treat
             # the raised error as a no-op.
             pass
+        if getattr(self, "contents_manager", None):
+            # remove the data of the uploads in progress
+            await ensure_async(self.contents_manager.abort_uploads())
         if getattr(self, "kernel_manager", None):
             self.kernel_manager.__del__()
         if getattr(self, "session_manager", None):
@@ -0,0 +1,171 @@
+"""
+Archives of directories, written in chunks as they are produced.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import tarfile
+import time
+import typing as t
+import zipfile
+import zlib
+
+
+class _Sink:
+    """A write-only file collecting what is written to it.
+
+    It has no tell() or seek(), so that zipfile writes the sizes of the members
+    after their data instead of seeking back to their headers.
+    """
+
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class ArchiveStream:
+    """Write an archive member by member, without holding the archive in memory.
+
+    Add the directories with :meth:`add_directory`, and the files with
+    :meth:`start_file`, :meth:`write` and :meth:`end_file`, then :meth:`close`.
+    :meth:`read` returns the bytes of the archive produced since it was last
+    called. Names are the paths of the members in the archive, and times are
+    Unix timestamps.
+    """
+
+    extension = ""
+    mimetype = "application/octet-stream"
+
+    def read(self) -> bytes:
+        """Pop the bytes of the archive produced so far."""
+        raise NotImplementedError
+
+    def add_directory(self, name: str, mtime: float) -> None:
+        raise NotImplementedError
+
+    def start_file(self, name: str, size: int, mtime: float) -> None:
+        raise NotImplementedError
+
+    def write(self, data: bytes) -> None:
+        raise NotImplementedError
+
+    def end_file(self) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        raise NotImplementedError
+
+
+class ZipStream(ArchiveStream):
+    """A streamed zip archive, with deflated members."""
+
+    extension = ".zip"
+    mimetype = "application/zip"
+
+    def __init__(self) -> None:
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._file: t.IO[bytes] | None = None
+
+    def read(self) -> bytes:
+        data = b"".join(self._sink.chunks)
+        self._sink.chunks.clear()
+        return data
+
+    def _info(self, name: str, mtime: float) -> zipfile.ZipInfo:
+        # zip dates start in 1980
+        date_time = time.localtime(max(mtime, 315532800))[:6]
+        return zipfile.ZipInfo(name, date_time=date_time)
+
+    def add_directory(self, name: str, mtime: float) -> None:
+        info = self._info(name.rstrip("/") + "/", mtime)
+        info.external_attr = 0o40755 << 16 | 0x10
+        self._zip.writestr(info, b"")
+
+    def start_file(self, name: str, size: int, mtime: float) -> None:
+        info = self._info(name, mtime)
+        info.external_attr = 0o644 << 16
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.file_size = size
+        self._file = self._zip.open(info, "w", force_zip64=size >= zipfile.ZIP64_LIMIT)
+
+    def write(self, data: bytes) -> None:
+        assert self._file is not None
+        self._file.write(data)
+
+    def end_file(self) -> None:
+        assert self._file is not None
+        self._file.close()
+        self._file = None
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class TarGzStream(ArchiveStream):
+    """A streamed gzip-compressed tar archive."""
+
+    extension = ".tar.gz"
+    mimetype = "application/gzip"
+
+    def __init__(self) -> None:
+        self._compressor = zlib.compressobj(wbits=31)
+        self._chunks: list[bytes] = []
+        self._remaining = 0
+        self._padding = 0
+
+    def _write(self, data: bytes) -> None:
+        compressed = self._compressor.compress(data)
+        if compressed:
+            self._chunks.append(compressed)
+
+    def read(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+    def _add(self, name: str, type: bytes, size: int, mtime: float) -> None:
+        info = tarfile.TarInfo(name)
+        info.type = type
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o755 if type == tarfile.DIRTYPE else 0o644
+        self._write(info.tobuf(format=tarfile.PAX_FORMAT))
+
+    def add_directory(self, name: str, mtime: float) -> None:
+        self._add(name.rstrip("/"), tarfile.DIRTYPE, 0, mtime)
+
+    def start_file(self, name: str, size: int, mtime: float) -> None:
+        self._add(name, tarfile.REGTYPE, size, mtime)
+        self._remaining = size
+        self._padding = -size % tarfile.BLOCKSIZE
+
+    def write(self, data: bytes) -> None:
+        # the file may have grown since its size was written in the header
+        data = data[: self._remaining]
+        self._remaining -= len(data)
+        self._write(data)
+
+    def end_file(self) -> None:
+        # or it may have shrunk
+        self._write(tarfile.NUL * (self._remaining + self._padding))
+        self._remaining = self._padding = 0
+
+    def close(self) -> None:
+        # two empty blocks end the archive
+        self._write(tarfile.NUL * (2 * tarfile.BLOCKSIZE))
+        self._chunks.append(self._compressor.flush())
+
+
+ARCHIVE_FORMATS: dict[str, type[ArchiveStream]] = {"zip": ZipStream, "tar.gz": TarGzStream}
@@ -0,0 +1,220 @@
+"""
+A store of checkpoints as compressed, content-addressed blobs.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+import uuid
+import zlib
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    id TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    created REAL NOT NULL,
+    kind TEXT NOT NULL,
+    blob TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS checkpoints_path ON checkpoints (path, created);
+CREATE TABLE IF NOT EXISTS refs (checkpoint TEXT NOT NULL, blob TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS refs_checkpoint ON refs (checkpoint);
+CREATE INDEX IF NOT EXISTS refs_blob ON refs (blob);
+"""
+
+
+class CheckpointStore:
+    """A thread-safe store of the checkpoints of files, in a directory.
+
+    The content of each checkpoint is compressed and stored once, in a blob
+    named after its SHA-256 hash. Notebooks are stored as one blob per cell and
+    one for the rest of the notebook, so that the cells shared by checkpoints,
+    of the same notebook or not, are stored once. An SQLite index maps the API
+    path of each file to its checkpoints, and each checkpoint to the blobs it
+    uses, which are deleted with the last checkpoint using them.
+
+    The kind of a checkpoint is "notebook", for which the data is a notebook
+    dict, or the format of a file ("text" or "base64"), for which it is bytes.
+    Only the max_checkpoints most recent checkpoints of a file are kept, or all
+    of them if it is 0.
+    """
+
+    def __init__(self, directory: str, max_checkpoints: int = 10, compression_level: int = 6):
+        self.directory = directory
+        self.max_checkpoints = max_checkpoints
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.join(self.directory, "blobs"), exist_ok=True)
+            db = sqlite3.connect(
+                os.path.join(self.directory, "index.sqlite"),
+                check_same_thread=False,
+                isolation_level=None,
+            )
+            db.executescript(_SCHEMA)
+            self._db = db
+        return self._db
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest[2:])
+
+    def _put(self, data: bytes) -> str:
+        """Store a blob, unless it is stored already, and return its hash."""
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{uuid.uuid4().hex[:8]}.tmp"
+            try:
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(data, self.compression_level))
+                os.replace(tmp_path, blob_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+        return digest
+
+    def _get(self, digest: str) -> bytes:
+        with open(self._blob_path(digest), "rb") as f:
+            return zlib.decompress(f.read())
+
+    def add(self, path: str, kind: str, data: t.Any) -> tuple[str, float]:
+        """Add a checkpoint of the file at the API path, and return its id and creation time."""
+        with self._lock:
+            if kind == "notebook":
+                nb = dict(data)
+                cells = [
+                    self._put(json.dumps(cell, sort_keys=True).encode("utf-8"))
+                    for cell in nb.get("cells", [])
+                ]
+                nb["cells"] = cells
+                blob = self._put(json.dumps(nb, sort_keys=True).encode("utf-8"))
+                blobs = {blob, *cells}
+            else:
+                blob = self._put(data)
+                blobs = {blob}
+
+            checkpoint_id = uuid.uuid4().hex
+            created = time.time()
+            db = self._conn
+            with db:
+                db.execute("BEGIN")
+                db.execute(
+                    "INSERT INTO checkpoints VALUES (?, ?, ?, ?, ?)",
+                    (checkpoint_id, path, created, kind, blob),
+                )
+                db.executemany(
+                    "INSERT INTO refs VALUES (?, ?)", [(checkpoint_id, b) for b in blobs]
+                )
+            if self.max_checkpoints > 0:
+                expired = db.execute(
+                    "SELECT id FROM checkpoints WHERE path = ? ORDER BY created DESC LIMIT -1 OFFSET ?",
+                    (path, self.max_checkpoints),
+                ).fetchall()
+                self._remove([row[0] for row in expired])
+        return checkpoint_id, created
+
+    def get(self, checkpoint_id: str, path: str) -> tuple[str, t.Any] | None:
+        """Get the kind and data of a checkpoint of the file at the API path, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, blob FROM checkpoints WHERE id = ? AND path = ?",
+                (checkpoint_id, path),
+            ).fetchone()
+            if row is None:
+                return None
+            kind, blob = row
+            if kind != "notebook":
+                return kind, self._get(blob)
+            nb = json.loads(self._get(blob))
+            nb["cells"] = [json.loads(self._get(cell)) for cell in nb["cells"]]
+            return kind, nb
+
+    def list_checkpoints(self, path: str) -> list[tuple[str, float]]:
+        """List the ids and creation times of the checkpoints of the file at the API path."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, created FROM checkpoints WHERE path = ? ORDER BY created", (path,)
+            ).fetchall()
+
+    def delete(self, checkpoint_id: str, path: str) -> bool:
+        """Delete a checkpoint of the file at the API path, and return whether it existed."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM checkpoints WHERE id = ? AND path = ?", (checkpoint_id, path)
+            ).fetchone()
+            if row is None:
+                return False
+            self._remove([checkpoint_id])
+            return True
+
+    def delete_all(self, path: str) -> None:
+        """Delete the checkpoints of the file at the API path or, for a directory, of its files."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM checkpoints WHERE path = ? OR substr(path, 1, ?) = ?",
+                (path, len(path) + 1, f"{path}/"),
+            ).fetchall()
+            self._remove([row[0] for row in rows])
+
+    def rename(self, checkpoint_id: str, old_path: str, new_path: str) -> None:
+        """Move a checkpoint of the file at old_path to new_path."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE checkpoints SET path = ? WHERE id = ? AND path = ?",
+                (new_path, checkpoint_id, old_path),
+            )
+
+    def rename_all(self, old_path: str, new_path: str) -> None:
+        """Move the checkpoints of the file or directory at old_path to new_path."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE checkpoints SET path = ? || substr(path, ?)"
+                " WHERE path = ? OR substr(path, 1, ?) = ?",
+                (new_path, len(old_path) + 1, old_path, len(old_path) + 1, f"{old_path}/"),
+            )
+
+    def _remove(self, checkpoint_ids: list[str]) -> None:
+        """Remove checkpoints, and the blobs no other checkpoint uses."""
+        if not checkpoint_ids:
+            return
+        db = self._conn
+        placeholders = ", ".join("?" * len(checkpoint_ids))
+        with db:
+            db.execute("BEGIN")
+            blobs = {
+                row[0]
+                for row in db.execute(
+                    f"SELECT DISTINCT blob FROM refs WHERE checkpoint IN ({placeholders})",
+                    checkpoint_ids,
+                )
+            }
+            db.execute(f"DELETE FROM refs WHERE checkpoint IN ({placeholders})", checkpoint_ids)
+            db.execute(f"DELETE FROM checkpoints WHERE id IN ({placeholders})", checkpoint_ids)
+        for blob in blobs:
+            if db.execute("SELECT 1 FROM refs WHERE blob = ? LIMIT 1", (blob,)).fetchone():
+                continue
+            try:
+                os.remove(self._blob_path(blob))
+            except FileNotFoundError:
+                pass
+
+    def close(self) -> None:
+        """Close the index."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
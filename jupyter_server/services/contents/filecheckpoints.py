@@ -5,11 +5,14 @@ File-based Checkpoints implementations.
 import os
 import shutil
 import tempfile
+from base64 import decodebytes, encodebytes
+from contextlib import contextmanager
 
+import nbformat
 from anyio.to_thread import run_sync
 from jupyter_core.utils import ensure_dir_exists
 from tornado.web import HTTPError
-from traitlets import Unicode
+from traitlets import Instance, Int, Unicode, default
 
 from jupyter_server import _tz as tz
 
@@ -19,6 +22,7 @@ from .checkpoints import (
     Checkpoints,
     GenericCheckpointsMixin,
 )
+from .checkpointstore import CheckpointStore
 from .fileio import AsyncFileManagerMixin, FileManagerMixin
 
 
@@ -330,3 +334,215 @@ class AsyncGenericFileCheckpoints(AsyncGenericCheckpointsMixin, AsyncFileCheckpo
             "content": content,
             "format": format,
         }
+
+
+class BlobCheckpoints(GenericCheckpointsMixin, Checkpoints):
+    """
+    Local filesystem Checkpoints that keeps several checkpoints per file,
+    as compressed content-addressed blobs in a single store.
+
+    The content shared by checkpoints is only stored once, down to the
+    cells of notebooks, and the checkpoints of a file are listed from an
+    index rather than from the filesystem. Works with any conforming
+    ContentsManager.
+    """
+
+    root_dir = Unicode(config=True)
+
+    store_dir = Unicode(
+        config=True,
+        help="""The directory in which to keep the checkpoints.
+
+        By default, it is .ipynb_checkpoints in the root directory, or in the
+        system temp directory if the root directory is not writable.
+        """,
+    )
+
+    max_checkpoints = Int(
+        10,
+        config=True,
+        help="""The number of checkpoints to keep per file. When a new
+        checkpoint is created, the oldest ones are deleted. 0 keeps them all.""",
+    )
+
+    compression_level = Int(
+        6,
+        config=True,
+        help="""The zlib compression level of the checkpoints, from 0 (no
+        compression) to 9 (the smallest but slowest).""",
+    )
+
+    _store = Instance(CheckpointStore)
+
+    @default("root_dir")
+    def _root_dir_default(self):
+        if not self.parent:
+            return os.getcwd()
+        return self.parent.root_dir
+
+    @default("store_dir")
+    def _store_dir_default(self):
+        if not os.access(self.root_dir, os.W_OK):
+            return os.path.join(tempfile.gettempdir(), "jupyter_checkpoints")
+        return os.path.join(self.root_dir, ".ipynb_checkpoints")
+
+    @default("_store")
+    def _store_default(self):
+        return CheckpointStore(self.store_dir, self.max_checkpoints, self.compression_level)
+
+    def create_file_checkpoint(self, content, format, path):
+        """Create a checkpoint from the current content of a file."""
+        data = self._encode_file(content, format, path)
+        with self._store_errors():
+            checkpoint_id, created = self._store.add(path.strip("/"), format, data)
+        return self.checkpoint_model(checkpoint_id, created)
+
+    def create_notebook_checkpoint(self, nb, path):
+        """Create a checkpoint from the current content of a notebook."""
+        with self._store_errors():
+            checkpoint_id, created = self._store.add(path.strip("/"), "notebook", nb)
+        return self.checkpoint_model(checkpoint_id, created)
+
+    def get_notebook_checkpoint(self, checkpoint_id, path):
+        """Get a checkpoint for a notebook."""
+        path = path.strip("/")
+        self.log.info("restoring %s from checkpoint %s", path, checkpoint_id)
+        with self._store_errors():
+            checkpoint = self._store.get(checkpoint_id, path)
+        return self._checkpoint_content_model(checkpoint, checkpoint_id, path)
+
+    def get_file_checkpoint(self, checkpoint_id, path):
+        """Get a checkpoint for a file."""
+        return self.get_notebook_checkpoint(checkpoint_id, path)
+
+    def rename_checkpoint(self, checkpoint_id, old_path, new_path):
+        """Rename a checkpoint from old_path to new_path."""
+        with self._store_errors():
+            self._store.rename(checkpoint_id, old_path.strip("/"), new_path.strip("/"))
+
+    def rename_all_checkpoints(self, old_path, new_path):
+        """Rename the checkpoints of a file or of the files in a directory."""
+        with self._store_errors():
+            self._store.rename_all(old_path.strip("/"), new_path.strip("/"))
+
+    def delete_checkpoint(self, checkpoint_id, path):
+        """Delete a file's checkpoint."""
+        path = path.strip("/")
+        with self._store_errors():
+            deleted = self._store.delete(checkpoint_id, path)
+        if not deleted:
+            self.no_such_checkpoint(path, checkpoint_id)
+
+    def delete_all_checkpoints(self, path):
+        """Delete the checkpoints of a file or of the files in a directory."""
+        with self._store_errors():
+            self._store.delete_all(path.strip("/"))
+
+    def list_checkpoints(self, path):
+        """List the checkpoints of a file, from the oldest to the most recent."""
+        with self._store_errors():
+            checkpoints = self._store.list_checkpoints(path.strip("/"))
+        return [self.checkpoint_model(*checkpoint) for checkpoint in checkpoints]
+
+    # Checkpoint-related utilities
+    def checkpoint_model(self, checkpoint_id, created):
+        """construct the info dict for a given checkpoint"""
+        return {"id": checkpoint_id, "last_modified": tz.utcfromtimestamp(created)}
+
+    def _encode_file(self, content, format, path):
+        """The bytes of the content of a file model"""
+        try:
+            if format == "text":
+                return content.encode("utf8")
+            return decodebytes(content.encode("ascii"))
+        except Exception as e:
+            raise HTTPError(400, f"Encoding error checkpointing {path}: {e}") from e
+
+    def _checkpoint_content_model(self, checkpoint, checkpoint_id, path):
+        """The content model of a checkpoint returned by the store"""
+        if checkpoint is None:
+            self.no_such_checkpoint(path, checkpoint_id)
+        kind, data = checkpoint
+        if kind == "notebook":
+            return {"type": "notebook", "content": nbformat.from_dict(data)}
+        if kind == "text":
+            content = data.decode("utf8")
+        else:
+            content = encodebytes(data).decode("ascii")
+        return {"type": "file", "content": content, "format": kind}
+
+    @contextmanager
+    def _store_errors(self):
+        """context manager for turning permission errors of the store into 403."""
+        try:
+            yield
+        except PermissionError as e:
+            raise HTTPError(403, "Permission denied: checkpoints") from e
+
+    # Error Handling
+    def no_such_checkpoint(self, path, checkpoint_id):
+        raise HTTPError(404, f"Checkpoint does not exist: {path}@{checkpoint_id}")
+
+
+class AsyncBlobCheckpoints(BlobCheckpoints, AsyncGenericCheckpointsMixin, AsyncCheckpoints):
+    """
+    Asynchronous BlobCheckpoints, accessing the store in worker threads.
+    """
+
+    async def create_file_checkpoint(self, content, format, path):
+        """Create a checkpoint from the current content of a file."""
+        data = self._encode_file(content, format, path)
+        with self._store_errors():
+            checkpoint_id, created = await run_sync(self._store.add, path.strip("/"), format, data)
+        return self.checkpoint_model(checkpoint_id, created)
+
+    async def create_notebook_checkpoint(self, nb, path):
+        """Create a checkpoint from the current content of a notebook."""
+        with self._store_errors():
+            checkpoint_id, created = await run_sync(
+                self._store.add, path.strip("/"), "notebook", nb
+            )
+        return self.checkpoint_model(checkpoint_id, created)
+
+    async def get_notebook_checkpoint(self, checkpoint_id, path):
+        """Get a checkpoint for a notebook."""
+        path = path.strip("/")
+        self.log.info("restoring %s from checkpoint %s", path, checkpoint_id)
+        with self._store_errors():
+            checkpoint = await run_sync(self._store.get, checkpoint_id, path)
+        return self._checkpoint_content_model(checkpoint, checkpoint_id, path)
+
+    async def get_file_checkpoint(self, checkpoint_id, path):
+        """Get a checkpoint for a file."""
+        return await self.get_notebook_checkpoint(checkpoint_id, path)
+
+    async def rename_checkpoint(self, checkpoint_id, old_path, new_path):
+        """Rename a checkpoint from old_path to new_path."""
+        with self._store_errors():
+            await run_sync(
+                self._store.rename, checkpoint_id, old_path.strip("/"), new_path.strip("/")
+            )
+
+    async def rename_all_checkpoints(self, old_path, new_path):
+        """Rename the checkpoints of a file or of the files in a directory."""
+        with self._store_errors():
+            await run_sync(self._store.rename_all, old_path.strip("/"), new_path.strip("/"))
+
+    async def delete_checkpoint(self, checkpoint_id, path):
+        """Delete a file's checkpoint."""
+        path = path.strip("/")
+        with self._store_errors():
+            deleted = await run_sync(self._store.delete, checkpoint_id, path)
+        if not deleted:
+            self.no_such_checkpoint(path, checkpoint_id)
+
+    async def delete_all_checkpoints(self, path):
+        """Delete the checkpoints of a file or of the files in a directory."""
+        with self._store_errors():
+            await run_sync(self._store.delete_all, path.strip("/"))
+
+    async def list_checkpoints(self, path):
+        """List the checkpoints of a file, from the oldest to the most recent."""
+        with self._store_errors():
+            checkpoints = await run_sync(self._store.list_checkpoints, path.strip("/"))
+        return [self.checkpoint_model(*checkpoint) for checkpoint in checkpoints]
@@ -10,6 +10,7 @@ import errno
 import hashlib
 import os
 import shutil
+import uuid
 from base64 import decodebytes, encodebytes
 from contextlib import contextmanager
 from functools import partial
@@ -21,6 +22,7 @@ from traitlets import Bool, Enum
 from traitlets.config import Configurable
 from traitlets.config.configurable import LoggingConfigurable
 
+from jupyter_server import jsonutil
 from jupyter_server.utils import ApiPath, to_api_path, to_os_path
 
 
@@ -85,6 +87,169 @@ async def async_copy2_safe(src, dst, log=None):
             log.debug("copystat on %s failed", dst, exc_info=True)
 
 
+def scan_tree(src, limit_bytes=None):
+    """List the directories and files of a directory tree, with the total size of the files.
+
+    Like :func:`shutil.copytree`, symbolic links are followed. The walk stops
+    as soon as the total size exceeds limit_bytes, if given.
+
+    Returns
+    -------
+    (dirs, files, total) : the paths of the subdirectories, relative to src, in
+    top-down order, a list of (relative path, size) of the files, and the total
+    size of the files.
+    """
+    dirs = []
+    files = []
+    total = 0
+    pending = [""]
+    while pending:
+        rel_dir = pending.pop()
+        with os.scandir(os.path.join(src, rel_dir)) as it:
+            for entry in it:
+                rel_path = os.path.join(rel_dir, entry.name)
+                if entry.is_dir():
+                    dirs.append(rel_path)
+                    pending.append(rel_path)
+                    continue
+                size = entry.stat().st_size
+                files.append((rel_path, size))
+                total += size
+                if limit_bytes is not None and total > limit_bytes:
+                    return dirs, files, total
+    return dirs, files, total
+
+
+class TreeCopy:
+    """A copy of a directory tree that is performed in bounded steps.
+
+    Each call to :meth:`step` copies at most ``step_size`` bytes, so that the copy
+    can be run step by step in a worker thread, reporting progress and allowing
+    cancellation between steps. File data is copied with
+    :func:`os.copy_file_range` where it is supported, which lets the kernel copy
+    it without reading it into memory, and share it on filesystems with reflinks.
+
+    dirs and files are as returned by :func:`scan_tree`. Like
+    :func:`shutil.copytree`, dst must not exist.
+    """
+
+    step_size = 16 * 1024 * 1024
+
+    def __init__(self, src, dst, dirs, files, log=None):
+        self.src = src
+        self.dst = dst
+        self.dirs = dirs
+        self.files = files
+        self.log = log
+        self.done = False
+        self._started = False
+        self._next_file = 0
+        self._current = None
+        self._copy_file_range = getattr(os, "copy_file_range", None)
+
+    def step(self):
+        """Copy the next part of the tree. Returns the number of bytes copied."""
+        if not self._started:
+            os.makedirs(self.dst)
+            self._started = True
+            for rel_path in self.dirs:
+                os.mkdir(os.path.join(self.dst, rel_path))
+        copied = 0
+        while copied < self.step_size:
+            if self._current is None:
+                if self._next_file == len(self.files):
+                    self._finish()
+                    break
+                rel_path, size = self.files[self._next_file]
+                self._next_file += 1
+                fsrc = open(os.path.join(self.src, rel_path), "rb", buffering=0)  # noqa: SIM115
+                try:
+                    fdst = open(os.path.join(self.dst, rel_path), "xb", buffering=0)  # noqa: SIM115
+                except BaseException:
+                    fsrc.close()
+                    raise
+                self._current = (rel_path, size, fsrc, fdst)
+            rel_path, size, fsrc, fdst = self._current
+            n = self._copy_chunk(fsrc, fdst, size, self.step_size - copied)
+            copied += n
+            if n == 0:
+                self._close_current()
+                self._copystat(os.path.join(self.src, rel_path), os.path.join(self.dst, rel_path))
+        return copied
+
+    def _copy_chunk(self, fsrc, fdst, size, max_bytes):
+        if self._copy_file_range is not None:
+            try:
+                n = self._copy_file_range(fsrc.fileno(), fdst.fileno(), max_bytes)
+            except OSError as e:
+                if e.errno not in {errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.EOPNOTSUPP}:
+                    raise
+                n = 0
+            # some filesystems report no data instead of failing
+            if n or fdst.tell() >= size:
+                return n
+            # not supported here, copy the data ourselves from now on
+            self._copy_file_range = None
+            fsrc.seek(fdst.tell())
+        data = memoryview(fsrc.read(min(max_bytes, 1024 * 1024)))
+        n = len(data)
+        while data:
+            # unbuffered writes may be partial
+            data = data[fdst.write(data) :]
+        return n
+
+    def _copystat(self, src, dst):
+        try:
+            shutil.copystat(src, dst)
+        except OSError:
+            if self.log:
+                self.log.debug("copystat on %s failed", dst, exc_info=True)
+
+    def _close_current(self):
+        if self._current is not None:
+            _, _, fsrc, fdst = self._current
+            self._current = None
+            try:
+                fsrc.close()
+            finally:
+                fdst.close()
+
+    def _finish(self):
+        # after the files, whose creation changes the modification time of their directories
+        for rel_path in reversed(self.dirs):
+            self._copystat(os.path.join(self.src, rel_path), os.path.join(self.dst, rel_path))
+        self._copystat(self.src, self.dst)
+        self.done = True
+
+    def abort(self):
+        """Stop the copy and remove what has been copied."""
+        self._close_current()
+        if self._started:
+            shutil.rmtree(self.dst, ignore_errors=True)
+        self.done = True
+
+
+def hash_file(path, algorithm, chunk_size=1024 * 1024):
+    """Hash the contents of a file, reading it in chunks rather than all at once.
+
+    Returns the hexdigest and the stat_result of the file, or None instead of
+    the latter if the file was modified while it was read.
+    """
+    h = hashlib.new(algorithm)
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    with open(path, "rb", buffering=0) as f:
+        before = os.fstat(f.fileno())
+        while n := f.readinto(buf):
+            h.update(view[:n])
+        after = os.fstat(f.fileno())
+    changed = any(
+        getattr(before, attr) != getattr(after, attr)
+        for attr in ("st_mtime_ns", "st_ctime_ns", "st_size")
+    )
+    return h.hexdigest(), None if changed else after
+
+
 def path_to_intermediate(path):
     """Name of the intermediate file used in atomic writes.
 
@@ -99,8 +264,90 @@ def path_to_invalid(path):
     return os.path.join(dirname, basename + ".invalid")
 
 
+def _fsync_dir(dirpath):
+    """Flush a directory entry to disk, where directories can be opened (not on Windows)."""
+    if os.name == "nt":
+        return
+    fd = os.open(dirpath, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def atomic_replace(path, data, fsync="file", log=None):
+    """Write bytes to a file only if the entire write is successful, by replacing it.
+
+    Unlike :func:`atomic_writing`, the previous file contents are not copied:
+    the data is written to a new temporary file in the same directory, which then
+    replaces the target with :func:`os.replace`. The permissions of the target are
+    kept, but it gets a new inode, owned by the server user.
+
+    Parameters
+    ----------
+    path : str
+        The target file to write to.
+    data : bytes
+        The new contents of the file.
+    fsync : str, optional
+        'file' (default) to sync the data to disk before replacing the target,
+        'directory' to also sync the directory afterwards, so that the
+        replacement itself is durable, or 'none'.
+    """
+    # resolve the file itself being a symlink, see atomic_writing
+    if os.path.islink(path):
+        path = os.path.join(os.path.dirname(path), os.readlink(path))
+
+    dirpath = os.path.dirname(path) or os.getcwd()
+    if os.path.isfile(path) and not os.access(dirpath, os.W_OK) and os.access(path, os.W_OK):
+        # Fall back to direct write for existing file in a non-writable dir
+        with open(path, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync != "none":
+                os.fsync(f.fileno())
+        return
+
+    dirname, basename = os.path.split(path)
+    tmp_path = os.path.join(dirname, f".~{basename}.{uuid.uuid4().hex[:8]}.tmp")
+    # like open(), so that new files get the default permissions
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            if fsync != "none":
+                os.fsync(f.fileno())
+        try:
+            shutil.copymode(path, tmp_path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            if log:
+                log.debug("copymode on %s failed", tmp_path, exc_info=True)
+        os.replace(tmp_path, path)
+        # the rename changes the inode, which may leave its change time (the
+        # creation time reported on Linux) later than its modification time
+        os.utime(path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    if fsync == "directory":
+        _fsync_dir(dirpath)
+
+
+def _simple_write(path, data):
+    """Write bytes to a file directly, see _simple_writing."""
+    if os.path.islink(path):
+        path = os.path.join(os.path.dirname(path), os.readlink(path))
+    with open(path, "wb") as f:
+        f.write(data)
+
+
 @contextmanager
-def atomic_writing(path, text=True, encoding="utf-8", log=None, **kwargs):
+def atomic_writing(path, text=True, encoding="utf-8", log=None, fsync="file", **kwargs):
     """Context manager to write to a file only if the entire write is successful.
 
     This works by copying the previous file contents to a temporary file in the
@@ -117,6 +364,8 @@ def atomic_writing(path, text=True, encoding="utf-8", log=None, **kwargs):
         True.
     encoding : str, optional
         The encoding to use for files opened in text mode. Default is UTF-8.
+    fsync : str, optional
+        'file' (default) or 'directory' to sync the new data to disk, 'none' not to.
     **kwargs
         Passed to :func:`io.open`.
     """
@@ -163,7 +412,8 @@ def atomic_writing(path, text=True, encoding="utf-8", log=None, **kwargs):
 
     # Flush to disk
     fileobj.flush()
-    os.fsync(fileobj.fileno())
+    if fsync != "none":
+        os.fsync(fileobj.fileno())
     fileobj.close()
 
     # Written successfully, now remove the backup copy
@@ -243,6 +493,17 @@ class FileManagerMixin(LoggingConfigurable, Configurable):
         help="Hash algorithm to use for file content, support by hashlib",
     )
 
+    atomic_writing_fsync = Enum(
+        ["file", "directory", "none"],
+        default_value="file",
+        config=True,
+        help="""How saved files are synced to disk when use_atomic_writing is True:
+        'file' syncs the new contents before the save completes, 'directory'
+        also syncs the directory of the file, for the async contents manager's
+        replacement of the file to survive a crash, and 'none' leaves it to
+        the operating system, which is faster but may lose recent saves on a crash.""",
+    )
+
     @contextmanager
     def open(self, os_path, *args, **kwargs):
         """wrapper around io.open that turns permission errors into 403"""
@@ -257,6 +518,7 @@ class FileManagerMixin(LoggingConfigurable, Configurable):
         with self.perm_to_403(os_path):
             kwargs["log"] = self.log
             if self.use_atomic_writing:
+                kwargs.setdefault("fsync", self.atomic_writing_fsync)
                 with atomic_writing(os_path, *args, **kwargs) as f:
                     yield f
             else:
@@ -339,6 +601,7 @@ class FileManagerMixin(LoggingConfigurable, Configurable):
                 answer[0],
                 as_version=as_version,
                 capture_validation_error=capture_validation_error,
+                cls=jsonutil.JSONDecoder,
             )
 
             return (nb, answer[2]) if raw else nb  # type:ignore[misc]
@@ -453,6 +716,39 @@ class FileManagerMixin(LoggingConfigurable, Configurable):
             )
         )
 
+    def _read_file_chunks(self, os_path, offset=0, length=None, chunk_size=1024 * 1024):
+        """Read a byte range of a file, in chunks.
+
+        Parameters
+        ----------
+        os_path: str
+            The path to be read.
+        offset: int
+            The position of the first byte to read.
+        length: int, optional
+            The maximum number of bytes to read. Default: until the end of the file.
+        chunk_size: int
+            The maximum size of each chunk.
+
+        Yields
+        ------
+        chunk: bytes
+        """
+        if not os.path.isfile(os_path):
+            raise HTTPError(400, "Cannot read non-file %s" % os_path)
+
+        remaining = length
+        with self.open(os_path, "rb") as f:
+            f.seek(offset)
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
     def _save_file(self, os_path, content, format):
         """Save content of a generic file."""
         if format not in {"text", "base64"}:
@@ -497,6 +793,7 @@ class AsyncFileManagerMixin(FileManagerMixin):
                     nbformat.reads,
                     as_version=as_version,
                     capture_validation_error=capture_validation_error,
+                    cls=jsonutil.JSONDecoder,
                 ),
                 answer[0],
             )
@@ -525,18 +822,32 @@ class AsyncFileManagerMixin(FileManagerMixin):
 
         return answer
 
+    async def _write_bytes(self, os_path, data):
+        """Write bytes to a file in a worker thread, turning permission errors to 403.
+
+        Depending on flag 'use_atomic_writing', the new contents replace the file
+        (see :func:`atomic_replace`) or are written directly to it.
+        """
+        with self.perm_to_403(os_path):
+            if self.use_atomic_writing:
+                await run_sync(atomic_replace, os_path, data, self.atomic_writing_fsync, self.log)
+            else:
+                await run_sync(_simple_write, os_path, data)
+
     async def _save_notebook(self, os_path, nb, capture_validation_error=None):
         """Save a notebook to an os_path."""
-        with self.atomic_writing(os_path, encoding="utf-8") as f:
-            await run_sync(
-                partial(
-                    nbformat.write,
-                    version=nbformat.NO_CONVERT,
-                    capture_validation_error=capture_validation_error,
-                ),
-                nb,
-                f,
-            )
+        text = await run_sync(
+            partial(
+                nbformat.writes,
+                version=nbformat.NO_CONVERT,
+                capture_validation_error=capture_validation_error,
+            ),
+            nb,
+        )
+        if not text.endswith("\n"):
+            # like nbformat.write
+            text += "\n"
+        await self._write_bytes(os_path, text.encode("utf-8"))
 
     async def _read_file(  # type: ignore[override]
         self, os_path: str, format: str | None, raw: bool = False
@@ -595,6 +906,28 @@ class AsyncFileManagerMixin(FileManagerMixin):
             else (encodebytes(bcontent).decode("ascii"), "base64")
         )
 
+    async def _read_file_chunks(  # type: ignore[override]
+        self, os_path, offset=0, length=None, chunk_size=1024 * 1024
+    ):
+        """Read a byte range of a file, in chunks read in a worker thread.
+
+        See :meth:`FileManagerMixin._read_file_chunks`.
+        """
+        if not os.path.isfile(os_path):
+            raise HTTPError(400, "Cannot read non-file %s" % os_path)
+
+        remaining = length
+        with self.open(os_path, "rb") as f:
+            await run_sync(f.seek, offset)
+            while remaining is None or remaining > 0:
+                size = chunk_size if remaining is None else min(chunk_size, remaining)
+                chunk = await run_sync(f.read, size)
+                if not chunk:
+                    return
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+
     async def _save_file(self, os_path, content, format):
         """Save content of a generic file."""
         if format not in {"text", "base64"}:
@@ -611,5 +944,4 @@ class AsyncFileManagerMixin(FileManagerMixin):
         except Exception as e:
             raise HTTPError(400, f"Encoding error saving {os_path}: {e}") from e
 
-        with self.atomic_writing(os_path, text=False) as f:
-            await run_sync(f.write, bcontent)
+        await self._write_bytes(os_path, bcontent)
@@ -4,27 +4,41 @@
 # Distributed under the terms of the Modified BSD License.
 from __future__ import annotations
 
-import asyncio
+import copy
 import errno
+import itertools
 import math
 import mimetypes
 import os
-import platform
 import shutil
 import stat
-import subprocess
 import sys
+import time
 import typing as t
 import warnings
+from collections import OrderedDict
 from datetime import datetime
+from fnmatch import fnmatch
 from pathlib import Path
 
 import nbformat
+from anyio import CancelScope
 from anyio.to_thread import run_sync
 from jupyter_core.paths import exists, is_file_hidden, is_hidden
+from nbformat.v4.rwbase import rejoin_lines, strip_transient
 from send2trash import send2trash
 from tornado import web
-from traitlets import Bool, Int, TraitError, Unicode, default, validate
+from traitlets import (
+    Bool,
+    Float,
+    Instance,
+    Int,
+    TraitError,
+    Unicode,
+    default,
+    observe,
+    validate,
+)
 
 from jupyter_server import _tz as tz
 from jupyter_server.base.handlers import AuthenticatedFileHandler
@@ -32,8 +46,18 @@ from jupyter_server.transutils import _i18n
 from jupyter_server.utils import to_api_path
 
 from .filecheckpoints import AsyncFileCheckpoints, FileCheckpoints
-from .fileio import AsyncFileManagerMixin, FileManagerMixin
-from .manager import AsyncContentsManager, ContentsManager, copy_pat
+from .fileio import AsyncFileManagerMixin, FileManagerMixin, TreeCopy, hash_file, scan_tree
+from .manager import (
+    AsyncContentsManager,
+    ContentsManager,
+    _grep_lines,
+    _parse_list_sort,
+    _search_matcher,
+    copy_pat,
+)
+from .modelcache import HashCache, ModelCache, is_racy, stat_validator
+from .searchindex import ContentsIndex
+from .watcher import ContentsWatcher
 
 try:
     from os.path import samefile
@@ -43,6 +67,32 @@ except ImportError:
 
 _script_exporter = None
 
+# files larger than this are skipped by content searches
+_SEARCH_MAX_FILE_SIZE = 10 * 1024 * 1024
+
+
+def _entry_stat_key(entry, attr):
+    """Get a sort key from the lstat result of an os.DirEntry, 0 if it fails."""
+    try:
+        return getattr(entry.stat(follow_symlinks=False), attr)
+    except OSError:
+        return 0
+
+
+def _entry_is_dir(entry):
+    try:
+        return entry.is_dir()
+    except OSError:
+        return False
+
+
+# sort keys of os.DirEntry, consistent with the ones of manager._page_models
+_ENTRY_SORT_KEYS = {
+    "name": lambda e: e.name,
+    "mtime": lambda e: (_entry_stat_key(e, "st_mtime"), e.name),
+    "size": lambda e: (0 if _entry_is_dir(e) else _entry_stat_key(e, "st_size"), e.name),
+}
+
 
 def _get_created_timestamp(info: os.stat_result) -> float:
     """Get best-effort file creation timestamp from stat result.
@@ -144,6 +194,228 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         if safe. And if ``delete_to_trash`` is True, the directory won't be deleted.""",
     )
 
+    model_cache_size = Int(
+        0,
+        config=True,
+        help="""The number of directory entry models, and of parsed notebooks, to keep
+        in memory. Cached models are revalidated against the modification time, size,
+        inode and change time of their file, so changes made outside of the server are
+        noticed. 0 (default) disables the cache.""",
+    )
+
+    _entry_cache = Instance(ModelCache)
+    _notebook_cache = Instance(ModelCache)
+
+    @default("_entry_cache")
+    def _entry_cache_default(self):
+        return ModelCache(self.model_cache_size, kind="entry")
+
+    @default("_notebook_cache")
+    def _notebook_cache_default(self):
+        return ModelCache(self.model_cache_size, kind="notebook")
+
+    @observe("model_cache_size")
+    def _model_cache_size_changed(self, change):
+        self._entry_cache.resize(change["new"])
+        self._notebook_cache.resize(change["new"])
+
+    hash_cache_size = Int(
+        10000,
+        config=True,
+        help="""The number of file hashes to keep in memory, so that the hashes of
+        files requested with hash=1 are only computed again when the files change.
+        0 disables the cache.""",
+    )
+
+    hash_cache_file = Unicode(
+        "",
+        config=True,
+        help="""The path of an SQLite database in which the cached file hashes are
+        persisted, for them to outlive the server. By default they are only kept
+        in memory.""",
+    )
+
+    _hash_cache = Instance(HashCache)
+
+    @default("_hash_cache")
+    def _hash_cache_default(self):
+        return HashCache(self.hash_cache_size, db_path=self.hash_cache_file, log=self.log)
+
+    @observe("hash_cache_size")
+    def _hash_cache_size_changed(self, change):
+        self._hash_cache.resize(change["new"])
+
+    search_index_interval = Float(
+        10.0,
+        config=True,
+        help="""The number of seconds after which the index of the names of the files
+        under root_dir, built by the first search, is checked again in the background
+        for changes made outside of the contents API. Changes made through the
+        contents API are indexed by the next search.""",
+    )
+
+    _search_index = Instance(ContentsIndex, allow_none=True)
+
+    watch_debounce = Float(
+        0.2,
+        config=True,
+        help="""The number of seconds over which the changes to watched directories
+        are coalesced before they are sent to the clients watching them.""",
+    )
+
+    watch_poll_interval = Float(
+        2.0,
+        config=True,
+        help="""The number of seconds between listings of the watched directories,
+        where they cannot be watched with inotify.""",
+    )
+
+    watch_use_inotify = Bool(
+        True,
+        config=True,
+        help="""Whether to watch directories with inotify on Linux. If False, they are
+        listed every watch_poll_interval seconds instead.""",
+    )
+
+    _watcher = Instance(ContentsWatcher)
+
+    @default("_watcher")
+    def _watcher_default(self):
+        return ContentsWatcher(
+            self.root_dir,
+            include=lambda name: (
+                self.should_list(name) and (self.allow_hidden or not name.startswith("."))
+            ),
+            debounce=self.watch_debounce,
+            poll_interval=self.watch_poll_interval,
+            use_inotify=self.watch_use_inotify,
+            log=self.log,
+        )
+
+    def watch(self, path, callback):
+        """Call callback with the list of changes to the entries of the directory at path.
+
+        It must be called from the event loop that runs the callback. Hidden
+        entries are recognized by their name only. See
+        :class:`~jupyter_server.services.contents.watcher.ContentsWatcher`.
+        """
+        path = path.strip("/")
+        self._get_dir_os_path(path)
+        self._watcher.watch(path, callback)
+
+    def unwatch(self, path, callback):
+        """Stop calling a callback registered with watch."""
+        self._watcher.unwatch(path.strip("/"), callback)
+
+    hidden_cache_ttl = Float(
+        1.0,
+        config=True,
+        help="""The number of seconds for which the hidden state of directories is
+        cached, so that the ancestors of the paths of consecutive requests are
+        not checked again. 0 disables the cache.""",
+    )
+
+    # os path of a directory -> (expiry time, whether it is hidden or in a hidden directory)
+    _hidden_dirs = Instance(OrderedDict, args=())
+
+    def _is_hidden(self, os_path):
+        """Is a file hidden or contained in a hidden directory under root_dir?
+
+        The same as jupyter_core's ``is_hidden(os_path, root_dir)``, but whether the
+        directory containing os_path is hidden is cached for hidden_cache_ttl
+        seconds, so that its ancestors are not checked again for each of its
+        entries or for consecutive requests.
+        """
+        abs_path = os.path.normpath(os_path)
+        parent = os.path.dirname(abs_path)
+        root = os.path.normpath(self.root_dir)
+        if (
+            abs_path == root
+            or parent == root
+            or not os.path.isabs(abs_path)
+            or not parent.startswith(root + os.sep)
+        ):
+            return is_hidden(os_path, self.root_dir)
+
+        cache = self._hidden_dirs
+        now = time.monotonic()
+        cached = cache.get(parent)
+        if cached is not None and cached[0] > now:
+            hidden = cached[1]
+        else:
+            hidden = is_hidden(parent, root)
+            if self.hidden_cache_ttl > 0:
+                cache[parent] = (now + self.hidden_cache_ttl, hidden)
+                cache.move_to_end(parent)
+                while len(cache) > 4096:
+                    cache.popitem(last=False)
+        return hidden or is_file_hidden(abs_path)
+
+    def _invalidate_cached_models(self, os_path):
+        """Drop the cached models of a file or directory and of its contents"""
+        self._entry_cache.invalidate(os_path)
+        self._notebook_cache.invalidate(os_path)
+        self._hash_cache.invalidate(os_path)
+        prefix = os.path.normpath(os_path) + os.sep
+        for os_dir in [d for d in self._hidden_dirs if d.startswith(prefix)]:
+            self._hidden_dirs.pop(os_dir, None)
+        self._hidden_dirs.pop(os.path.normpath(os_path), None)
+        if self._search_index is not None:
+            self._search_index.invalidate(to_api_path(os_path, self.root_dir))
+
+    def _get_cached_notebook(self, os_path, validation_error):
+        """Get a copy of the cached notebook read from os_path, and the validator of the file.
+
+        The notebook is None if it is not cached.
+        """
+        if not self._notebook_cache.enabled:
+            return None, None
+        try:
+            validator = stat_validator(os.stat(os_path))
+        except OSError:
+            return None, None
+        cached = self._notebook_cache.get(os_path, validator)
+        if cached is None:
+            return None, validator
+        nb, error = cached
+        validation_error.update(error)
+        return copy.deepcopy(nb), validator
+
+    def _cache_saved_notebook(self, os_path, nb, validation_error):
+        """Cache a copy of a notebook that was just saved to os_path, as it would be read"""
+        if not self._notebook_cache.enabled:
+            return
+        try:
+            validator = stat_validator(os.stat(os_path))
+        except OSError:
+            return
+        nb = strip_transient(rejoin_lines(copy.deepcopy(nb)))
+        self._notebook_cache.set(os_path, validator, (nb, dict(validation_error)))
+
+    def _get_file_hash(self, os_path):
+        """Get the hash of the file at os_path, computing it only if it is not cached.
+
+        The file is read in chunks, so that large files are not read in memory.
+        The hashes of files modified too recently to be told apart from their
+        next version by their stat metadata are not cached.
+        """
+        algorithm = self.hash_algorithm
+        with self.perm_to_403(os_path):
+            validator = (*stat_validator(os.stat(os_path)), algorithm)
+            hexdigest = self._hash_cache.get(os_path, validator)
+            if hexdigest is None:
+                hexdigest, st = hash_file(os_path, algorithm)
+                if st is not None and not is_racy(st):
+                    self._hash_cache.set(os_path, (*stat_validator(st), algorithm), hexdigest)
+        return {"hash": hexdigest, "hash_algorithm": algorithm}
+
+    def _cache_notebook(self, os_path, validator, nb, validation_error):
+        """Cache a copy of the notebook read from os_path"""
+        if validator is not None:
+            self._notebook_cache.set(
+                os_path, validator, (copy.deepcopy(nb), dict(validation_error))
+            )
+
     @default("files_handler_class")
     def _files_handler_class_default(self):
         return AuthenticatedFileHandler
@@ -168,7 +440,7 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         """
         path = path.strip("/")
         os_path = self._get_os_path(path=path)
-        return is_hidden(os_path, self.root_dir)
+        return self._is_hidden(os_path)
 
     def is_writable(self, path):
         """Does the API style path correspond to a writable directory or file?
@@ -283,10 +555,14 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
 
         four_o_four = "file or directory does not exist: %r" % path
 
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             self.log.info("Refusing to serve hidden file or directory %r, via 404 Error", os_path)
             raise web.HTTPError(404, four_o_four)
 
+        return self._model_from_stat(path, os_path, info)
+
+    def _model_from_stat(self, path, os_path, info):
+        """Build the common base of a contents model from the lstat result of os_path"""
         try:
             # size of file
             size = info.st_size
@@ -311,6 +587,16 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
             self.log.warning("Invalid creation time %s for %s", raw_created, os_path)
             created = datetime(1970, 1, 1, 0, 0, tzinfo=tz.UTC)
 
+        if type(self).is_writable is FileContentsManager.is_writable:
+            # the same check, without resolving os_path again
+            try:
+                writable = os.access(os_path, os.W_OK)
+            except OSError:
+                self.log.error("Failed to check write permissions on %s", os_path)
+                writable = False
+        else:
+            writable = self.is_writable(path)
+
         # Create the base model.
         model = {}
         model["name"] = path.rsplit("/", 1)[-1]
@@ -321,75 +607,223 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         model["format"] = None
         model["mimetype"] = None
         model["size"] = size
-        model["writable"] = self.is_writable(path)
+        model["writable"] = writable
         model["hash"] = None
         model["hash_algorithm"] = None
 
         return model
 
-    def _dir_model(self, path, content=True):
-        """Build a model for a directory
+    def _scan_dir(self, path, os_dir, offset=0, limit=None, sort=None, pattern=None):
+        """List the content-free models of the entries of a directory.
 
-        if content is requested, will include a listing of the directory
+        The directory is listed in a single os.scandir pass, and the models are
+        built from the stat results cached on each entry. They are the same as
+        the ones returned by ``get(child_path, content=False)``.
+
+        Models are only built for the entries up to the end of the requested page.
+        Unless a sort order is given, the listing stops there too.
         """
+        key, reverse = _parse_list_sort(sort)
+        end = None if limit is None else offset + limit
+        with os.scandir(os_dir) as scanned:
+            matching = (
+                scanned
+                if pattern is None
+                else (entry for entry in scanned if fnmatch(entry.name, pattern))
+            )
+            ordered = (
+                matching
+                if key is None
+                else sorted(matching, key=_ENTRY_SORT_KEYS[key], reverse=reverse)
+            )
+            models = (self._dir_entry_model(path, entry) for entry in ordered)
+            return list(
+                itertools.islice((model for model in models if model is not None), offset, end)
+            )
+
+    def _dir_entry_model(self, path, entry):
+        """Build the content-free model of an os.DirEntry of the directory at path.
+
+        Returns None if the entry should not be listed.
+        """
+        st = self._listed_entry_stat(entry)
+        if st is None:
+            return None
+
+        os_path = entry.path
+        validator = stat_validator(st)
+        model = self._entry_cache.get(os_path, validator)
+        if model is not None:
+            return dict(model)
+
+        # like os.path.isdir, follows symlinks
+        is_dir = _entry_is_dir(entry)
+
+        model = self._model_from_stat(f"{path}/{entry.name}".strip("/"), os_path, st)
+        self._set_entry_type(model, os_path, is_dir)
+        self._entry_cache.set(os_path, validator, dict(model))
+        return model
+
+    def _set_entry_type(self, model, os_path, is_dir):
+        """Set the type of a content-free model built by _model_from_stat."""
+        if is_dir:
+            model["type"] = "directory"
+            model["size"] = None
+        elif model["name"].endswith(".ipynb"):
+            model["type"] = "notebook"
+        else:
+            model["type"] = "file"
+            model["mimetype"] = mimetypes.guess_type(os_path)[0]
+
+    def _listed_entry_stat(self, entry):
+        """Get the lstat result of an os.DirEntry, or None if it should not be listed."""
+        os_path = entry.path
+        try:
+            st = entry.stat(follow_symlinks=False)
+        except OSError as e:
+            # skip over broken symlinks in listing
+            if e.errno == errno.ENOENT:
+                self.log.warning("%s doesn't exist", os_path)
+            elif e.errno != errno.EACCES:  # Don't provide clues about protected files
+                self.log.warning("Error stat-ing %s: %r", os_path, e)
+            return None
+
+        if (
+            not stat.S_ISLNK(st.st_mode)
+            and not stat.S_ISREG(st.st_mode)
+            and not stat.S_ISDIR(st.st_mode)
+        ):
+            self.log.debug("%s not a regular file", os_path)
+            return None
+
+        try:
+            if not self.should_list(entry.name) or (
+                not self.allow_hidden and is_file_hidden(os_path, stat_res=st)
+            ):
+                return None
+        except OSError as e:
+            # ELOOP: recursive symlink, also don't show failure due to permissions
+            if e.errno not in [errno.ELOOP, errno.EACCES]:
+                self.log.warning(
+                    "Unknown error checking if file %r is hidden",
+                    os_path,
+                    exc_info=True,
+                )
+            return None
+        return st
+
+    def _get_dir_os_path(self, path):
+        """Get the os path of a directory that can be listed, raising 404 otherwise"""
         os_path = self._get_os_path(path)
 
         four_o_four = "directory does not exist: %r" % path
 
         if not os.path.isdir(os_path):
             raise web.HTTPError(404, four_o_four)
-        elif not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        elif not self.allow_hidden and self._is_hidden(os_path):
             self.log.info("Refusing to serve hidden directory %r, via 404 Error", os_path)
             raise web.HTTPError(404, four_o_four)
+        return os_path
+
+    def _dir_model(self, path, content=True):
+        """Build a model for a directory
+
+        if content is requested, will include a listing of the directory
+        """
+        os_path = self._get_dir_os_path(path)
 
         model = self._base_model(path)
         model["type"] = "directory"
         model["size"] = None
         if content:
-            model["content"] = contents = []
-            os_dir = os_path
-            for name in os.listdir(os_dir):
-                try:
-                    os_path = os.path.join(os_dir, name)
-                except UnicodeDecodeError as e:
-                    self.log.warning("failed to decode filename '%s': %r", name, e)
-                    continue
+            model["content"] = self._scan_dir(path, os_path)
+            for entry in model["content"]:
+                self.emit(data={"action": "get", "path": entry["path"]})
+            model["format"] = "json"
 
-                try:
-                    st = os.lstat(os_path)
-                except OSError as e:
-                    # skip over broken symlinks in listing
-                    if e.errno == errno.ENOENT:
-                        self.log.warning("%s doesn't exist", os_path)
-                    elif e.errno != errno.EACCES:  # Don't provide clues about protected files
-                        self.log.warning("Error stat-ing %s: %r", os_path, e)
-                    continue
+        return model
 
-                if (
-                    not stat.S_ISLNK(st.st_mode)
-                    and not stat.S_ISREG(st.st_mode)
-                    and not stat.S_ISDIR(st.st_mode)
-                ):
-                    self.log.debug("%s not a regular file", os_path)
-                    continue
+    def list_dir(self, path, offset=0, limit=None, sort=None, pattern=None):
+        """List a page of the entries of a directory, scanning it only as far as needed."""
+        path = path.strip("/")
+        os_path = self._get_dir_os_path(path)
+        contents = self._scan_dir(path, os_path, offset, limit, sort, pattern)
+        for entry in contents:
+            self.emit(data={"action": "get", "path": entry["path"]})
+        return contents
 
-                try:
-                    if self.should_list(name) and (
-                        self.allow_hidden or not is_file_hidden(os_path, stat_res=st)
-                    ):
-                        contents.append(self.get(path=f"{path}/{name}", content=False))
-                except OSError as e:
-                    # ELOOP: recursive symlink, also don't show failure due to permissions
-                    if e.errno not in [errno.ELOOP, errno.EACCES]:
-                        self.log.warning(
-                            "Unknown error checking if file %r is hidden",
-                            os_path,
-                            exc_info=True,
-                        )
+    def _refresh_search_index(self):
+        """Get the search index, building it or bringing it up to date first.
 
-            model["format"] = "json"
+        Once search_index_interval has passed, the whole tree is checked again
+        in a background thread, while the searches use the index as it is.
+        """
+        index = self._search_index
+        if index is None or index.root != self.root_dir:
+            index = self._search_index = ContentsIndex(
+                self.root_dir, lambda entry: self._listed_entry_stat(entry) is not None
+            )
+        if index.last_refresh is None:
+            index.refresh()
+            return index
+        if time.monotonic() - index.last_refresh > self.search_index_interval:
+            index.refresh_in_background()
+        if index.dirty:
+            index.refresh(full=False)
+        return index
+
+    def _search_index_entries(self, path, pattern, content, limit):
+        """Search the index of the directory at path, see search."""
+        index = self._refresh_search_index()
+        match = _search_matcher(pattern)
+        results = []
+        for api_path, name, is_dir in index.iter_entries(path):
+            if content is not None and is_dir:
+                continue
+            if not match(api_path[len(path) :].lstrip("/"), name):
+                continue
+            os_path = self._get_os_path(api_path)
+            try:
+                model = self._model_from_stat(api_path, os_path, os.lstat(os_path))
+                self._set_entry_type(model, os_path, os.path.isdir(os_path))
+            except OSError:
+                # removed since the index was refreshed
+                continue
+            if content is not None:
+                if model["type"] == "directory":
+                    continue
+                model["matches"] = self._grep_file(os_path, content)
+                if not model["matches"]:
+                    continue
+            results.append(model)
+            if len(results) == limit:
+                break
+        return results
 
-        return model
+    def _grep_file(self, os_path, query):
+        """Find the lines of a UTF-8 text file containing a query, see search."""
+        try:
+            if os.path.getsize(os_path) > _SEARCH_MAX_FILE_SIZE:
+                return []
+            with open(os_path, "rb") as f:
+                text = f.read().decode("utf8")
+        except (OSError, UnicodeError):
+            return []
+        return _grep_lines(text, query)
+
+    def search(self, path="", pattern="*", content=None, limit=100):
+        """Search a directory tree for files and directories.
+
+        The names of the files under root_dir are kept in an index, which is built
+        by the first search and brought up to date by the next ones. Files that
+        are not listed in directories are not indexed, and files larger than
+        10 MB are not searched for content.
+
+        See :meth:`ContentsManager.search`.
+        """
+        path = path.strip("/")
+        self._get_dir_os_path(path)
+        return self._search_index_entries(path, pattern, content, limit)
 
     def _file_model(self, path, content=True, format=None, require_hash=False):
         """Build a model for a file
@@ -426,8 +860,9 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
 
         if require_hash:
             if bytes_content is None:
-                bytes_content, _ = self._read_file(os_path, "byte")  # type: ignore[assignment,misc]
-            model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
+                model.update(**self._get_file_hash(os_path))
+            else:
+                model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
 
         return model
 
@@ -446,9 +881,12 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         bytes_content = None
         if content:
             validation_error: dict[str, t.Any] = {}
-            nb, bytes_content = self._read_notebook(
-                os_path, as_version=4, capture_validation_error=validation_error, raw=True
-            )
+            nb, validator = self._get_cached_notebook(os_path, validation_error)
+            if nb is None:
+                nb, bytes_content = self._read_notebook(
+                    os_path, as_version=4, capture_validation_error=validation_error, raw=True
+                )
+                self._cache_notebook(os_path, validator, nb, validation_error)
             self.mark_trusted_cells(nb, path)
             model["content"] = nb
             model["format"] = "json"
@@ -456,8 +894,9 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
 
         if require_hash:
             if bytes_content is None:
-                bytes_content, _ = self._read_file(os_path, "byte")  # type: ignore[misc]
-            model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
+                model.update(**self._get_file_hash(os_path))
+            else:
+                model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
 
         return model
 
@@ -492,7 +931,7 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         if not self.exists(path):
             raise web.HTTPError(404, four_o_four)
 
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             self.log.info("Refusing to serve hidden file or directory %r, via 404 Error", os_path)
             raise web.HTTPError(404, four_o_four)
 
@@ -515,9 +954,39 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         self.emit(data={"action": "get", "path": path})
         return model
 
+    def get_stream(self, path, offset=0, length=None, chunk_size=1024 * 1024):
+        """Iterate over the raw bytes of a file, reading it from disk in chunks."""
+        path = path.strip("/")
+        os_path = self._get_os_path(path)
+        four_o_four = "file or directory does not exist: %r" % path
+
+        if not self.exists(path):
+            raise web.HTTPError(404, four_o_four)
+
+        if not self.allow_hidden and self._is_hidden(os_path):
+            self.log.info("Refusing to serve hidden file %r, via 404 Error", os_path)
+            raise web.HTTPError(404, four_o_four)
+
+        yield from self._read_file_chunks(os_path, offset, length, chunk_size)
+
+    def get_etag(self, path):
+        """Get a validator of a file or notebook from its stat metadata.
+
+        Files modified too recently to be told apart from their next version
+        by their stat metadata have none.
+        """
+        os_path = self._get_os_path(path.strip("/"))
+        try:
+            st = os.stat(os_path)
+        except OSError:
+            return None
+        if stat.S_ISDIR(st.st_mode) or is_racy(st):
+            return None
+        return "-".join(f"{n:x}" for n in (*stat_validator(st), self._trust_version))
+
     def _save_directory(self, os_path, model, path=""):
         """create a directory"""
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             raise web.HTTPError(400, "Cannot create directory %r" % os_path)
         if not os.path.exists(os_path):
             with self.perm_to_403():
@@ -539,7 +1008,7 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
             raise web.HTTPError(400, "No file content provided")
         os_path = self._get_os_path(path)
 
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             raise web.HTTPError(400, f"Cannot create file or directory {os_path!r}")
 
         self.log.debug("Saving %s", os_path)
@@ -565,6 +1034,12 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         except Exception as e:
             self.log.error("Error while saving file: %s %s", path, e, exc_info=True)
             raise web.HTTPError(500, f"Unexpected error while saving file: {path} {e}") from e
+        finally:
+            self._invalidate_cached_models(os_path)
+
+        if model["type"] == "notebook":
+            # incremental saves (see save_patch) apply the next patch to this copy
+            self._cache_saved_notebook(os_path, nb, validation_error)
 
         validation_message = None
         if model["type"] == "notebook":
@@ -585,13 +1060,15 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         os_path = self._get_os_path(path)
         rm = os.unlink
 
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             raise web.HTTPError(400, f"Cannot delete file or directory {os_path!r}")
 
         four_o_four = "file or directory does not exist: %r" % path
         if not self.exists(path):
             raise web.HTTPError(404, four_o_four)
 
+        self._invalidate_cached_models(os_path)
+
         def is_non_empty_dir(os_path):
             if os.path.isdir(os_path):
                 # A directory containing only leftover checkpoints is
@@ -639,9 +1116,7 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         new_os_path = self._get_os_path(new_path)
         old_os_path = self._get_os_path(old_path)
 
-        if not self.allow_hidden and (
-            is_hidden(old_os_path, self.root_dir) or is_hidden(new_os_path, self.root_dir)
-        ):
+        if not self.allow_hidden and (self._is_hidden(old_os_path) or self._is_hidden(new_os_path)):
             raise web.HTTPError(400, f"Cannot rename file or directory {old_os_path!r}")
 
         # Should we proceed with the move?
@@ -658,6 +1133,9 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
             raise web.HTTPError(404, f"File or directory does not exist: {old_path}") from None
         except Exception as e:
             raise web.HTTPError(500, f"Unknown error renaming file: {old_path} {e}") from e
+        finally:
+            self._invalidate_cached_models(old_os_path)
+            self._invalidate_cached_models(new_os_path)
 
     def info_string(self):
         """Get the information string for the manager."""
@@ -690,11 +1168,8 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
             from_dir = ""
             from_name = path
 
-        model = self.get(path)
-        # limit the size of folders being copied to prevent a timeout error
-        if model["type"] == "directory":
-            self.check_folder_size(path)
-        else:
+        model = self.get(path, content=False)
+        if model["type"] != "directory":
             # let the super class handle copying files
             return super().copy(from_path=from_path, to_path=to_path)
 
@@ -719,11 +1194,21 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
         handles copying directories
         returns the model for the copied directory
         """
+        to_path = to_path.strip("/")
         try:
+            # limit the size of folders being copied to prevent a timeout error
+            dirs, files, total = self._scan_copy_tree(from_path)
             os_from_path = self._get_os_path(from_path.strip("/"))
             os_to_path = f"{self._get_os_path(to_path_original.strip('/'))}/{to_name}"
-            shutil.copytree(os_from_path, os_to_path)
-            model = self.get(to_path, content=False)
+            tree_copy = TreeCopy(os_from_path, os_to_path, dirs, files, log=self.log)
+            copied = 0
+            try:
+                while not tree_copy.done:
+                    copied += tree_copy.step()
+                    self._emit_copy_progress(from_path, to_path, copied, total)
+            except BaseException:
+                tree_copy.abort()
+                raise
         except OSError as err:
             self.log.error(f"OSError in _copy_dir: {err}")
             raise web.HTTPError(
@@ -731,55 +1216,48 @@ class FileContentsManager(FileManagerMixin, ContentsManager):
                 f"Can't copy '{from_path}' into Folder '{to_path}'",
             ) from err
 
+        model = self.get(to_path, content=False)
+        self.emit(data={"action": "copy", "path": to_path, "source_path": from_path})
         return model
 
-    def check_folder_size(self, path):
-        """
-        limit the size of folders being copied to be no more than the
-        trait max_copy_folder_size_mb to prevent a timeout error
-        """
-        limit_bytes = self.max_copy_folder_size_mb * 1024 * 1024
-        size = int(self._get_dir_size(self._get_os_path(path)))
-        # convert from KB to Bytes for macOS
-        size = size * 1024 if platform.system() == "Darwin" else size
+    def _emit_copy_progress(self, from_path, to_path, copied, total):
+        """Emit the progress of a directory copy, after each of its steps."""
+        self.emit(
+            data={
+                "action": "copy_progress",
+                "path": to_path,
+                "source_path": from_path,
+                "copied_bytes": copied,
+                "total_bytes": total,
+            }
+        )
 
+    def _check_copy_size(self, path, size, limit_bytes):
         if size > limit_bytes:
             raise web.HTTPError(
                 400,
                 f"""
                     Can't copy folders larger than {self.max_copy_folder_size_mb}MB,
-                    "{path}" is {self._human_readable_size(size)}
+                    "{path}" is more than {self._human_readable_size(limit_bytes)}
                 """,
             )
 
-    def _get_dir_size(self, path="."):
+    def check_folder_size(self, path):
         """
-        calls the command line program du to get the directory size
+        limit the size of folders being copied to be no more than the
+        trait max_copy_folder_size_mb to prevent a timeout error
         """
-        try:
-            if platform.system() == "Darwin":
-                # returns the size of the folder in KB
-                result = subprocess.run(
-                    ["du", "-sk", path],  # noqa: S607
-                    capture_output=True,
-                    check=True,
-                ).stdout.split()
-            else:
-                result = subprocess.run(
-                    ["du", "-s", "--block-size=1", path],  # noqa: S607
-                    capture_output=True,
-                    check=True,
-                ).stdout.split()
-
-            self.log.info(f"current status of du command {result}")
-            size = result[0].decode("utf-8")
-        except Exception:
-            self.log.warning(
-                "Not able to get the size of the %s directory. Copying might be slow if the directory is large!",
-                path,
-            )
-            return "0"
-        return size
+        self._scan_copy_tree(path)
+
+    def _scan_copy_tree(self, path):
+        """Walk a folder to copy, stopping as soon as it exceeds max_copy_folder_size_mb.
+
+        Returns its directories, files and size, see :func:`.fileio.scan_tree`.
+        """
+        limit_bytes = self.max_copy_folder_size_mb * 1024 * 1024
+        dirs, files, size = scan_tree(self._get_os_path(path.strip("/")), limit_bytes)
+        self._check_copy_size(path, size, limit_bytes)
+        return dirs, files, size
 
     def _human_readable_size(self, size):
         """
@@ -808,65 +1286,37 @@ class AsyncFileContentsManager(  # type: ignore[misc]
 
         if content is requested, will include a listing of the directory
         """
-        os_path = self._get_os_path(path)
-
-        four_o_four = "directory does not exist: %r" % path
-
-        if not os.path.isdir(os_path):
-            raise web.HTTPError(404, four_o_four)
-        elif not self.allow_hidden and is_hidden(os_path, self.root_dir):
-            self.log.info("Refusing to serve hidden directory %r, via 404 Error", os_path)
-            raise web.HTTPError(404, four_o_four)
+        os_path = self._get_dir_os_path(path)
 
         model = self._base_model(path)
         model["type"] = "directory"
         model["size"] = None
         if content:
-            model["content"] = contents = []
-            os_dir = os_path
-            dir_contents = await run_sync(os.listdir, os_dir)
-            for name in dir_contents:
-                try:
-                    os_path = os.path.join(os_dir, name)
-                except UnicodeDecodeError as e:
-                    self.log.warning("failed to decode filename '%s': %r", name, e)
-                    continue
-
-                try:
-                    st = await run_sync(os.lstat, os_path)
-                except OSError as e:
-                    # skip over broken symlinks in listing
-                    if e.errno == errno.ENOENT:
-                        self.log.warning("%s doesn't exist", os_path)
-                    elif e.errno != errno.EACCES:  # Don't provide clues about protected files
-                        self.log.warning("Error stat-ing %s: %r", os_path, e)
-                    continue
+            # a single worker thread lists and stats the whole directory
+            model["content"] = await run_sync(self._scan_dir, path, os_path)
+            for entry in model["content"]:
+                self.emit(data={"action": "get", "path": entry["path"]})
+            model["format"] = "json"
 
-                if (
-                    not stat.S_ISLNK(st.st_mode)
-                    and not stat.S_ISREG(st.st_mode)
-                    and not stat.S_ISDIR(st.st_mode)
-                ):
-                    self.log.debug("%s not a regular file", os_path)
-                    continue
+        return model
 
-                try:
-                    if self.should_list(name) and (
-                        self.allow_hidden or not is_file_hidden(os_path, stat_res=st)
-                    ):
-                        contents.append(await self.get(path=f"{path}/{name}", content=False))
-                except OSError as e:
-                    # ELOOP: recursive symlink, also don't show failure due to permissions
-                    if e.errno not in [errno.ELOOP, errno.EACCES]:
-                        self.log.warning(
-                            "Unknown error checking if file %r is hidden",
-                            os_path,
-                            exc_info=True,
-                        )
+    async def list_dir(self, path, offset=0, limit=None, sort=None, pattern=None):
+        """List a page of the entries of a directory, scanning it only as far as needed."""
+        path = path.strip("/")
+        os_path = self._get_dir_os_path(path)
+        contents = await run_sync(self._scan_dir, path, os_path, offset, limit, sort, pattern)
+        for entry in contents:
+            self.emit(data={"action": "get", "path": entry["path"]})
+        return contents
 
-            model["format"] = "json"
+    async def search(self, path="", pattern="*", content=None, limit=100):
+        """Search a directory tree for files and directories, in a worker thread.
 
-        return model
+        See :meth:`FileContentsManager.search`.
+        """
+        path = path.strip("/")
+        self._get_dir_os_path(path)
+        return await run_sync(self._search_index_entries, path, pattern, content, limit)
 
     async def _file_model(self, path, content=True, format=None, require_hash=False):
         """Build a model for a file
@@ -903,8 +1353,9 @@ class AsyncFileContentsManager(  # type: ignore[misc]
 
         if require_hash:
             if bytes_content is None:
-                bytes_content, _ = await self._read_file(os_path, "byte")  # type: ignore[assignment,misc]
-            model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
+                model.update(**await run_sync(self._get_file_hash, os_path))
+            else:
+                model.update(**self._get_hash(bytes_content))  # type: ignore[arg-type]
 
         return model
 
@@ -921,9 +1372,12 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         bytes_content = None
         if content:
             validation_error: dict[str, t.Any] = {}
-            nb, bytes_content = await self._read_notebook(
-                os_path, as_version=4, capture_validation_error=validation_error, raw=True
-            )
+            nb, validator = self._get_cached_notebook(os_path, validation_error)
+            if nb is None:
+                nb, bytes_content = await self._read_notebook(
+                    os_path, as_version=4, capture_validation_error=validation_error, raw=True
+                )
+                self._cache_notebook(os_path, validator, nb, validation_error)
             self.mark_trusted_cells(nb, path)
             model["content"] = nb
             model["format"] = "json"
@@ -931,8 +1385,9 @@ class AsyncFileContentsManager(  # type: ignore[misc]
 
         if require_hash:
             if bytes_content is None:
-                bytes_content, _ = await self._read_file(os_path, "byte")  # type: ignore[misc]
-            model.update(**(self._get_hash(bytes_content)))  # type: ignore[arg-type]
+                model.update(**(await run_sync(self._get_file_hash, os_path)))
+            else:
+                model.update(**(self._get_hash(bytes_content)))  # type: ignore[arg-type]
 
         return model
 
@@ -985,9 +1440,25 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         self.emit(data={"action": "get", "path": path})
         return model
 
+    async def get_stream(self, path, offset=0, length=None, chunk_size=1024 * 1024):
+        """Iterate over the raw bytes of a file, reading it from disk in chunks."""
+        path = path.strip("/")
+        os_path = self._get_os_path(path)
+        four_o_four = "file or directory does not exist: %r" % path
+
+        if not self.exists(path):
+            raise web.HTTPError(404, four_o_four)
+
+        if not self.allow_hidden and self._is_hidden(os_path):
+            self.log.info("Refusing to serve hidden file %r, via 404 Error", os_path)
+            raise web.HTTPError(404, four_o_four)
+
+        async for chunk in self._read_file_chunks(os_path, offset, length, chunk_size):
+            yield chunk
+
     async def _save_directory(self, os_path, model, path=""):
         """create a directory"""
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             raise web.HTTPError(400, "Cannot create hidden directory %r" % os_path)
         if not os.path.exists(os_path):
             with self.perm_to_403():
@@ -1032,6 +1503,12 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         except Exception as e:
             self.log.error("Error while saving file: %s %s", path, e, exc_info=True)
             raise web.HTTPError(500, f"Unexpected error while saving file: {path} {e}") from e
+        finally:
+            self._invalidate_cached_models(os_path)
+
+        if model["type"] == "notebook":
+            # incremental saves (see save_patch) apply the next patch to this copy
+            self._cache_saved_notebook(os_path, nb, validation_error)
 
         validation_message = None
         if model["type"] == "notebook":
@@ -1052,12 +1529,14 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         os_path = self._get_os_path(path)
         rm = os.unlink
 
-        if not self.allow_hidden and is_hidden(os_path, self.root_dir):
+        if not self.allow_hidden and self._is_hidden(os_path):
             raise web.HTTPError(400, f"Cannot delete file or directory {os_path!r}")
 
         if not os.path.exists(os_path):
             raise web.HTTPError(404, "File or directory does not exist: %s" % os_path)
 
+        self._invalidate_cached_models(os_path)
+
         async def is_non_empty_dir(os_path):
             if os.path.isdir(os_path):
                 # A directory containing only leftover checkpoints is
@@ -1110,9 +1589,7 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         new_os_path = self._get_os_path(new_path)
         old_os_path = self._get_os_path(old_path)
 
-        if not self.allow_hidden and (
-            is_hidden(old_os_path, self.root_dir) or is_hidden(new_os_path, self.root_dir)
-        ):
+        if not self.allow_hidden and (self._is_hidden(old_os_path) or self._is_hidden(new_os_path)):
             raise web.HTTPError(400, f"Cannot rename file or directory {old_os_path!r}")
 
         # Should we proceed with the move?
@@ -1129,6 +1606,9 @@ class AsyncFileContentsManager(  # type: ignore[misc]
             raise web.HTTPError(404, f"File or directory does not exist: {old_path}") from None
         except Exception as e:
             raise web.HTTPError(500, f"Unknown error renaming file: {old_path} {e}") from e
+        finally:
+            self._invalidate_cached_models(old_os_path)
+            self._invalidate_cached_models(new_os_path)
 
     async def dir_exists(self, path):
         """Does a directory exist at the given path"""
@@ -1146,7 +1626,7 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         """Is path a hidden directory or file"""
         path = path.strip("/")
         os_path = self._get_os_path(path=path)
-        return is_hidden(os_path, self.root_dir)
+        return self._is_hidden(os_path)
 
     async def get_kernel_path(self, path, model=None):
         """Return the initial API path of a kernel associated with a given notebook"""
@@ -1175,11 +1655,8 @@ class AsyncFileContentsManager(  # type: ignore[misc]
             from_dir = ""
             from_name = path
 
-        model = await self.get(path)
-        # limit the size of folders being copied to prevent a timeout error
-        if model["type"] == "directory":
-            await self.check_folder_size(path)
-        else:
+        model = await self.get(path, content=False)
+        if model["type"] != "directory":
             # let the super class handle copying files
             return await AsyncContentsManager.copy(self, from_path=from_path, to_path=to_path)
 
@@ -1205,12 +1682,25 @@ class AsyncFileContentsManager(  # type: ignore[misc]
         """
         handles copying directories
         returns the model for the copied directory
+
+        The copy runs in steps in a worker thread, and is undone if it is cancelled.
         """
+        to_path = to_path.strip("/")
         try:
+            # limit the size of folders being copied to prevent a timeout error
+            dirs, files, total = await self._scan_copy_tree(from_path)
             os_from_path = self._get_os_path(from_path.strip("/"))
             os_to_path = f"{self._get_os_path(to_path_original.strip('/'))}/{to_name}"
-            shutil.copytree(os_from_path, os_to_path)
-            model = await self.get(to_path, content=False)
+            tree_copy = TreeCopy(os_from_path, os_to_path, dirs, files, log=self.log)
+            copied = 0
+            try:
+                while not tree_copy.done:
+                    copied += await run_sync(tree_copy.step)
+                    self._emit_copy_progress(from_path, to_path, copied, total)
+            except BaseException:
+                with CancelScope(shield=True):
+                    await run_sync(tree_copy.abort)
+                raise
         except OSError as err:
             self.log.error(f"OSError in _copy_dir: {err}")
             raise web.HTTPError(
@@ -1218,53 +1708,41 @@ class AsyncFileContentsManager(  # type: ignore[misc]
                 f"Can't copy '{from_path}' into read-only Folder '{to_path}'",
             ) from err
 
+        model = await self.get(to_path, content=False)
+        self.emit(data={"action": "copy", "path": to_path, "source_path": from_path})
         return model  # type:ignore[no-any-return]
 
-    async def check_folder_size(self, path: str) -> None:
-        """
-        limit the size of folders being copied to be no more than the
-        trait max_copy_folder_size_mb to prevent a timeout error
-        """
-        limit_bytes = self.max_copy_folder_size_mb * 1024 * 1024
-
-        size = int(await self._get_dir_size(self._get_os_path(path)))
-        # convert from KB to Bytes for macOS
-        size = size * 1024 if platform.system() == "Darwin" else size
+    async def _check_copy_size(self, path: str, size: int, limit_bytes: int) -> None:  # type:ignore[override]
         if size > limit_bytes:
             raise web.HTTPError(
                 400,
                 f"""
                     Can't copy folders larger than {self.max_copy_folder_size_mb}MB,
-                    "{path}" is {await self._human_readable_size(size)}
+                    "{path}" is more than {await self._human_readable_size(limit_bytes)}
                 """,
             )
 
-    async def _get_dir_size(self, path: str = ".") -> str:
+    async def check_folder_size(self, path: str) -> None:
         """
-        calls the command line program du to get the directory size
+        limit the size of folders being copied to be no more than the
+        trait max_copy_folder_size_mb to prevent a timeout error
         """
-        try:
-            if platform.system() == "Darwin":
-                # returns the size of the folder in KB
-                args = ["-sk", path]
-            else:
-                args = ["-s", "--block-size=1", path]
-            proc = await asyncio.create_subprocess_exec(
-                "du", *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
+        await self._scan_copy_tree(path)
 
-            stdout, _ = await proc.communicate()
-            result = await proc.wait()
-            self.log.info(f"current status of du command {result}")
-            assert result == 0
-            size = stdout.decode("utf-8").split()[0]
-        except Exception:
-            self.log.warning(
-                "Not able to get the size of the %s directory. Copying might be slow if the directory is large!",
-                path,
-            )
-            return "0"
-        return size
+    async def _scan_copy_tree(  # type:ignore[override]
+        self, path: str
+    ) -> tuple[list[str], list[tuple[str, int]], int]:
+        """Walk a folder to copy in a worker thread, stopping as soon as it
+        exceeds max_copy_folder_size_mb.
+
+        Returns its directories, files and size, see :func:`.fileio.scan_tree`.
+        """
+        limit_bytes = self.max_copy_folder_size_mb * 1024 * 1024
+        dirs, files, size = await run_sync(
+            scan_tree, self._get_os_path(path.strip("/")), limit_bytes
+        )
+        await self._check_copy_size(path, size, limit_bytes)
+        return dirs, files, size
 
     async def _human_readable_size(self, size: int) -> str:
         """
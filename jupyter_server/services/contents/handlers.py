@@ -5,24 +5,63 @@ Preliminary documentation at https://github.com/ipython/ipython/wiki/IPEP-27%3A-
 
 # Copyright (c) Jupyter Development Team.
 # Distributed under the terms of the Modified BSD License.
+import asyncio
+import codecs
 import json
+import os
+from base64 import encodebytes
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 from typing import Any
 
-try:
-    from jupyter_client.jsonutil import json_default
-except ImportError:
-    from jupyter_client.jsonutil import date_default as json_default
-
+from anyio.to_thread import run_sync
 from jupyter_core.utils import ensure_async
-from tornado import web
+from tornado import iostream, web, websocket
 
-from jupyter_server.auth.decorator import allow_unauthenticated, authorized
+from jupyter_server import jsonutil
+from jupyter_server.auth.decorator import allow_unauthenticated, authorized, ws_authenticated
 from jupyter_server.base.handlers import APIHandler, JupyterHandler, path_regex
+from jupyter_server.services.contents.archive import ARCHIVE_FORMATS
+from jupyter_server.services.contents.fileio import FileManagerMixin
+from jupyter_server.services.contents.manager import ContentsManager
 from jupyter_server.utils import url_escape, url_path_join
 
 AUTH_RESOURCE = "contents"
 
+# the maximum number of results of a search request
+MAX_SEARCH_LIMIT = 1000
+
+# the maximum depth of the directories of an archive, against symbolic link loops
+MAX_ARCHIVE_DEPTH = 64
+
+# the maximum number of operations of a batch request, and how many of them run at once
+MAX_BATCH_OPERATIONS = 10000
+BATCH_CONCURRENCY = 16
+
+
+# the lock of each path being saved, and the number of requests using it
+_save_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+
+@asynccontextmanager
+async def _save_lock(path: str) -> AsyncIterator[None]:
+    """Serialize the saves of a path, for patches to apply to the version they are checked against."""
+    path = path.strip("/")
+    lock, users = _save_locks.get(path, (None, 0))
+    if lock is None:
+        lock = asyncio.Lock()
+    _save_locks[path] = (lock, users + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, users = _save_locks[path]
+        if users == 1:
+            del _save_locks[path]
+        else:
+            _save_locks[path] = (lock, users - 1)
+
 
 def _validate_keys(expect_defined: bool, model: dict[str, Any], keys: list[str]):
     """
@@ -106,7 +145,7 @@ class ContentsHandler(ContentsAPIHandler):
             self.set_header("Location", location)
         self.set_header("Last-Modified", model["last_modified"])
         self.set_header("Content-Type", "application/json")
-        self.finish(json.dumps(model, default=json_default))
+        self.finish(jsonutil.dumps(model))
 
     async def _finish_error(self, code, message):
         """Finish a JSON request with an error code and descriptive message"""
@@ -145,12 +184,43 @@ class ContentsHandler(ContentsAPIHandler):
             )
         require_hash = int(hash_str)
 
+        offset_str = self.get_query_argument("offset", default=None)
+        length_str = self.get_query_argument("length", default=None)
+        partial = content and (offset_str is not None or length_str is not None)
+        try:
+            offset = int(offset_str or 0)
+            length = None if length_str is None else int(length_str)
+        except ValueError:
+            raise web.HTTPError(400, "Offset and length must be integers") from None
+        if offset < 0 or (length is not None and length < 0):
+            raise web.HTTPError(400, "Offset and length must not be negative")
+
+        limit_str = self.get_query_argument("limit", default=None)
+        sort = self.get_query_argument("sort", default=None)
+        pattern = self.get_query_argument("filter", default=None)
+        try:
+            limit = None if limit_str is None else int(limit_str)
+        except ValueError:
+            raise web.HTTPError(400, "Limit must be an integer") from None
+        if limit is not None and limit < 0:
+            raise web.HTTPError(400, "Limit must not be negative")
+        listing = content and (limit is not None or sort or pattern is not None)
+
         if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
             await self._finish_error(
                 HTTPStatus.NOT_FOUND, f"file or directory {path!r} does not exist"
             )
             return
 
+        etag = await ensure_async(cm.get_etag(path))
+        if etag is not None:
+            self.set_header("ETag", f'"{etag}"')
+            if self.check_etag_header():
+                # the client has the current version, skip reading it
+                self.set_status(HTTPStatus.NOT_MODIFIED)
+                self.finish()
+                return
+
         try:
             expect_hash = require_hash
             try:
@@ -159,7 +229,7 @@ class ContentsHandler(ContentsAPIHandler):
                         path=path,
                         type=type,
                         format=format,
-                        content=content,
+                        content=content and not (partial or listing),
                         require_hash=require_hash,
                     )
                 )
@@ -172,9 +242,20 @@ class ContentsHandler(ContentsAPIHandler):
                         path=path,
                         type=type,
                         format=format,
-                        content=content,
+                        content=content and not (partial or listing),
                     )
                 )
+            if listing or (partial and model["type"] == "directory"):
+                if model["type"] != "directory":
+                    raise web.HTTPError(400, "Listing options are only supported for directories")
+                if length is not None:
+                    raise web.HTTPError(400, "Length is only supported for files")
+                model["content"] = await ensure_async(
+                    cm.list_dir(path, offset=offset, limit=limit, sort=sort, pattern=pattern)
+                )
+                model["format"] = "json"
+            elif partial:
+                await self._read_range(model, format, offset, length)
             validate_model(model, expect_content=content, expect_hash=expect_hash)
             self._finish_model(model, location=False)
         except web.HTTPError as exc:
@@ -185,14 +266,61 @@ class ContentsHandler(ContentsAPIHandler):
                 )
             raise
 
+    async def _read_range(self, model, format, offset, length):
+        """Fill a content-less file model with a byte range of the file.
+
+        Text content is decoded incrementally, so that a multi-byte
+        character cut by the end of the range is left out.
+        """
+        if model["type"] != "file":
+            raise web.HTTPError(400, "Partial reads are only supported for files")
+
+        chunks = []
+        stream = self.contents_manager.get_stream(model["path"], offset=offset, length=length)
+        if hasattr(stream, "__aiter__"):
+            async for chunk in stream:
+                chunks.append(chunk)
+        else:
+            chunks.extend(stream)
+        bcontent = b"".join(chunks)
+
+        size = model.get("size")
+        at_eof = size is not None and offset + len(bcontent) >= size
+        if format in {None, "text"}:
+            try:
+                content = codecs.getincrementaldecoder("utf-8")().decode(bcontent, final=at_eof)
+            except UnicodeError as e:
+                if format == "text":
+                    raise web.HTTPError(
+                        400, "%s is not UTF-8 encoded" % model["path"], reason="bad format"
+                    ) from e
+            else:
+                format = "text"
+        if format != "text":
+            content = encodebytes(bcontent).decode("ascii")
+            format = "base64"
+
+        if model["mimetype"] is None:
+            model["mimetype"] = {
+                "text": "text/plain",
+                "base64": "application/octet-stream",
+            }[format]
+        model.update(content=content, format=format)
+
     @web.authenticated
     @authorized
     async def patch(self, path=""):
-        """PATCH renames a file or directory without re-uploading content."""
+        """PATCH renames a file or directory without re-uploading content.
+
+        With a ``patch`` in the body, it saves a notebook incrementally instead.
+        """
         cm = self.contents_manager
         model = self.get_json_body()
         if model is None:
             raise web.HTTPError(400, "JSON body missing")
+        if "patch" in model:
+            await self._save_patch(path, model)
+            return
 
         old_path = model.get("path")
         if (
@@ -208,6 +336,45 @@ class ContentsHandler(ContentsAPIHandler):
         validate_model(model)
         self._finish_model(model)
 
+    async def _save_patch(self, path, model):
+        """Save a notebook by applying a JSON patch to the version the client has.
+
+        The version is identified by an ``If-Match`` header with its ETag, or
+        by its hash in the body. 412 is returned if the notebook has changed
+        since, for the client to save all of it instead.
+        """
+        cm = self.contents_manager
+        if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
+            raise web.HTTPError(400, f"Cannot save file or directory {path!r}")
+
+        if_match = self.request.headers.get("If-Match")
+        expected_hash = model.get("hash")
+        if if_match is None and not expected_hash:
+            raise web.HTTPError(
+                HTTPStatus.PRECONDITION_REQUIRED,
+                "An If-Match header or the hash of the patched version is required",
+            )
+        async with _save_lock(path):
+            expected_etag = None
+            if if_match is not None:
+                expected_etag = await ensure_async(cm.get_etag(path))
+                if expected_etag is None or f'"{expected_etag}"' not in {
+                    v.strip() for v in if_match.split(",")
+                }:
+                    raise web.HTTPError(
+                        HTTPStatus.PRECONDITION_FAILED,
+                        f"Notebook {path!r} has changed, save all of it instead",
+                    )
+            # the manager checks the validator against the version it patches
+            model = await ensure_async(
+                cm.save_patch(path, model["patch"], expected_hash, expected_etag)
+            )
+            etag = await ensure_async(cm.get_etag(path))
+        validate_model(model)
+        if etag is not None:
+            self.set_header("ETag", f'"{etag}"')
+        self._finish_model(model)
+
     async def _copy(self, copy_from, copy_to=None):
         """Copy a file, optionally specifying a target directory."""
         self.log.info(
@@ -243,7 +410,8 @@ class ContentsHandler(ContentsAPIHandler):
         chunk = model.get("chunk", None)
         if not chunk or chunk == -1:  # Avoid tedious log information
             self.log.info("Saving file at %s", path)
-        model = await ensure_async(self.contents_manager.save(model, path))
+        async with _save_lock(path):
+            model = await ensure_async(self.contents_manager.save(model, path))
         validate_model(model)
         self._finish_model(model)
 
@@ -348,7 +516,7 @@ class CheckpointsHandler(ContentsAPIHandler):
         """get lists checkpoints for a file"""
         cm = self.contents_manager
         checkpoints = await ensure_async(cm.list_checkpoints(path))
-        data = json.dumps(checkpoints, default=json_default)
+        data = jsonutil.dumps(checkpoints)
         self.finish(data)
 
     @web.authenticated
@@ -357,7 +525,7 @@ class CheckpointsHandler(ContentsAPIHandler):
         """post creates a new checkpoint"""
         cm = self.contents_manager
         checkpoint = await ensure_async(cm.create_checkpoint(path))
-        data = json.dumps(checkpoint, default=json_default)
+        data = jsonutil.dumps(checkpoint)
         location = url_path_join(
             self.base_url,
             "api/contents",
@@ -392,6 +560,493 @@ class ModifyCheckpointsHandler(ContentsAPIHandler):
         self.finish()
 
 
+class UploadsAPIHandler(ContentsAPIHandler):
+    """Base class of the handlers of resumable uploads."""
+
+    async def prepare(self) -> None:  # type:ignore[override]
+        """Check that the contents manager supports resumable uploads."""
+        await super().prepare()
+        if not self.contents_manager.supports_resumable_uploads:
+            raise web.HTTPError(501, "The contents manager does not support resumable uploads")
+
+
+class UploadsHandler(UploadsAPIHandler):
+    """Start resumable uploads of raw file content."""
+
+    @web.authenticated
+    @authorized
+    async def post(self):
+        """Start an upload to the path given in the JSON body.
+
+        POST /api/uploads
+          with body {"path": "/path/to/file"}
+          Returns the upload model {"id", "path", "offset"}.
+        """
+        cm = self.contents_manager
+        model = self.get_json_body()
+        if not model or not model.get("path"):
+            raise web.HTTPError(400, "Upload path missing")
+        path = model["path"]
+        if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
+            raise web.HTTPError(400, f"Cannot create file or directory {path!r}")
+
+        self.log.info("Starting upload of file to %s", path)
+        upload = await ensure_async(cm.new_upload(path))
+        self.set_header("Location", url_path_join(self.base_url, "api/uploads", upload["id"]))
+        self.set_status(201)
+        self.finish(jsonutil.dumps(upload))
+
+
+class SearchHandler(ContentsAPIHandler):
+    """Search the files and directories of the contents root."""
+
+    @web.authenticated
+    @authorized
+    async def get(self):
+        """Search a directory tree, see ContentsManager.search.
+
+        GET /api/search?pattern=<glob>&path=<dir>&content=<text>&limit=<n>
+          Returns {"results": [models without content], "truncated": bool}
+        """
+        cm = self.contents_manager
+        path = self.get_query_argument("path", default="").strip("/")
+        pattern = self.get_query_argument("pattern", default="*") or "*"
+        content = self.get_query_argument("content", default="") or None
+        try:
+            limit = int(self.get_query_argument("limit", default="100"))
+        except ValueError:
+            raise web.HTTPError(400, "Limit must be an integer") from None
+        if not 0 < limit <= MAX_SEARCH_LIMIT:
+            raise web.HTTPError(400, f"Limit must be between 1 and {MAX_SEARCH_LIMIT}")
+
+        if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
+            raise web.HTTPError(404, f"directory {path!r} does not exist")
+
+        # one more result tells whether there are more than the limit
+        results = await ensure_async(
+            cm.search(path, pattern=pattern, content=content, limit=limit + 1)
+        )
+        for model in results:
+            validate_model(model)
+        self.set_header("Content-Type", "application/json")
+        self.finish(jsonutil.dumps({"results": results[:limit], "truncated": len(results) > limit}))
+
+
+class ArchiveHandler(ContentsAPIHandler):
+    """Download a directory as an archive."""
+
+    @web.authenticated
+    @authorized
+    async def get(self, path=""):
+        """Stream the files of a directory as an archive, as it is written.
+
+        GET /api/archive/path?format=zip
+          The format is zip (default) or tar.gz. Hidden files are left out
+          unless they are allowed.
+        """
+        cm = self.contents_manager
+        path = path.strip("/")
+        archive_format = self.get_query_argument("format", default="zip")
+        if archive_format not in ARCHIVE_FORMATS:
+            raise web.HTTPError(400, f"Archive format {archive_format!r} is invalid")
+        if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
+            raise web.HTTPError(404, f"directory {path!r} does not exist")
+        model = await ensure_async(cm.get(path, content=False))
+        if model["type"] != "directory":
+            raise web.HTTPError(400, f"{path!r} is not a directory")
+
+        entries = await self._walk(path)
+        limit_mb = cm.max_archive_size_mb
+        total = sum(entry["size"] or 0 for entry in entries)
+        if limit_mb and total > limit_mb * 1024 * 1024:
+            raise web.HTTPError(
+                413, f"Can't archive directories larger than {limit_mb}MB, {path!r} is larger"
+            )
+
+        archive = ARCHIVE_FORMATS[archive_format]()
+        name = model["name"] or "contents"
+        self.set_header("Content-Type", archive.mimetype)
+        self.set_attachment_header(name + archive.extension)
+        try:
+            await self._write_archive(archive, name, path, entries)
+        except iostream.StreamClosedError:
+            self.log.info("Archive download of %s was interrupted", path)
+            return
+        await self.finish()
+
+    async def _walk(self, path):
+        """List the models of the entries of a directory tree, directories first."""
+        cm = self.contents_manager
+        entries = []
+        # the directories already walked, for file-based contents managers to skip links to them
+        seen = set()
+        pending = [(path, 0)]
+        while pending:
+            dir_path, depth = pending.pop(0)
+            if isinstance(cm, FileManagerMixin):
+                real_path = os.path.realpath(cm._get_os_path(dir_path))
+                if real_path in seen:
+                    continue
+                seen.add(real_path)
+            model = await ensure_async(cm.get(dir_path, type="directory", content=True))
+            for entry in sorted(model["content"], key=lambda m: m["name"]):
+                if not cm.allow_hidden and await ensure_async(cm.is_hidden(entry["path"])):
+                    continue
+                entries.append(entry)
+                if entry["type"] == "directory" and depth < MAX_ARCHIVE_DEPTH:
+                    pending.append((entry["path"], depth + 1))
+        return entries
+
+    async def _write_archive(self, archive, name, path, entries):
+        """Write the entries to the archive, sending its chunks as they are produced."""
+        cm = self.contents_manager
+        for entry in entries:
+            member = f"{name}/{entry['path'][len(path) :].lstrip('/')}"
+            mtime = entry["last_modified"].timestamp()
+            if entry["type"] == "directory":
+                archive.add_directory(member, mtime)
+                continue
+
+            chunks = self._iter_stream(cm.get_stream(entry["path"]))
+            try:
+                first = await chunks.__anext__()
+            except StopAsyncIteration:
+                first = b""
+            except (web.HTTPError, OSError) as e:
+                # it was deleted or became unreadable since the listing
+                self.log.warning("Leaving %s out of the archive of %s: %s", entry["path"], path, e)
+                continue
+            size = entry["size"]
+            if size is None:
+                # a contents manager not giving sizes in listings
+                first += b"".join([chunk async for chunk in chunks])
+                size = len(first)
+            archive.start_file(member, size, mtime)
+            await run_sync(archive.write, first)
+            await self._send(archive)
+            async for chunk in chunks:
+                await run_sync(archive.write, chunk)
+                await self._send(archive)
+            archive.end_file()
+        await run_sync(archive.close)
+        await self._send(archive)
+
+    async def _iter_stream(self, stream):
+        if hasattr(stream, "__aiter__"):
+            async for chunk in stream:
+                yield chunk
+        else:
+            for chunk in stream:
+                yield chunk
+
+    async def _send(self, archive):
+        data = archive.read()
+        if data:
+            self.write(data)
+            await self.flush()
+
+
+class BatchHandler(ContentsAPIHandler):
+    """Run many contents operations in a single request."""
+
+    # operation -> (action it is authorized as, status of its success)
+    operations = {
+        "get": ("read", 200),
+        "delete": ("write", 204),
+        "rename": ("write", 200),
+        "copy": ("write", 201),
+    }
+
+    @web.authenticated
+    @authorized(action="read")
+    async def post(self):
+        """Run a list of operations, at most BATCH_CONCURRENCY of them at once.
+
+        POST /api/batch
+          with body {"operations": [
+              {"op": "get", "path": ..., "content": bool, "type": ..., "format": ..., "hash": bool},
+              {"op": "delete", "path": ...},
+              {"op": "rename", "path": ..., "new_path": ...},
+              {"op": "copy", "path": <destination>, "copy_from": ...},
+          ]}
+          Returns {"results": [{"status": int, "model": ...} or {"status": int, "error": str}]},
+          with the results in the order of the operations. Operations may run in
+          any order, so they should not depend on each other.
+        """
+        body = self.get_json_body()
+        operations = body.get("operations") if isinstance(body, dict) else None
+        if not isinstance(operations, list):
+            raise web.HTTPError(400, "A list of operations is required")
+        if len(operations) > MAX_BATCH_OPERATIONS:
+            raise web.HTTPError(400, f"At most {MAX_BATCH_OPERATIONS} operations are allowed")
+
+        actions = {
+            self.operations[op["op"]][0]
+            for op in operations
+            if isinstance(op, dict) and op.get("op") in self.operations
+        }
+        if "write" in actions and not await ensure_async(
+            self.authorizer.is_authorized(self, self.current_user, "write", AUTH_RESOURCE)
+        ):
+            raise web.HTTPError(
+                403, f"User is not authorized to write on resource: {AUTH_RESOURCE}."
+            )
+
+        semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+        async def run(operation):
+            async with semaphore:
+                return await self._run_operation(operation)
+
+        results = await asyncio.gather(*(run(operation) for operation in operations))
+        self.set_header("Content-Type", "application/json")
+        self.finish(jsonutil.dumps({"results": results}))
+
+    async def _run_operation(self, operation):
+        """Run an operation, and return its result"""
+        try:
+            if not isinstance(operation, dict) or operation.get("op") not in self.operations:
+                raise web.HTTPError(400, f"Unknown operation: {operation!r}")
+            path = operation.get("path")
+            if not isinstance(path, str):
+                raise web.HTTPError(400, "Operation path missing")
+            op = operation["op"]
+            model = await getattr(self, f"_{op}")(path.strip("/"), operation)
+        except web.HTTPError as e:
+            return {"status": e.status_code, "error": e.log_message or e.reason or ""}
+        except Exception as e:
+            self.log.error("Error in batch operation %r", operation, exc_info=True)
+            return {"status": 500, "error": f"Unexpected error: {e}"}
+        result: dict[str, Any] = {"status": self.operations[op][1]}
+        if model is not None:
+            result["model"] = model
+        return result
+
+    async def _check_hidden(self, action, *paths):
+        cm = self.contents_manager
+        if cm.allow_hidden:
+            return
+        for path in paths:
+            if await ensure_async(cm.is_hidden(path)):
+                raise web.HTTPError(400, f"Cannot {action} file or directory {path!r}")
+
+    async def _get(self, path, operation):
+        cm = self.contents_manager
+        if not cm.allow_hidden and await ensure_async(cm.is_hidden(path)):
+            raise web.HTTPError(404, f"file or directory {path!r} does not exist")
+        content = bool(operation.get("content", False))
+        require_hash = bool(operation.get("hash", False))
+        model = await ensure_async(
+            cm.get(
+                path,
+                content=content,
+                type=operation.get("type"),
+                format=operation.get("format"),
+                require_hash=require_hash,
+            )
+        )
+        validate_model(model, expect_content=content, expect_hash=require_hash)
+        return model
+
+    async def _delete(self, path, operation):
+        await self._check_hidden("delete", path)
+        self.log.warning("delete %s", path)
+        await ensure_async(self.contents_manager.delete(path))
+
+    async def _rename(self, path, operation):
+        new_path = operation.get("new_path")
+        if not isinstance(new_path, str):
+            raise web.HTTPError(400, "Rename new_path missing")
+        await self._check_hidden("rename", path, new_path)
+        model = await ensure_async(self.contents_manager.update({"path": new_path}, path))
+        validate_model(model)
+        return model
+
+    async def _copy(self, path, operation):
+        copy_from = operation.get("copy_from")
+        if not isinstance(copy_from, str):
+            raise web.HTTPError(400, "Copy copy_from missing")
+        await self._check_hidden("copy", path, copy_from)
+        self.log.info("Copying %r to %r", copy_from, path)
+        model = await ensure_async(self.contents_manager.copy(copy_from, path))
+        validate_model(model)
+        return model
+
+
+class WatchWebsocket(JupyterHandler, websocket.WebSocketHandler):
+    """Push the changes to the entries of watched directories.
+
+    The client sends ``{"watch": "<path>"}`` and ``{"unwatch": "<path>"}``
+    messages, and receives ``{"watch": "<path>"}`` once a directory is watched,
+    then ``{"changes": [...]}`` messages. Errors are sent as
+    ``{"error": "<message>", "path": "<path>"}``.
+    """
+
+    auth_resource = AUTH_RESOURCE
+
+    async def pre_get(self):
+        """Check that the user can read contents, and the contents manager can watch them."""
+        user = self.current_user
+        authorized = await ensure_async(
+            self.authorizer.is_authorized(self, user, "read", AUTH_RESOURCE)
+        )
+        if not authorized:
+            raise web.HTTPError(403)
+        if type(self.contents_manager).watch is ContentsManager.watch:
+            raise web.HTTPError(400, "The contents manager does not support watching directories")
+
+    @ws_authenticated
+    async def get(self, *args, **kwargs):
+        """Get a watch socket."""
+        await ensure_async(self.pre_get())
+        res = super().get(*args, **kwargs)
+        if res is not None:
+            await res
+
+    def open(self) -> None:  # type: ignore[override]
+        """Start without watching any directory."""
+        self._watched: set[str] = set()
+
+    def on_message(self, message):
+        """Watch or unwatch a directory."""
+        try:
+            msg = jsonutil.loads(message)
+        except ValueError:
+            msg = None
+        if not isinstance(msg, dict) or not ({"watch", "unwatch"} & msg.keys()):
+            self.write_message(jsonutil.dumps({"error": "Invalid watch message"}))
+            return
+        cm = self.contents_manager
+        if "unwatch" in msg:
+            path = str(msg["unwatch"]).strip("/")
+            if path in self._watched:
+                self._watched.discard(path)
+                cm.unwatch(path, self._send_changes)
+            return
+        path = str(msg["watch"]).strip("/")
+        if path not in self._watched:
+            try:
+                cm.watch(path, self._send_changes)
+            except web.HTTPError as e:
+                self.write_message(jsonutil.dumps({"error": e.log_message, "path": path}))
+                return
+            self._watched.add(path)
+        self.write_message(jsonutil.dumps({"watch": path}))
+
+    def _send_changes(self, changes):
+        try:
+            self.write_message(jsonutil.dumps({"changes": changes}))
+        except websocket.WebSocketClosedError:
+            self._unwatch_all()
+
+    def _unwatch_all(self):
+        for path in self._watched:
+            self.contents_manager.unwatch(path, self._send_changes)
+        self._watched.clear()
+
+    def on_close(self):
+        """Stop watching the directories."""
+        self._unwatch_all()
+
+
+@web.stream_request_body
+class UploadHandler(UploadsAPIHandler):
+    """Stream the raw bytes of a resumable upload to disk as they arrive.
+
+    PUT /api/uploads/<upload_id>?offset=<n>
+      Append the request body to the upload, which must be at offset n.
+    PUT /api/uploads/<upload_id>?offset=<n>&final=1
+      Append the request body and commit the upload to its path.
+    """
+
+    _fileobj = None
+    # whether a chunk is being written, and the upload closed once it is
+    _writing = False
+    _close_pending = False
+
+    async def prepare(self) -> None:  # type:ignore[override]
+        """Open the upload before the body is received."""
+        await super().prepare()
+        if self.request.method == "PUT":
+            opened = self._open_upload(self.path_kwargs["upload_id"])
+            if opened is not None:
+                await opened
+
+    @web.authenticated
+    @authorized
+    async def _open_upload(self, upload_id):
+        cm = self.contents_manager
+        try:
+            offset = int(self.get_query_argument("offset", default="0"))
+        except ValueError:
+            raise web.HTTPError(400, "Offset must be an integer") from None
+        self._fileobj = await ensure_async(cm.open_upload(upload_id, offset))
+
+    async def data_received(self, chunk):
+        """Write a chunk of the request body to the upload."""
+        self._writing = True
+        try:
+            await ensure_async(self.contents_manager.write_upload(self._fileobj, chunk))
+        finally:
+            self._writing = False
+            if self._close_pending:
+                self._close_fileobj()
+
+    @web.authenticated
+    @authorized
+    async def get(self, upload_id):
+        """Get the upload model, to find the offset to resume from."""
+        upload = await ensure_async(self.contents_manager.get_upload(upload_id))
+        self.finish(jsonutil.dumps(upload))
+
+    @web.authenticated
+    @authorized
+    async def put(self, upload_id):
+        """Finish receiving a chunk, and commit the upload if it is the last one."""
+        cm = self.contents_manager
+        fileobj, self._fileobj = self._fileobj, None
+        await ensure_async(cm.close_upload(fileobj))
+
+        if self.get_query_argument("final", default="0") == "1":
+            model = await ensure_async(cm.finish_upload(upload_id))
+            validate_model(model)
+            self.set_header(
+                "Location",
+                url_path_join(self.base_url, "api", "contents", url_escape(model["path"])),
+            )
+            self.finish(jsonutil.dumps(model))
+        else:
+            upload = await ensure_async(cm.get_upload(upload_id))
+            self.finish(jsonutil.dumps(upload))
+
+    @web.authenticated
+    @authorized
+    async def delete(self, upload_id):
+        """Abort an upload."""
+        await ensure_async(self.contents_manager.delete_upload(upload_id))
+        self.set_status(204)
+        self.finish()
+
+    def _close_fileobj(self):
+        self._close_pending = False
+        if self._fileobj is not None:
+            self._fileobj.close()
+            self._fileobj = None
+
+    def on_finish(self):
+        """Close the upload if the request failed, keeping the data received.
+
+        A chunk may still be written in a thread when the connection closes,
+        in which case the upload is closed once it is written.
+        """
+        if self._writing:
+            self._close_pending = True
+        else:
+            self._close_fileobj()
+
+    on_connection_close = on_finish
+
+
 class NotebooksRedirectHandler(JupyterHandler):
     """Redirect /api/notebooks to /api/contents"""
 
@@ -431,6 +1086,7 @@ class TrustNotebooksHandler(JupyterHandler):
 
 
 _checkpoint_id_regex = r"(?P<checkpoint_id>[\w-]+)"
+_upload_id_regex = r"(?P<upload_id>\w+)"
 
 
 default_handlers = [
@@ -441,5 +1097,11 @@ default_handlers = [
     ),
     (r"/api/contents%s/trust" % path_regex, TrustNotebooksHandler),
     (r"/api/contents%s" % path_regex, ContentsHandler),
+    (r"/api/search", SearchHandler),
+    (r"/api/batch", BatchHandler),
+    (r"/api/archive%s" % path_regex, ArchiveHandler),
+    (r"/api/watch", WatchWebsocket),
+    (r"/api/uploads", UploadsHandler),
+    (r"/api/uploads/%s" % _upload_id_regex, UploadHandler),
     (r"/api/notebooks/?(.*)", NotebooksRedirectHandler),
 ]
@@ -1,17 +1,146 @@
 import base64
 import os
+import time
+import uuid
+from contextlib import contextmanager
 
 from anyio.to_thread import run_sync
+from jupyter_core.paths import is_hidden
 from tornado import web
+from traitlets import Dict, Float
+from traitlets.config.configurable import LoggingConfigurable
 
 from jupyter_server.services.contents.filemanager import (
     AsyncFileContentsManager,
     FileContentsManager,
 )
+from jupyter_server.transutils import _i18n
+from jupyter_server.utils import to_api_path
 
 
-class LargeFileManager(FileContentsManager):
-    """Handle large file upload."""
+def _upload_tmp_path(os_path, upload_id):
+    """Name of the temporary file receiving a streamed upload to os_path.
+
+    It lives next to the target, so that committing the upload is an atomic rename.
+    """
+    dirname, basename = os.path.split(os_path)
+    return os.path.join(dirname, f".~{basename}.{upload_id}.upload")
+
+
+def _resolve_link(os_path):
+    """Resolve os_path if it is a symlink, so that writes go to its target."""
+    if os.path.islink(os_path):
+        return os.path.join(os.path.dirname(os_path), os.readlink(os_path))
+    return os_path
+
+
+class UploadsMixin(LoggingConfigurable):
+    """Bookkeeping of the resumable uploads of a contents manager.
+
+    Shared by LargeFileManager and AsyncLargeFileManager, which must provide
+    the root_dir and allow_hidden attributes.
+    """
+
+    upload_expiry = Float(
+        86400,
+        config=True,
+        help=_i18n(
+            """Seconds after which an upload that received no data is aborted,
+            and the data received so far removed. 0 to keep the uploads until
+            the server stops."""
+        ),
+    )
+
+    supports_resumable_uploads = True
+
+    _uploads = Dict()
+
+    def _check_upload_target(self, path, os_path):
+        """Validate the target of a new upload."""
+        if not self.allow_hidden and is_hidden(os_path, self.root_dir):  # type:ignore[attr-defined]
+            raise web.HTTPError(400, f"Cannot create file or directory {path!r}")
+        if os.path.isdir(os_path):
+            raise web.HTTPError(400, "%s is a directory" % path)
+        parent = os.path.dirname(os_path)
+        if not os.path.isdir(parent):
+            raise web.HTTPError(404, "No such directory: %s" % to_api_path(parent, self.root_dir))  # type:ignore[attr-defined]
+
+    def _add_upload(self, upload_id, path, os_path, tmp_path):
+        """Start the bookkeeping of an upload."""
+        self._uploads[upload_id] = {
+            "path": path,
+            "os_path": os_path,
+            "tmp_path": tmp_path,
+            "last_activity": time.time(),
+        }
+
+    def _get_upload_info(self, upload_id):
+        """Get the bookkeeping of an upload, or raise 404."""
+        try:
+            upload = self._uploads[upload_id]
+        except KeyError:
+            raise web.HTTPError(404, "No such upload: %s" % upload_id) from None
+        upload["last_activity"] = time.time()
+        return upload
+
+    @contextmanager
+    def _reserve_upload(self, upload_id):
+        """Reserve an upload for the request opening it, or raise 409 if another
+        request is writing to it.
+
+        The upload stays reserved until the file object set as its writer is closed.
+        """
+        upload = self._get_upload_info(upload_id)
+        writer = upload.get("writer")
+        if writer is True or (writer is not None and not writer.closed):
+            raise web.HTTPError(409, f"Upload {upload_id} is being written by another request")
+        # True until the file is opened
+        upload["writer"] = True
+        try:
+            yield upload
+        except BaseException:
+            upload["writer"] = None
+            raise
+
+    def _expired_uploads(self):
+        """The ids of the uploads that received no data for upload_expiry seconds.
+
+        Data written to an upload updates the modification time of its
+        temporary file, which counts as activity.
+        """
+        if not self.upload_expiry:
+            return []
+        deadline = time.time() - self.upload_expiry
+        expired = []
+        for upload_id, upload in list(self._uploads.items()):
+            last_activity = upload["last_activity"]
+            try:
+                last_activity = max(last_activity, os.path.getmtime(upload["tmp_path"]))
+            except OSError:
+                pass
+            if last_activity < deadline:
+                expired.append(upload_id)
+        return expired
+
+    def _remove_upload_file(self, upload_id, tmp_path):
+        """Remove the temporary file of an upload dropped by the server."""
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.log.warning("Failed to remove the data of upload %s: %s", upload_id, e)
+
+
+class LargeFileManager(UploadsMixin, FileContentsManager):
+    """Handle large file upload.
+
+    Besides chunked saves of base64/text models, files can be uploaded as raw
+    bytes with resumable uploads: :meth:`new_upload` starts an upload, its
+    content is streamed to a temporary file opened by :meth:`open_upload` at
+    the current offset, and :meth:`finish_upload` atomically moves it onto
+    the target.
+    """
 
     def save(self, model, path=""):
         """Save the file model and return the model with no content."""
@@ -81,9 +210,104 @@ class LargeFileManager(FileContentsManager):
             with open(os_path, "ab") as f:
                 f.write(bcontent)
 
+    def new_upload(self, path):
+        """Start a resumable upload of a file to path and return its upload model.
+
+        The upload model has the keys ``id``, ``path`` and ``offset``, the number
+        of bytes received so far.
+        """
+        self._delete_expired_uploads()
+        path = path.strip("/")
+        os_path = self._get_os_path(path)
+        self._check_upload_target(path, os_path)
+        self.run_pre_save_hooks(model={"type": "file", "path": path}, path=path)
+
+        upload_id = uuid.uuid4().hex
+        tmp_path = _upload_tmp_path(_resolve_link(os_path), upload_id)
+        with self.perm_to_403(os_path), open(tmp_path, "wb"):
+            pass
+        self._add_upload(upload_id, path, os_path, tmp_path)
+        self.log.debug("Started upload %s of file %s", upload_id, os_path)
+        return self.get_upload(upload_id)
+
+    def get_upload(self, upload_id):
+        """Get the model of an upload, with the offset to resume it from."""
+        upload = self._get_upload_info(upload_id)
+        return {
+            "id": upload_id,
+            "path": upload["path"],
+            "offset": os.path.getsize(upload["tmp_path"]),
+        }
+
+    def open_upload(self, upload_id, offset):
+        """Open the temporary file of an upload to append data received at offset."""
+        with self._reserve_upload(upload_id) as upload:
+            current = os.path.getsize(upload["tmp_path"])
+            if offset != current:
+                raise web.HTTPError(409, f"Upload {upload_id} is at offset {current}, not {offset}")
+            with self.perm_to_403(upload["os_path"]):
+                upload["writer"] = open(upload["tmp_path"], "ab")  # noqa: SIM115
+            return upload["writer"]
+
+    def write_upload(self, fileobj, chunk):
+        """Write a chunk of data to a file returned by open_upload."""
+        fileobj.write(chunk)
 
-class AsyncLargeFileManager(AsyncFileContentsManager):
-    """Handle large file upload asynchronously"""
+    def close_upload(self, fileobj):
+        """Flush a file returned by open_upload to disk and close it."""
+        fileobj.flush()
+        os.fsync(fileobj.fileno())
+        fileobj.close()
+
+    def finish_upload(self, upload_id):
+        """Atomically move a complete upload onto its target and return its model."""
+        upload = self._get_upload_info(upload_id)
+        path, os_path = upload["path"], upload["os_path"]
+        try:
+            with self.perm_to_403(os_path):
+                os.replace(upload["tmp_path"], _resolve_link(os_path))
+        except web.HTTPError:
+            raise
+        except Exception as e:
+            self.log.error("Error while saving file: %s %s", path, e, exc_info=True)
+            raise web.HTTPError(500, f"Unexpected error while saving file: {path} {e}") from e
+        self._uploads.pop(upload_id, None)
+
+        model = self.get(path, content=False)
+        self.run_post_save_hooks(model=model, os_path=os_path)
+        self.emit(data={"action": "save", "path": path})
+        return model
+
+    def delete_upload(self, upload_id):
+        """Abort an upload and remove the data received so far."""
+        upload = self._get_upload_info(upload_id)
+        with self.perm_to_403(upload["os_path"]):
+            if os.path.exists(upload["tmp_path"]):
+                os.remove(upload["tmp_path"])
+        self._uploads.pop(upload_id, None)
+
+    def _delete_expired_uploads(self):
+        """Abort the uploads that received no data for upload_expiry seconds."""
+        for upload_id in self._expired_uploads():
+            upload = self._uploads.pop(upload_id)
+            self.log.info("Upload %s of file %s expired", upload_id, upload["os_path"])
+            self._remove_upload_file(upload_id, upload["tmp_path"])
+
+    def abort_uploads(self):
+        """Abort all the uploads, and remove the data received so far.
+
+        Called when the server stops.
+        """
+        for upload_id in list(self._uploads):
+            upload = self._uploads.pop(upload_id)
+            self._remove_upload_file(upload_id, upload["tmp_path"])
+
+
+class AsyncLargeFileManager(UploadsMixin, AsyncFileContentsManager):  # type:ignore[misc]
+    """Handle large file upload asynchronously
+
+    See :class:`LargeFileManager` for resumable uploads.
+    """
 
     async def save(self, model, path=""):
         """Save the file model and return the model with no content."""
@@ -153,3 +377,101 @@ class AsyncLargeFileManager(AsyncFileContentsManager):
                 os_path = os.path.join(os.path.dirname(os_path), os.readlink(os_path))
             with open(os_path, "ab") as f:  # noqa: ASYNC230
                 await run_sync(f.write, bcontent)
+
+    async def new_upload(self, path):
+        """Start a resumable upload of a file to path and return its upload model.
+
+        The upload model has the keys ``id``, ``path`` and ``offset``, the number
+        of bytes received so far.
+        """
+        await self._delete_expired_uploads()
+        path = path.strip("/")
+        os_path = self._get_os_path(path)
+        self._check_upload_target(path, os_path)
+        self.run_pre_save_hooks(model={"type": "file", "path": path}, path=path)
+
+        upload_id = uuid.uuid4().hex
+        tmp_path = _upload_tmp_path(_resolve_link(os_path), upload_id)
+        with self.perm_to_403(os_path):
+            fileobj = await run_sync(open, tmp_path, "wb")
+            await run_sync(fileobj.close)
+        self._add_upload(upload_id, path, os_path, tmp_path)
+        self.log.debug("Started upload %s of file %s", upload_id, os_path)
+        return await self.get_upload(upload_id)
+
+    async def get_upload(self, upload_id):
+        """Get the model of an upload, with the offset to resume it from."""
+        upload = self._get_upload_info(upload_id)
+        return {
+            "id": upload_id,
+            "path": upload["path"],
+            "offset": await run_sync(os.path.getsize, upload["tmp_path"]),
+        }
+
+    async def open_upload(self, upload_id, offset):
+        """Open the temporary file of an upload to append data received at offset."""
+        with self._reserve_upload(upload_id) as upload:
+            current = await run_sync(os.path.getsize, upload["tmp_path"])
+            if offset != current:
+                raise web.HTTPError(409, f"Upload {upload_id} is at offset {current}, not {offset}")
+            with self.perm_to_403(upload["os_path"]):
+                upload["writer"] = await run_sync(open, upload["tmp_path"], "ab")
+            return upload["writer"]
+
+    async def write_upload(self, fileobj, chunk):
+        """Write a chunk of data to a file returned by open_upload."""
+        await run_sync(fileobj.write, chunk)
+
+    async def close_upload(self, fileobj):
+        """Flush a file returned by open_upload to disk and close it."""
+
+        def _close():
+            fileobj.flush()
+            os.fsync(fileobj.fileno())
+            fileobj.close()
+
+        await run_sync(_close)
+
+    async def finish_upload(self, upload_id):
+        """Atomically move a complete upload onto its target and return its model."""
+        upload = self._get_upload_info(upload_id)
+        path, os_path = upload["path"], upload["os_path"]
+        try:
+            with self.perm_to_403(os_path):
+                await run_sync(os.replace, upload["tmp_path"], _resolve_link(os_path))
+        except web.HTTPError:
+            raise
+        except Exception as e:
+            self.log.error("Error while saving file: %s %s", path, e, exc_info=True)
+            raise web.HTTPError(500, f"Unexpected error while saving file: {path} {e}") from e
+        self._uploads.pop(upload_id, None)
+
+        model = await self.get(path, content=False)
+        self.run_post_save_hooks(model=model, os_path=os_path)
+        self.emit(data={"action": "save", "path": path})
+        return model
+
+    async def delete_upload(self, upload_id):
+        """Abort an upload and remove the data received so far."""
+        upload = self._get_upload_info(upload_id)
+        with self.perm_to_403(upload["os_path"]):
+            if await run_sync(os.path.exists, upload["tmp_path"]):
+                await run_sync(os.remove, upload["tmp_path"])
+        self._uploads.pop(upload_id, None)
+
+    async def _delete_expired_uploads(self):
+        """Abort the uploads that received no data for upload_expiry seconds."""
+        for upload_id in await run_sync(self._expired_uploads):
+            upload = self._uploads.pop(upload_id, None)
+            if upload is not None:
+                self.log.info("Upload %s of file %s expired", upload_id, upload["os_path"])
+                await run_sync(self._remove_upload_file, upload_id, upload["tmp_path"])
+
+    async def abort_uploads(self):
+        """Abort all the uploads, and remove the data received so far.
+
+        Called when the server stops.
+        """
+        for upload_id in list(self._uploads):
+            upload = self._uploads.pop(upload_id)
+            await run_sync(self._remove_upload_file, upload_id, upload["tmp_path"])
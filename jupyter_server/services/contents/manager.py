@@ -10,7 +10,8 @@ import os
 import re
 import typing as t
 import warnings
-from fnmatch import fnmatch
+from base64 import decodebytes
+from fnmatch import fnmatch, translate
 
 from jupyter_core.utils import ensure_async, run_sync
 from jupyter_events import EventLogger
@@ -23,6 +24,7 @@ from traitlets import (
     Bool,
     Dict,
     Instance,
+    Int,
     List,
     TraitError,
     Type,
@@ -42,6 +44,140 @@ from .checkpoints import AsyncCheckpoints, Checkpoints
 copy_pat = re.compile(r"\-Copy\d*\.")
 
 
+def _model_bytes(model):
+    """Return the raw bytes of a file model with content."""
+    if model["format"] == "base64":
+        return decodebytes(model["content"].encode("ascii"))
+    return model["content"].encode("utf8")
+
+
+def _slice_chunks(data, offset, length, chunk_size):
+    """Split a byte range of data into chunks of at most chunk_size bytes."""
+    end = len(data) if length is None else min(len(data), offset + length)
+    for start in range(offset, end, chunk_size):
+        yield data[start : min(start + chunk_size, end)]
+
+
+_LIST_SORT_KEYS = ("name", "mtime", "size")
+
+
+def _parse_list_sort(sort):
+    """Split a listing sort order, like ``"-mtime"``, into its key and direction."""
+    if sort is None:
+        return None, False
+    reverse = sort.startswith("-")
+    key = sort[1:] if reverse else sort
+    if key not in _LIST_SORT_KEYS:
+        raise HTTPError(400, f"Invalid sort order: {sort!r}")
+    return key, reverse
+
+
+def _page_models(models, offset, limit, sort, pattern):
+    """Filter, sort and slice a list of directory entry models."""
+    if pattern is not None:
+        models = [model for model in models if fnmatch(model["name"], pattern)]
+    key, reverse = _parse_list_sort(sort)
+    if key == "name":
+        models = sorted(models, key=lambda m: m["name"], reverse=reverse)
+    elif key == "mtime":
+        models = sorted(models, key=lambda m: (m["last_modified"], m["name"]), reverse=reverse)
+    elif key == "size":
+        models = sorted(models, key=lambda m: (m["size"] or 0, m["name"]), reverse=reverse)
+    end = None if limit is None else offset + limit
+    return list(itertools.islice(models, offset, end))
+
+
+# the maximum number of matching lines returned for each file by a content search
+_SEARCH_MAX_MATCHES = 5
+# the maximum length of a matching line returned by a content search
+_SEARCH_MAX_LINE_LENGTH = 200
+
+
+def _search_matcher(pattern):
+    """Make a function matching API paths against a case-insensitive glob pattern.
+
+    Patterns containing a ``/`` are matched against the whole path, relative to
+    the searched directory, and others against the name.
+    """
+    regex = re.compile(translate(pattern), re.IGNORECASE)
+    if "/" in pattern:
+        return lambda rel_path, name: regex.match(rel_path) is not None
+    return lambda rel_path, name: regex.match(name) is not None
+
+
+def _grep_lines(text, query):
+    """Find the lines of a text containing a query, case-insensitively."""
+    query = query.lower()
+    matches = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        if query in line.lower():
+            matches.append({"line": lineno, "text": line[:_SEARCH_MAX_LINE_LENGTH]})
+            if len(matches) == _SEARCH_MAX_MATCHES:
+                break
+    return matches
+
+
+def _resolve_pointer(doc, pointer):
+    """Resolve a JSON pointer into its parent container and last reference token."""
+    if not pointer.startswith("/"):
+        raise HTTPError(400, f"Invalid JSON pointer: {pointer!r}")
+    tokens = [t.replace("~1", "/").replace("~0", "~") for t in pointer[1:].split("/")]
+    parent = doc
+    for token in tokens[:-1]:
+        try:
+            parent = parent[int(token) if isinstance(parent, list) else token]
+        except (KeyError, IndexError, ValueError, TypeError):
+            raise HTTPError(400, f"JSON pointer not found: {pointer!r}") from None
+    return parent, tokens[-1]
+
+
+def apply_json_patch(doc, patch):
+    """Apply a JSON patch (RFC 6902) to a JSON document, in place.
+
+    The add, remove, replace and test operations are supported. For a
+    notebook, ``{"op": "replace", "path": "/cells/3/source", "value": "..."}``
+    changes the source of its fourth cell.
+    """
+    if not isinstance(patch, list):
+        raise HTTPError(400, "A JSON patch must be a list of operations")
+    for operation in patch:
+        try:
+            op = operation["op"]
+            if op not in {"add", "remove", "replace", "test"}:
+                raise HTTPError(400, f"Unsupported JSON patch operation: {op!r}")
+            parent, token = _resolve_pointer(doc, operation["path"])
+            if op in {"add", "replace", "test"}:
+                value = operation["value"]
+            if isinstance(parent, list):
+                index = len(parent) if op == "add" and token == "-" else int(token)
+                if not 0 <= index <= len(parent) - (op != "add"):
+                    raise IndexError(index)
+                if op == "add":
+                    parent.insert(index, value)
+                elif op == "remove":
+                    del parent[index]
+                elif op == "replace":
+                    parent[index] = value
+                elif op == "test" and parent[index] != value:
+                    raise HTTPError(412, f"JSON patch test failed at {operation['path']!r}")
+            elif isinstance(parent, dict):
+                if op == "add":
+                    parent[token] = value
+                elif op == "remove":
+                    del parent[token]
+                elif op == "replace":
+                    if token not in parent:
+                        raise KeyError(token)
+                    parent[token] = value
+                elif op == "test" and parent[token] != value:
+                    raise HTTPError(412, f"JSON patch test failed at {operation['path']!r}")
+            else:
+                raise TypeError(parent)
+        except (KeyError, IndexError, ValueError, TypeError) as e:
+            raise HTTPError(400, f"Invalid JSON patch operation {operation!r}: {e!r}") from e
+    return doc
+
+
 class ContentsManager(LoggingConfigurable):
     """Base class for serving files and directories.
 
@@ -113,12 +249,22 @@ class ContentsManager(LoggingConfigurable):
 
     allow_hidden = Bool(False, config=True, help="Allow access to hidden files")
 
+    max_archive_size_mb = Int(
+        0,
+        config=True,
+        help="""The maximum total size of the files of a directory downloaded as an
+        archive, in MB. 0 (default) for no limit.""",
+    )
+
     notary = Instance(sign.NotebookNotary)
 
     @default("notary")
     def _notary_default(self):
         return sign.NotebookNotary(parent=self)
 
+    # incremented when a notebook is trusted, which changes its model but not its file
+    _trust_version = Int(0)
+
     hide_globs = List(
         Unicode(),
         [
@@ -458,6 +604,137 @@ class ContentsManager(LoggingConfigurable):
         """
         raise NotImplementedError
 
+    def get_stream(self, path, offset=0, length=None, chunk_size=1024 * 1024):
+        """Iterate over the raw bytes of a file, in chunks.
+
+        The default implementation reads the whole file model with :meth:`get`
+        and slices it. Subclasses with access to the underlying storage should
+        override it to avoid loading the whole file in memory.
+
+        Parameters
+        ----------
+        path : str
+            The API path of the file.
+        offset : int
+            The position of the first byte to return.
+        length : int, optional
+            The maximum number of bytes to return. Default: until the end of the file.
+        chunk_size : int
+            The maximum size of each chunk.
+
+        Yields
+        ------
+        chunk : bytes
+        """
+        model = self.get(path, type="file", content=True)
+        yield from _slice_chunks(_model_bytes(model), offset, length, chunk_size)
+
+    def list_dir(self, path, offset=0, limit=None, sort=None, pattern=None):
+        """List a page of the entries of a directory.
+
+        The default implementation gets the whole directory model with :meth:`get`
+        and pages its content. Subclasses should override it to stop listing the
+        directory as soon as the page is complete.
+
+        Parameters
+        ----------
+        path : str
+            The API path of the directory.
+        offset : int
+            The number of entries to skip.
+        limit : int, optional
+            The maximum number of entries to return. Default: all of them.
+        sort : str, optional
+            Sort the entries by ``"name"``, ``"mtime"`` or ``"size"``, in
+            descending order if prefixed with ``"-"``. Default: listing order.
+        pattern : str, optional
+            Only list the entries whose name matches this glob pattern.
+
+        Returns
+        -------
+        contents : list
+            The models of the entries, without content.
+        """
+        model = self.get(path, type="directory", content=True)
+        return _page_models(model["content"], offset, limit, sort, pattern)
+
+    def search(self, path="", pattern="*", content=None, limit=100):
+        """Search a directory tree for files and directories.
+
+        The default implementation walks the tree with :meth:`get`. Subclasses
+        should override it to search an index instead.
+
+        Parameters
+        ----------
+        path : str
+            The API path of the directory to search.
+        pattern : str
+            A glob pattern that the names of the results match, case-insensitively.
+            If it contains ``/``, the paths of the results relative to the searched
+            directory match it instead.
+        content : str, optional
+            Only return the files containing this text, case-insensitively.
+        limit : int
+            The maximum number of results.
+
+        Returns
+        -------
+        results : list
+            The models of the results, without content. With a content query, the
+            models of files have a ``matches`` list of the first matching lines,
+            as dicts with the ``line`` number and its ``text``.
+        """
+        path = path.strip("/")
+        match = _search_matcher(pattern)
+        results: list[dict[str, t.Any]] = []
+        pending = [path]
+        while pending and len(results) < limit:
+            model = self.get(pending.pop(0), type="directory", content=True)
+            for entry in sorted(model["content"], key=lambda m: m["name"]):
+                if entry["type"] == "directory":
+                    pending.append(entry["path"])
+                rel_path = entry["path"][len(path) :].lstrip("/")
+                if not match(rel_path, entry["name"]):
+                    continue
+                if content is not None:
+                    if entry["type"] == "directory":
+                        continue
+                    try:
+                        text = self.get(entry["path"], type="file", format="text")["content"]
+                    except HTTPError:
+                        continue
+                    entry["matches"] = _grep_lines(text, content)
+                    if not entry["matches"]:
+                        continue
+                results.append(entry)
+                if len(results) == limit:
+                    break
+        return results
+
+    def get_etag(self, path):
+        """Get a validator of the current version of a file or notebook.
+
+        It is sent as the ETag of its model, and a ``GET`` request for a model
+        whose validator matches its ``If-None-Match`` header is answered with
+        ``304 Not Modified`` without getting the model at all. It must therefore
+        be cheaper than :meth:`get` and change whenever the model does.
+
+        The default implementation returns None, which disables conditional
+        requests. Directories should not have a validator either, since their
+        listings change when the files they contain do.
+
+        Parameters
+        ----------
+        path : str
+            The API path of the file or notebook.
+
+        Returns
+        -------
+        etag : str or None
+            The validator, made of characters allowed in an ETag.
+        """
+        return None
+
     def save(self, model, path):
         """
         Save a file or directory model to path.
@@ -507,6 +784,99 @@ class ContentsManager(LoggingConfigurable):
         model = self.get(new_path, content=False)
         return model
 
+    def save_patch(self, path, patch, expected_hash=None, expected_etag=None):
+        """Save a notebook by applying a JSON patch to its current content.
+
+        For use in PATCH requests, to save the changes made to a notebook
+        without uploading all of it. The default implementation gets the
+        notebook, applies the patch and saves the result with :meth:`save`.
+
+        Parameters
+        ----------
+        path : str
+            The API path of the notebook.
+        patch : list
+            The JSON patch (RFC 6902) to apply to the notebook content, see
+            :func:`apply_json_patch`.
+        expected_hash : str, optional
+            The hash of the version of the notebook the patch was made against.
+            If the notebook has changed since, 412 is raised and the client
+            should save the whole notebook instead.
+        expected_etag : str, optional
+            The validator of that version, see :meth:`get_etag`, checked
+            against the version read like expected_hash.
+
+        Returns
+        -------
+        model : dict
+            The model of the saved notebook, without content.
+        """
+        path = path.strip("/")
+        etag = self.get_etag(path) if expected_etag is not None else None
+        model = self.get(path, content=True, type="notebook", require_hash=bool(expected_hash))
+        if expected_etag is not None and not (
+            # the version read is the one of the validator if it has not changed meanwhile
+            etag is not None and etag == expected_etag and self.get_etag(path) == etag
+        ):
+            raise HTTPError(412, f"Notebook {path!r} has changed, save all of it instead")
+        if expected_hash and model["hash"] != expected_hash:
+            raise HTTPError(412, f"Notebook {path!r} has changed, save all of it instead")
+        nb = apply_json_patch(model["content"], patch)
+        return self.save({"type": "notebook", "format": "json", "content": nb}, path)
+
+    # Resumable uploads of raw file content, implemented by LargeFileManager.
+    # The contents managers that implement them set supports_resumable_uploads.
+
+    supports_resumable_uploads = False
+
+    def _uploads_not_supported(self):
+        return HTTPError(501, "The contents manager does not support resumable uploads")
+
+    def new_upload(self, path):
+        """Start a resumable upload of a file to path and return its upload model.
+
+        The upload model has the keys ``id``, ``path`` and ``offset``, the number
+        of bytes received so far.
+        """
+        raise self._uploads_not_supported()
+
+    def get_upload(self, upload_id):
+        """Get the model of an upload, with the offset to resume it from."""
+        raise self._uploads_not_supported()
+
+    def open_upload(self, upload_id, offset):
+        """Open an upload to append data received at offset, and return a file object."""
+        raise self._uploads_not_supported()
+
+    def write_upload(self, fileobj, chunk):
+        """Write a chunk of data to a file returned by open_upload."""
+        raise self._uploads_not_supported()
+
+    def close_upload(self, fileobj):
+        """Close a file returned by open_upload."""
+        raise self._uploads_not_supported()
+
+    def finish_upload(self, upload_id):
+        """Commit a complete upload to its path and return its model."""
+        raise self._uploads_not_supported()
+
+    def delete_upload(self, upload_id):
+        """Abort an upload and remove the data received so far."""
+        raise self._uploads_not_supported()
+
+    def abort_uploads(self):
+        """Abort all the uploads, when the server stops."""
+
+    # Watching directories for changes, implemented by FileContentsManager.
+    # The contents managers that support it override watch and unwatch.
+
+    def watch(self, path, callback):
+        """Call callback with the list of changes to the entries of the directory at path."""
+        raise HTTPError(400, "The contents manager does not support watching directories")
+
+    def unwatch(self, path, callback):
+        """Stop calling a callback registered with watch."""
+
     def info_string(self):
         """The information string for the manager."""
         return "Serving contents"
@@ -704,6 +1074,7 @@ class ContentsManager(LoggingConfigurable):
         self.log.warning("Trusting notebook %s", path)
         self.notary.mark_cells(nb, True)
         self.check_and_sign(nb, path)
+        self._trust_version += 1
 
     def check_and_sign(self, nb, path="", *, _retrying=False):
         """Check for trusted cells, and sign the notebook.
@@ -884,6 +1255,62 @@ class AsyncContentsManager(ContentsManager):
         """
         raise NotImplementedError
 
+    async def get_stream(self, path, offset=0, length=None, chunk_size=1024 * 1024):
+        """Iterate asynchronously over the raw bytes of a file, in chunks.
+
+        See :meth:`ContentsManager.get_stream`.
+        """
+        model = await self.get(path, type="file", content=True)
+        for chunk in _slice_chunks(_model_bytes(model), offset, length, chunk_size):
+            yield chunk
+
+    async def list_dir(self, path, offset=0, limit=None, sort=None, pattern=None):
+        """List a page of the entries of a directory.
+
+        See :meth:`ContentsManager.list_dir`.
+        """
+        model = await self.get(path, type="directory", content=True)
+        return _page_models(model["content"], offset, limit, sort, pattern)
+
+    async def search(self, path="", pattern="*", content=None, limit=100):
+        """Search a directory tree for files and directories.
+
+        See :meth:`ContentsManager.search`.
+        """
+        path = path.strip("/")
+        match = _search_matcher(pattern)
+        results: list[dict[str, t.Any]] = []
+        pending = [path]
+        while pending and len(results) < limit:
+            model = await self.get(pending.pop(0), type="directory", content=True)
+            for entry in sorted(model["content"], key=lambda m: m["name"]):
+                if entry["type"] == "directory":
+                    pending.append(entry["path"])
+                rel_path = entry["path"][len(path) :].lstrip("/")
+                if not match(rel_path, entry["name"]):
+                    continue
+                if content is not None:
+                    if entry["type"] == "directory":
+                        continue
+                    try:
+                        file_model = await self.get(entry["path"], type="file", format="text")
+                    except HTTPError:
+                        continue
+                    entry["matches"] = _grep_lines(file_model["content"], content)
+                    if not entry["matches"]:
+                        continue
+                results.append(entry)
+                if len(results) == limit:
+                    break
+        return results
+
+    async def get_etag(self, path):
+        """Get a validator of the current version of a file or notebook.
+
+        See :meth:`ContentsManager.get_etag`.
+        """
+        return None
+
     async def save(self, model, path):
         """
         Save a file or directory model to path.
@@ -938,6 +1365,61 @@ class AsyncContentsManager(ContentsManager):
         model = await self.get(new_path, content=False)
         return model
 
+    async def save_patch(self, path, patch, expected_hash=None, expected_etag=None):
+        """Save a notebook by applying a JSON patch to its current content.
+
+        See :meth:`ContentsManager.save_patch`.
+        """
+        path = path.strip("/")
+        etag = await ensure_async(self.get_etag(path)) if expected_etag is not None else None
+        model = await self.get(
+            path, content=True, type="notebook", require_hash=bool(expected_hash)
+        )
+        if expected_etag is not None and not (
+            etag is not None
+            and etag == expected_etag
+            and await ensure_async(self.get_etag(path)) == etag
+        ):
+            raise HTTPError(412, f"Notebook {path!r} has changed, save all of it instead")
+        if expected_hash and model["hash"] != expected_hash:
+            raise HTTPError(412, f"Notebook {path!r} has changed, save all of it instead")
+        nb = apply_json_patch(model["content"], patch)
+        return await self.save({"type": "notebook", "format": "json", "content": nb}, path)
+
+    async def new_upload(self, path):
+        """Start a resumable upload of a file to path and return its upload model.
+
+        See :meth:`ContentsManager.new_upload`.
+        """
+        raise self._uploads_not_supported()
+
+    async def get_upload(self, upload_id):
+        """Get the model of an upload, with the offset to resume it from."""
+        raise self._uploads_not_supported()
+
+    async def open_upload(self, upload_id, offset):
+        """Open an upload to append data received at offset, and return a file object."""
+        raise self._uploads_not_supported()
+
+    async def write_upload(self, fileobj, chunk):
+        """Write a chunk of data to a file returned by open_upload."""
+        raise self._uploads_not_supported()
+
+    async def close_upload(self, fileobj):
+        """Close a file returned by open_upload."""
+        raise self._uploads_not_supported()
+
+    async def finish_upload(self, upload_id):
+        """Commit a complete upload to its path and return its model."""
+        raise self._uploads_not_supported()
+
+    async def delete_upload(self, upload_id):
+        """Abort an upload and remove the data received so far."""
+        raise self._uploads_not_supported()
+
+    async def abort_uploads(self):
+        """Abort all the uploads, when the server stops."""
+
     async def increment_filename(self, filename, path="", insert=""):
         """Increment a filename until it is unique.
 
@@ -1096,6 +1578,7 @@ class AsyncContentsManager(ContentsManager):
         self.log.warning("Trusting notebook %s", path)
         self.notary.mark_cells(nb, True)
         self.check_and_sign(nb, path)
+        self._trust_version += 1
 
     # Part 3: Checkpoints API
     async def create_checkpoint(self, path):
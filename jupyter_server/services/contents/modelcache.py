@@ -0,0 +1,166 @@
+"""
+A cache of contents models for file-based ContentsManagers.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+from jupyter_server.prometheus.metrics import CONTENTS_CACHE_REQUESTS_TOTAL
+
+# files modified this recently may be modified again within the resolution of
+# their modification time, without their stat metadata changing
+RACY_MTIME_NS = 2_000_000_000
+
+
+def is_racy(st: os.stat_result) -> bool:
+    """Whether a file was modified too recently for its stat metadata to identify its version."""
+    return time.time_ns() - st.st_mtime_ns < RACY_MTIME_NS
+
+
+def stat_validator(st: os.stat_result) -> tuple[int, int, int, int]:
+    """Return the stat metadata that identifies a version of a file.
+
+    The change time is included so that changes of permissions are noticed too.
+    """
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns)
+
+
+class ModelCache:
+    """A thread-safe LRU cache of values computed from files.
+
+    Each value is stored with a validator (see :func:`stat_validator`) of the file
+    it was computed from, and is only returned for the same validator.
+    A maxsize of 0 disables the cache.
+    """
+
+    def __init__(self, maxsize: int = 0, kind: str = "model"):
+        self.maxsize = maxsize
+        self.kind = kind
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[t.Any, t.Any]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, os_path: str, validator: t.Any) -> t.Any:
+        """Get the value cached for os_path, or None if it is missing or stale."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            cached = self._entries.get(os_path)
+            if cached is not None and cached[0] == validator:
+                self._entries.move_to_end(os_path)
+                value = cached[1]
+            else:
+                value = None
+        result = "miss" if value is None else "hit"
+        CONTENTS_CACHE_REQUESTS_TOTAL.labels(kind=self.kind, result=result).inc()
+        return value
+
+    def set(self, os_path: str, validator: t.Any, value: t.Any) -> None:
+        """Cache the value computed from os_path, evicting the least recently used values."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[os_path] = (validator, value)
+            self._entries.move_to_end(os_path)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, os_path: str) -> None:
+        """Drop the values cached for os_path and, if it is a directory, for its contents."""
+        prefix = os_path.rstrip(os.sep) + os.sep
+        with self._lock:
+            for key in [k for k in self._entries if k == os_path or k.startswith(prefix)]:
+                del self._entries[key]
+
+    def resize(self, maxsize: int) -> None:
+        """Change the maximum number of cached values."""
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._entries) > max(maxsize, 0):
+                self._entries.popitem(last=False)
+
+
+class HashCache(ModelCache):
+    """A ModelCache of the hashes of files, optionally persisted in an SQLite database.
+
+    Hashes missing from memory are looked up in the database at db_path, if
+    any, so that they outlive the server. The validators of the hashes must be
+    tuples of strings and integers.
+    """
+
+    def __init__(self, maxsize: int = 0, db_path: str = "", log: t.Any = None):
+        super().__init__(maxsize, kind="hash")
+        self.db_path = db_path
+        self.log = log
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+
+    def _execute(self, sql: str, params: tuple[t.Any, ...]) -> list[t.Any]:
+        """Run a statement on the database, or return [] if it is unavailable."""
+        if not self.db_path:
+            return []
+        with self._db_lock:
+            try:
+                if self._db is None:
+                    self._db = sqlite3.connect(
+                        self.db_path, check_same_thread=False, isolation_level=None
+                    )
+                    self._db.execute(
+                        "CREATE TABLE IF NOT EXISTS hashes"
+                        " (path TEXT PRIMARY KEY, validator TEXT NOT NULL, hash TEXT NOT NULL)"
+                    )
+                return self._db.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                if self.log is not None:
+                    self.log.warning("Not persisting hashes in %s: %s", self.db_path, e)
+                self.db_path = ""
+                return []
+
+    def get(self, os_path: str, validator: t.Any) -> t.Any:
+        """Get the hash cached for os_path in memory or in the database."""
+        value = super().get(os_path, validator)
+        if value is None and self.enabled:
+            rows = self._execute("SELECT validator, hash FROM hashes WHERE path = ?", (os_path,))
+            if rows and rows[0][0] == repr(validator):
+                value = rows[0][1]
+                super().set(os_path, validator, value)
+        return value
+
+    def set(self, os_path: str, validator: t.Any, value: t.Any) -> None:
+        """Cache the hash of os_path in memory and in the database."""
+        if not self.enabled:
+            return
+        super().set(os_path, validator, value)
+        self._execute(
+            "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?)", (os_path, repr(validator), value)
+        )
+
+    def invalidate(self, os_path: str) -> None:
+        """Drop the hashes cached for os_path and, if it is a directory, for its contents."""
+        super().invalidate(os_path)
+        prefix = os_path.rstrip(os.sep) + os.sep
+        self._execute(
+            "DELETE FROM hashes WHERE path = ? OR substr(path, 1, ?) = ?",
+            (os_path, len(prefix), prefix),
+        )
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,182 @@
+"""
+An index of the names of a directory tree, for searching file-based ContentsManagers.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import os
+import threading
+import time
+import typing as t
+
+from .modelcache import RACY_MTIME_NS
+
+
+class ContentsIndex:
+    """A thread-safe in-memory index of the files and directories under a root directory.
+
+    It holds the names of the entries of each directory, and is refreshed
+    incrementally: a directory is only listed again when its modification time
+    changes, which it does when entries are added to, removed from or renamed in
+    it, or when it is invalidated.
+
+    include(entry) decides whether an os.DirEntry is indexed, and a directory
+    walked. Symbolic links to directories are indexed but not walked.
+
+    A full refresh walks the tree without holding the lock, so that the index
+    can be searched, and refreshed incrementally, while it runs.
+    """
+
+    def __init__(self, root: str, include: t.Callable[[os.DirEntry[str]], bool]):
+        self.root = root
+        self._include = include
+        self._lock = threading.Lock()
+        # API path of a directory -> (mtime_ns or None, sorted (name, is_dir) of its entries)
+        self._dirs: dict[str, tuple[int | None, list[tuple[str, bool]]]] = {}
+        self._dirty: set[str] = set()
+        # the indexed directories in the order of iter_entries, None when it changes
+        self._order: list[str] | None = None
+        self.last_refresh: float | None = None
+        # one full refresh at a time, and the directories refreshed meanwhile
+        self._full_refresh_lock = threading.Lock()
+        self._refreshed: set[str] | None = None
+        self._refresh_thread: threading.Thread | None = None
+
+    def __len__(self) -> int:
+        return sum(len(entries) for _, entries in self._dirs.values())
+
+    def invalidate(self, path: str) -> None:
+        """Mark the directory containing the API path as changed."""
+        parent = path.strip("/").rpartition("/")[0]
+        with self._lock:
+            self._dirty.add(parent)
+
+    @property
+    def dirty(self) -> bool:
+        """Whether directories have been invalidated since the last refresh."""
+        return bool(self._dirty)
+
+    def refresh(self, full: bool = True) -> None:
+        """Bring the index up to date.
+
+        Unless full is True, only the directories that were invalidated, and the
+        ones that are not indexed yet, are checked.
+        """
+        if full or self.last_refresh is None:
+            self._full_refresh()
+            return
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            for path in sorted(dirty):
+                if path in self._dirs and self._refresh_tree(self._dirs, path, force={path}):
+                    self._order = None
+            if self._refreshed is not None:
+                self._refreshed |= dirty
+
+    def refresh_in_background(self) -> threading.Thread:
+        """Start a full refresh in a thread, unless one is running, and return the thread."""
+        with self._lock:
+            thread = self._refresh_thread
+            if thread is None or not thread.is_alive():
+                thread = self._refresh_thread = threading.Thread(
+                    target=self.refresh, name="ContentsIndex-refresh", daemon=True
+                )
+                thread.start()
+        return thread
+
+    def _full_refresh(self) -> None:
+        with self._full_refresh_lock:
+            with self._lock:
+                dirty, self._dirty = self._dirty, set()
+                dirs = dict(self._dirs)
+                self._refreshed = set()
+            try:
+                changed = self._refresh_tree(dirs, "", force=dirty)
+            finally:
+                with self._lock:
+                    refreshed, self._refreshed = self._refreshed, None
+                    # the incremental refreshes made meanwhile are made again
+                    self._dirty |= refreshed
+            with self._lock:
+                self._dirs = dirs
+                if changed or refreshed:
+                    self._order = None
+                self.last_refresh = time.monotonic()
+
+    def _refresh_tree(
+        self,
+        dirs: dict[str, tuple[int | None, list[tuple[str, bool]]]],
+        top: str,
+        force: set[str],
+    ) -> bool:
+        """Refresh the listings in dirs of the tree at top, and return whether
+        directories were added or removed."""
+        changed = False
+        seen = set()
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            indexed = dirs.get(path)
+            os_path = os.path.join(self.root, *path.split("/")) if path else self.root
+            try:
+                mtime_ns = os.stat(os_path).st_mtime_ns
+            except OSError:
+                continue
+            if indexed is None or indexed[0] != mtime_ns or path in force:
+                indexed = self._list(os_path, mtime_ns)
+                if indexed is None:
+                    continue
+                if path not in dirs:
+                    changed = True
+                dirs[path] = indexed
+            seen.add(path)
+            pending.extend(f"{path}/{name}".lstrip("/") for name, is_dir in indexed[1] if is_dir)
+        # forget the directories that are gone
+        prefix = f"{top}/" if top else ""
+        for path in [p for p in dirs if (p == top or p.startswith(prefix)) and p not in seen]:
+            del dirs[path]
+            changed = True
+        return changed
+
+    def _list(
+        self, os_path: str, mtime_ns: int
+    ) -> tuple[int | None, list[tuple[str, bool]]] | None:
+        listing = []
+        try:
+            with os.scandir(os_path) as entries:
+                for entry in entries:
+                    try:
+                        if not self._include(entry):
+                            continue
+                        listing.append((entry.name, entry.is_dir(follow_symlinks=False)))
+                    except OSError:
+                        continue
+        except OSError:
+            return None
+        listing.sort()
+        if time.time_ns() - mtime_ns < RACY_MTIME_NS:
+            # list it again on the next refresh
+            return None, listing
+        return mtime_ns, listing
+
+    def iter_entries(self, path: str = "") -> t.Iterator[tuple[str, str, bool]]:
+        """Iterate over the (API path, name, is_dir) of the entries under the directory at path.
+
+        The directories are walked breadth-first, in the order of their names,
+        and their entries are ordered by name.
+        """
+        path = path.strip("/")
+        prefix = f"{path}/" if path else ""
+        with self._lock:
+            if self._order is None:
+                self._order = sorted(
+                    self._dirs, key=lambda p: (p.count("/") if p else -1, p.split("/"))
+                )
+            listings = [
+                (p, self._dirs[p][1]) for p in self._order if p == path or p.startswith(prefix)
+            ]
+        for dir_path, entries in listings:
+            for name, is_dir in entries:
+                yield f"{dir_path}/{name}".lstrip("/"), name, is_dir
@@ -0,0 +1,415 @@
+"""
+Notifications of the changes to the entries of directories, for file-based ContentsManagers.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import typing as t
+
+# inotify(7) constants
+_IN_MODIFY = 0x2
+_IN_ATTRIB = 0x4
+_IN_MOVED_FROM = 0x40
+_IN_MOVED_TO = 0x80
+_IN_CREATE = 0x100
+_IN_DELETE = 0x200
+_IN_DELETE_SELF = 0x400
+_IN_MOVE_SELF = 0x800
+_IN_Q_OVERFLOW = 0x4000
+_IN_IGNORED = 0x8000
+_IN_ONLYDIR = 0x1000000
+_IN_WATCH_MASK = (
+    _IN_MODIFY
+    | _IN_ATTRIB
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+Change = dict[str, str]
+Callback = t.Callable[[list[Change]], t.Any]
+
+
+def _load_inotify() -> t.Any:
+    """Load libc's inotify functions, or return None where they are not available."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def _merge_change(previous: Change | None, change: Change) -> Change | None:
+    """Coalesce two successive changes of the same path, None if they cancel out."""
+    if previous is None:
+        return change
+    before, after = previous["type"], change["type"]
+    if after == "deleted":
+        if before == "created":
+            return None
+        if before == "renamed":
+            return {"type": "deleted", "path": previous["old_path"]}
+        return change
+    if after == "created" and before == "deleted":
+        return {"type": "modified", "path": change["path"]}
+    if after == "modified" and before in {"created", "renamed"}:
+        return previous
+    return change
+
+
+class ContentsWatcher:
+    """Watch directories under a root directory for changes to their entries.
+
+    Directories are watched by API path, non-recursively. The changes are
+    coalesced over ``debounce`` seconds, then passed as a list to the callbacks
+    watching the directories, on the event loops they were registered from. Each
+    change is a dict with a ``type``, one of ``created``, ``modified``, ``deleted``
+    and ``renamed``, the API ``path`` of the entry and, for renames, its
+    ``old_path``. A watched directory whose entries may have changed without
+    notice reports a ``modified`` change of its own path.
+
+    On Linux, the directories are watched with inotify from a single thread.
+    Elsewhere, or if inotify is disabled or fails, the thread lists the watched
+    directories every ``poll_interval`` seconds instead, and reports renames as a
+    deletion and a creation.
+
+    include(name) decides whether changes to an entry are reported.
+    """
+
+    def __init__(
+        self,
+        root: str,
+        include: t.Callable[[str], bool] = lambda name: True,
+        debounce: float = 0.2,
+        poll_interval: float = 2.0,
+        use_inotify: bool = True,
+        log: t.Any = None,
+    ):
+        self.root = root
+        self.include = include
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.log = log
+        self._lock = threading.Lock()
+        # API path of a directory -> {callback: event loop}
+        self._watches: dict[str, dict[Callback, asyncio.AbstractEventLoop]] = {}
+        self._pending: dict[str, Change] = {}
+        self._first_pending: float | None = None
+        self._thread: threading.Thread | None = None
+        self._stop_thread = threading.Event()
+        self._wake = threading.Event()
+        self._libc = _load_inotify() if use_inotify else None
+        self._inotify_fd: int | None = None
+        self._wds: dict[int, str] = {}
+        self._dir_wds: dict[str, int] = {}
+        self._moved_from: dict[int, str] = {}
+        self._snapshots: dict[str, dict[str, tuple[int, int]] | None] = {}
+
+    @property
+    def uses_inotify(self) -> bool:
+        """Whether the directories are watched with inotify rather than polled."""
+        return self._inotify_fd is not None
+
+    def _os_path(self, path: str) -> str:
+        return os.path.join(self.root, *path.split("/")) if path else self.root
+
+    def watch(self, path: str, callback: Callback) -> None:
+        """Call callback with the changes to the entries of the directory at path.
+
+        It must be called from the event loop that will run the callback.
+        """
+        loop = asyncio.get_running_loop()
+        path = path.strip("/")
+        with self._lock:
+            callbacks = self._watches.setdefault(path, {})
+            new_dir = not callbacks
+            callbacks[callback] = loop
+            if new_dir:
+                self._start_watching(path)
+            if self._thread is None:
+                self._stop_thread = threading.Event()
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._stop_thread,), name="ContentsWatcher", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def unwatch(self, path: str, callback: Callback) -> None:
+        """Stop calling callback with the changes of the directory at path."""
+        path = path.strip("/")
+        with self._lock:
+            callbacks = self._watches.get(path)
+            if not callbacks or callbacks.pop(callback, None) is None:
+                return
+            if not callbacks:
+                del self._watches[path]
+                self._stop_watching(path)
+            if not self._watches and self._thread is not None:
+                # the thread exits, and closes the inotify instance
+                self._stop_thread.set()
+                self._thread = None
+        self._wake.set()
+
+    def stop(self) -> None:
+        """Stop watching all directories."""
+        with self._lock:
+            self._watches.clear()
+            for path in list(self._dir_wds):
+                self._stop_watching(path)
+            self._snapshots.clear()
+            self._stop_thread.set()
+            self._thread = None
+        self._wake.set()
+
+    # --- registration, called with the lock held
+
+    def _start_watching(self, path: str) -> None:
+        if self._libc is not None and self._inotify_fd is None:
+            fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                self._inotify_failed("inotify_init1", ctypes.get_errno())
+            else:
+                self._inotify_fd = fd
+        if self._libc is not None and self._inotify_fd is not None:
+            wd = self._libc.inotify_add_watch(
+                self._inotify_fd, os.fsencode(self._os_path(path)), _IN_WATCH_MASK
+            )
+            if wd >= 0 and self._wds.get(wd, path) != path:
+                # the same directory as another watched path, e.g. through a symlink
+                self._snapshots[path] = None
+                return
+            if wd >= 0:
+                self._wds[wd] = path
+                self._dir_wds[path] = wd
+                return
+            error = ctypes.get_errno()
+            if error != errno.ENOSPC:
+                # the directory is gone, or not a directory: report it on the next poll
+                self._queue({"type": "modified", "path": path})
+                return
+            # out of inotify watches, poll all directories from now on
+            self._inotify_failed("inotify_add_watch", error)
+        self._snapshots[path] = None
+
+    def _stop_watching(self, path: str) -> None:
+        self._snapshots.pop(path, None)
+        wd = self._dir_wds.pop(path, None)
+        if wd is not None and self._libc is not None and self._inotify_fd is not None:
+            self._wds.pop(wd, None)
+            self._libc.inotify_rm_watch(self._inotify_fd, wd)
+
+    def _inotify_failed(self, call: str, error: int) -> None:
+        if self.log:
+            self.log.warning(
+                "%s failed (%s), polling directories for changes instead",
+                call,
+                os.strerror(error),
+            )
+        self._libc = None
+        self._close_inotify()
+        for path in self._watches:
+            self._snapshots.setdefault(path, None)
+
+    def _close_inotify(self) -> None:
+        if self._inotify_fd is not None:
+            os.close(self._inotify_fd)
+            self._inotify_fd = None
+        self._wds.clear()
+        self._dir_wds.clear()
+        self._moved_from.clear()
+
+    # --- watcher thread
+
+    def _queue(self, change: Change) -> None:
+        """Coalesce a change with the pending ones, with the lock held."""
+        name = change["path"].rpartition("/")[2]
+        if change["path"] not in self._watches and not self.include(name):
+            if change["type"] == "renamed":
+                # renamed from or to an entry that is not reported
+                change = {"type": "deleted", "path": change["old_path"]}
+                if not self.include(change["path"].rpartition("/")[2]):
+                    return
+            else:
+                return
+        elif change["type"] == "renamed" and not self.include(
+            change["old_path"].rpartition("/")[2]
+        ):
+            change = {"type": "created", "path": change["path"]}
+        merged = _merge_change(self._pending.pop(change["path"], None), change)
+        if merged is not None:
+            self._pending[change["path"]] = merged
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+
+    def _run(self, stop: threading.Event) -> None:
+        next_poll = 0.0
+        while not stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                fd = self._inotify_fd
+                polling = bool(self._snapshots)
+                flush_at = (
+                    None if self._first_pending is None else self._first_pending + self.debounce
+                )
+            timeout = 1.0
+            if polling:
+                timeout = min(timeout, max(next_poll - now, 0))
+            if flush_at is not None:
+                timeout = min(timeout, max(flush_at - now, 0))
+            if fd is not None:
+                try:
+                    readable, _, _ = select.select([fd], [], [], timeout)
+                except (OSError, ValueError):
+                    # closed by another thread
+                    readable = []
+                if readable:
+                    self._read_inotify(fd)
+            elif self._wake.wait(timeout):
+                self._wake.clear()
+            now = time.monotonic()
+            if polling and now >= next_poll:
+                self._poll()
+                next_poll = now + self.poll_interval
+            self._flush()
+        with self._lock:
+            if self._thread is None:
+                self._close_inotify()
+
+    def _read_inotify(self, fd: int) -> None:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        except OSError:
+            return
+        with self._lock:
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle_inotify_event(wd, mask, cookie, name)
+            # a move from a watched directory to an unwatched one
+            for path in self._moved_from.values():
+                self._queue({"type": "deleted", "path": path})
+            self._moved_from.clear()
+
+    def _handle_inotify_event(self, wd: int, mask: int, cookie: int, name: str) -> None:
+        if mask & _IN_Q_OVERFLOW:
+            for path in self._watches:
+                self._queue({"type": "modified", "path": path})
+            return
+        dir_path = self._wds.get(wd)
+        if dir_path is None:
+            return
+        if mask & _IN_IGNORED:
+            self._wds.pop(wd, None)
+            self._dir_wds.pop(dir_path, None)
+            return
+        if mask & (_IN_DELETE_SELF | _IN_MOVE_SELF):
+            self._queue({"type": "deleted", "path": dir_path})
+            return
+        path = f"{dir_path}/{name}".lstrip("/")
+        if mask & _IN_MOVED_FROM:
+            self._moved_from[cookie] = path
+        elif mask & _IN_MOVED_TO:
+            old_path = self._moved_from.pop(cookie, None)
+            if old_path is None:
+                self._queue({"type": "created", "path": path})
+            else:
+                self._queue({"type": "renamed", "path": path, "old_path": old_path})
+        elif mask & _IN_CREATE:
+            self._queue({"type": "created", "path": path})
+        elif mask & _IN_DELETE:
+            self._queue({"type": "deleted", "path": path})
+        elif mask & (_IN_MODIFY | _IN_ATTRIB):
+            self._queue({"type": "modified", "path": path})
+
+    def _snapshot(self, path: str) -> dict[str, tuple[int, int]] | None:
+        snapshot = {}
+        try:
+            with os.scandir(self._os_path(path)) as entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+        return snapshot
+
+    def _poll(self) -> None:
+        with self._lock:
+            paths = list(self._snapshots)
+        for path in paths:
+            snapshot = self._snapshot(path)
+            with self._lock:
+                if path not in self._snapshots:
+                    # unwatched meanwhile
+                    continue
+                previous = self._snapshots[path]
+                self._snapshots[path] = snapshot
+                if previous is None:
+                    continue
+                if snapshot is None:
+                    self._queue({"type": "deleted", "path": path})
+                    continue
+                for name, stat in snapshot.items():
+                    child = f"{path}/{name}".lstrip("/")
+                    if name not in previous:
+                        self._queue({"type": "created", "path": child})
+                    elif previous[name] != stat:
+                        self._queue({"type": "modified", "path": child})
+                for name in previous.keys() - snapshot.keys():
+                    self._queue({"type": "deleted", "path": f"{path}/{name}".lstrip("/")})
+
+    def _flush(self) -> None:
+        with self._lock:
+            if (
+                self._first_pending is None
+                or time.monotonic() < self._first_pending + self.debounce
+            ):
+                return
+            changes = list(self._pending.values())
+            self._pending.clear()
+            self._first_pending = None
+            batches: dict[tuple[Callback, asyncio.AbstractEventLoop], list[Change]] = {}
+            for change in changes:
+                dirs = {change["path"].rpartition("/")[0], change["path"]}
+                if "old_path" in change:
+                    dirs.add(change["old_path"].rpartition("/")[0])
+                for dir_path in dirs:
+                    for callback, loop in self._watches.get(dir_path, {}).items():
+                        batch = batches.setdefault((callback, loop), [])
+                        if not batch or batch[-1] is not change:
+                            batch.append(change)
+        for (callback, loop), batch in batches.items():
+            try:
+                loop.call_soon_threadsafe(callback, batch)
+            except RuntimeError:
+                # the event loop is closed
+                pass
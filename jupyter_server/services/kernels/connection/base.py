@@ -4,18 +4,13 @@ import json
 import struct
 from typing import Any
 
+from jupyter_client.jsonutil import extract_dates
 from jupyter_client.session import Session
 from tornado.websocket import WebSocketHandler
 from traitlets import Float, Instance, Unicode, default
 from traitlets.config import LoggingConfigurable
 
-try:
-    from jupyter_client.jsonutil import json_default
-except ImportError:
-    from jupyter_client.jsonutil import date_default as json_default
-
-from jupyter_client.jsonutil import extract_dates
-
+from jupyter_server import jsonutil
 from jupyter_server.transutils import _i18n
 
 from .abc import KernelWebsocketConnectionABC
@@ -39,7 +34,7 @@ def serialize_binary_message(msg):
     # don't modify msg or buffer list in-place
     msg = msg.copy()
     buffers = list(msg.pop("buffers"))
-    bmsg = json.dumps(msg, default=json_default).encode("utf8")
+    bmsg = jsonutil.dumps(msg).encode("utf8")
     buffers.insert(0, bmsg)
     nbufs = len(buffers)
     offsets = [4 * (nbufs + 1)]
@@ -50,6 +45,50 @@ def serialize_binary_message(msg):
     return b"".join(buffers)
 
 
+def splice_legacy_message(header, msg_list, channel=None):
+    """serialize a message for the legacy protocol without unpacking it
+
+    msg_list holds the JSON-packed header, parent header, metadata and content
+    of the message, followed by its buffers, and header is the unpacked header.
+    The packed parts are copied as they are into the JSON of the message.
+
+    Returns
+    -------
+    The message serialized to bytes, as with jsonutil.dumps or, for a message
+    with buffers, serialize_binary_message, and whether it is binary.
+    """
+    p_header, p_parent, p_metadata, p_content = msg_list[:4]
+    buffers = msg_list[4:]
+    parts = [
+        b'{"header":',
+        p_header,
+        b',"msg_id":',
+        json.dumps(header["msg_id"]).encode("utf8"),
+        b',"msg_type":',
+        json.dumps(header["msg_type"]).encode("utf8"),
+        b',"parent_header":',
+        p_parent,
+        b',"metadata":',
+        p_metadata,
+        b',"content":',
+        p_content,
+    ]
+    if not buffers:
+        parts.append(b',"buffers":[]')
+    if channel:
+        parts.append(b',"channel":' + json.dumps(channel).encode("utf8"))
+    parts.append(b"}")
+    if not buffers:
+        return b"".join(parts), False
+
+    nbufs = len(buffers) + 1
+    offsets = [4 * (nbufs + 1), 4 * (nbufs + 1) + sum(len(part) for part in parts)]
+    for buf in buffers[:-1]:
+        offsets.append(offsets[-1] + memoryview(buf).nbytes)
+    offsets_buf = struct.pack("!" + "I" * (nbufs + 1), nbufs, *offsets)
+    return b"".join([offsets_buf, *parts, *buffers]), True
+
+
 def deserialize_binary_message(bmsg):
     """deserialize a message from a binary blog
 
@@ -70,7 +109,7 @@ def deserialize_binary_message(bmsg):
     bufs = []
     for start, stop in zip(offsets[:-1], offsets[1:], strict=False):
         bufs.append(bmsg[start:stop])
-    msg = json.loads(bufs[0].decode("utf8"))
+    msg = jsonutil.loads(bufs[0].decode("utf8"))
     msg["header"] = extract_dates(msg["header"])
     msg["parent_header"] = extract_dates(msg["parent_header"])
     msg["buffers"] = bufs[1:]
@@ -8,23 +8,24 @@ import time
 import typing as t
 import weakref
 from concurrent.futures import Future
+from hmac import compare_digest
 from textwrap import dedent
 
 from jupyter_client import protocol_version as client_protocol_version  # type:ignore[attr-defined]
+from jupyter_client.session import DELIM
+from jupyter_core.utils import ensure_async
 from tornado import web
+from tornado.escape import utf8
 from tornado.ioloop import IOLoop
 from tornado.websocket import WebSocketClosedError
-from traitlets import Any, Bool, Dict, Float, Instance, Int, List, Unicode, default
-
-try:
-    from jupyter_client.jsonutil import json_default
-except ImportError:
-    from jupyter_client.jsonutil import date_default as json_default
-
-from jupyter_core.utils import ensure_async
+from traitlets import Any, Bool, Dict, Enum, Float, Instance, Int, Type, Unicode, default
 
+from jupyter_server import jsonutil
+from jupyter_server.prometheus.metrics import KERNEL_WEBSOCKET_SEND_QUEUE_BYTES
 from jupyter_server.transutils import _i18n
 
+from ..messagebuffer import OUTPUT_MSG_TYPES, MessageBuffer
+from ..ratelimit import RateLimiter
 from ..websocket import KernelWebsocketHandler
 from .abc import KernelWebsocketConnectionABC
 from .base import (
@@ -33,7 +34,12 @@ from .base import (
     deserialize_msg_from_ws_v1,
     serialize_binary_message,
     serialize_msg_to_ws_v1,
+    splice_legacy_message,
 )
+from .compression import CompressingWriter
+
+# the packers producing JSON, whose packed parts can be copied into the JSON of a message
+JSON_PACKERS = {"json", "orjson"}
 
 
 def _ensure_future(f):
@@ -45,6 +51,45 @@ def _ensure_future(f):
         return f
 
 
+def _check_signature(session, msg_list):
+    """Check the signature of a message, as Session.deserialize does.
+
+    The signature is recorded, so that the message is refused if it is
+    received again. Raises ValueError if the message is unsigned, or if its
+    signature is a duplicate or is invalid.
+    """
+    if session.auth is None:
+        return
+    signature = msg_list[0]
+    if not signature:
+        msg = "Unsigned Message"
+        raise ValueError(msg)
+    if signature in session.digest_history:
+        raise ValueError("Duplicate Signature: %r" % signature)
+    session._add_digest(signature)
+    if not compare_digest(signature, session.sign(msg_list[1:5])):
+        msg = "Invalid Signature: %r" % signature
+        raise ValueError(msg)
+
+
+class _CoalescedStream:
+    """Consecutive stream messages held to be sent as one."""
+
+    __slots__ = ("key", "msg", "nbytes", "parts", "peeked", "stream", "texts", "timeout")
+
+    def __init__(self, key, stream, msg, parts, peeked):
+        # the msg_id of the parent, and the name of the stream
+        self.key = key
+        self.stream = stream
+        # the first message, into which the text of the others is merged
+        self.msg = msg
+        self.parts = parts
+        self.peeked = peeked
+        self.texts: list[str] = []
+        self.nbytes = 0
+        self.timeout = None
+
+
 class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
     """A Jupyter Server Websocket Connection"""
 
@@ -87,6 +132,85 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
         ),
     )
 
+    rate_limit_scope = Enum(
+        ["connection", "kernel", "user"],
+        default_value="connection",
+        config=True,
+        help=_i18n(
+            """The scope of the IOPub rate limits: each connection has its own
+        limits ("connection"), or the limits are shared by all the connections
+        to a kernel ("kernel"), or by all the connections of a user ("user").
+        Each message of a kernel is counted once, whatever the number of
+        connections it is sent to."""
+        ),
+    )
+
+    rate_limiter_class = Type(
+        default_value=RateLimiter,
+        klass=RateLimiter,
+        config=True,
+        help=_i18n("The class used to limit the rate of IOPub messages."),
+    )
+
+    stream_coalesce_window = Float(
+        0,
+        config=True,
+        help=_i18n(
+            """(sec) Time during which the consecutive stream messages of a
+        request to the same stream are merged into one message, to send fewer
+        and larger messages to the client. Any other message sends the merged
+        message first. 0 disables merging."""
+        ),
+    )
+
+    stream_coalesce_max_bytes = Int(
+        65536,
+        config=True,
+        help=_i18n(
+            """(bytes) Size of the merged text after which the merged stream
+        message is sent before the end of stream_coalesce_window."""
+        ),
+    )
+
+    compression_min_size = Int(
+        1024,
+        config=True,
+        help=_i18n(
+            """(bytes) Size below which messages are not compressed, when the
+        client negotiated compression (see ServerApp.websocket_compression_options)."""
+        ),
+    )
+
+    compression_rules = Dict(
+        value_trait=Bool(),
+        config=True,
+        help=_i18n(
+            """Whether to compress the messages of a channel ("iopub"), or of a
+        message type on a channel ("iopub.status"), when the client negotiated
+        compression. The messages of the other channels and types are compressed."""
+        ),
+    )
+
+    compression_thread_size = Int(
+        1048576,
+        config=True,
+        help=_i18n(
+            """(bytes) Size from which messages are compressed in a thread, not
+        to block the event loop. 0 compresses all the messages in the event loop."""
+        ),
+    )
+
+    send_queue_max_bytes = Int(
+        16 * 1024 * 1024,
+        config=True,
+        help=_i18n(
+            """(bytes) Size of the messages written to the websocket and not yet
+        sent to the client above which the connection stops reading the replies
+        of the kernel, and drops the output messages on IOPub, until the size
+        falls to half of it. 0 for no limit."""
+        ),
+    )
+
     websocket_handler = Instance(KernelWebsocketHandler)
 
     @property
@@ -122,14 +246,97 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
 
     session_key = Unicode("")
 
-    _iopub_window_msg_count = Int()
-    _iopub_window_byte_count = Int()
+    # the rate limiters shared by the connections of a kernel or a user
+    _rate_limiters: t.MutableMapping[str, RateLimiter] = weakref.WeakValueDictionary()
+
+    _rate_limiter = Instance(RateLimiter, allow_none=True)
+    _coalesced_stream = Instance(_CoalescedStream, allow_none=True)
+    _writer = Instance(CompressingWriter, allow_none=True)
+
+    # the size of the messages written and not yet sent
+    _send_queue_bytes = Int(0)
+    _send_queue_full = Bool(False)
+    # the number of output messages dropped while the send queue was full, and the
+    # parent header of the first one
+    _send_queue_dropped = Int(0)
+    _send_queue_dropped_parent = Any(allow_none=True)
+    # whether the client was told that the limits were exceeded
     _iopub_msgs_exceeded = Bool(False)
     _iopub_data_exceeded = Bool(False)
-    # Queue of (time stamp, byte count)
-    # Allows you to specify that the byte count should be lowered
-    # by a delta amount at some point in the future.
-    _iopub_window_byte_queue: List[t.Any] = List([])
+
+    def _write_message(self, message, binary=False, channel=None, header=None):
+        """Write a message to the websocket, compressed according to compression_rules.
+
+        header is the header of the message, packed or not.
+        """
+        if self.websocket_handler.get_compression_options() is None:
+            self._track_write(self.write_message(message, binary=binary), message)
+            return
+        if self._writer is None:
+            self._writer = CompressingWriter(
+                self.websocket_handler,
+                min_size=self.compression_min_size,
+                thread_size=self.compression_thread_size,
+            )
+        compress = True
+        rules = self.compression_rules
+        if channel and rules:
+            compress = rules.get(channel, True)
+            if header is not None and any(key.startswith(f"{channel}.") for key in rules):
+                if not isinstance(header, dict):
+                    header = self.session.unpack(header)
+                compress = rules.get(f"{channel}.{header['msg_type']}", compress)
+        self._track_write(self._writer.write(message, binary=binary, compress=compress), message)
+
+    def _track_write(self, future, message):
+        """Count the bytes of a message in the send queue until it has been written."""
+        if not self.send_queue_max_bytes or not isinstance(future, asyncio.Future):
+            return
+        size = len(utf8(message))
+        self._send_queue_bytes += size
+        KERNEL_WEBSOCKET_SEND_QUEUE_BYTES.inc(size)
+        future.add_done_callback(lambda f: self._on_write_done(f, size))
+        if not self._send_queue_full and self._send_queue_bytes > self.send_queue_max_bytes:
+            self._pause_reading()
+
+    def _on_write_done(self, future, size):
+        if not future.cancelled():
+            # the websocket may have closed
+            future.exception()
+        self._send_queue_bytes -= size
+        KERNEL_WEBSOCKET_SEND_QUEUE_BYTES.dec(size)
+        if self._send_queue_full and self._send_queue_bytes <= self.send_queue_max_bytes // 2:
+            self._resume_reading()
+
+    def _pause_reading(self):
+        """Stop reading the replies of the kernel while the send queue is full."""
+        self.log.warning(
+            "Websocket send queue for %s is full (%i bytes), pausing kernel messages",
+            self.session_key,
+            self._send_queue_bytes,
+        )
+        self._send_queue_full = True
+        for name, stream in self.channels.items():
+            # the messages wait in the ZMQ socket, output on IOPub is dropped
+            if name != "iopub" and not stream.closed():
+                stream.stop_on_recv()
+
+    def _resume_reading(self):
+        """Read the replies of the kernel again, once the send queue has drained."""
+        self.log.info("Websocket send queue for %s drained, resuming", self.session_key)
+        self._send_queue_full = False
+        for name, stream in self.channels.items():
+            if name != "iopub" and not stream.closed():
+                stream.on_recv_stream(self.handle_outgoing_message)
+        if self._send_queue_dropped:
+            dropped, parent = self._send_queue_dropped, self._send_queue_dropped_parent
+            self._send_queue_dropped = 0
+            self._send_queue_dropped_parent = None
+            self.write_stderr(
+                f"{dropped} output messages from the kernel were dropped, "
+                "because the client was not receiving them fast enough.",
+                parent or {},
+            )
 
     @classmethod
     async def close_all(cls):
@@ -150,7 +357,13 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
     def create_stream(self):
         """Create a stream."""
         identity = self.session.bsession
+        # IOPub messages are the same for all the clients of a kernel,
+        # which share one subscription when the kernel manager allows it
+        connect_shared_iopub = getattr(self.multi_kernel_manager, "connect_shared_iopub", None)
         for channel in ("iopub", "shell", "control", "stdin"):
+            if channel == "iopub" and connect_shared_iopub is not None:
+                self.channels[channel] = connect_shared_iopub(self.kernel_id)
+                continue
             meth = getattr(self.kernel_manager, "connect_" + channel)
             self.channels[channel] = stream = meth(identity=identity)
             stream.channel = channel
@@ -401,6 +614,15 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
                     for channel, msg_list in replay_buffer:
                         stream = self.channels[channel]
                         self.handle_outgoing_message(stream, msg_list)
+                if isinstance(replay_buffer, MessageBuffer):
+                    # tell the client where messages are missing
+                    for parent, count in replay_buffer.dropped_parents.values():
+                        self.write_stderr(
+                            f"{count} messages from the kernel were dropped while no client"
+                            " was connected, because the message buffer was full.",
+                            parent,
+                        )
+                    replay_buffer.clear()
 
             connected.add_done_callback(replay)
         else:
@@ -451,6 +673,19 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
         # from the mkm (port-changing restart window).
         self.multi_kernel_manager.notify_disconnect(self.kernel_id)
         self.log.debug("Websocket closed %s", self.session_key)
+        if self._writer is not None:
+            self.log.debug(
+                "Websocket compression for %s: %i bytes compressed to %i",
+                self.session_key,
+                self._writer.bytes_in,
+                self._writer.bytes_out,
+            )
+        # the client is gone, the streams are not to be resumed
+        self._send_queue_full = False
+        held = self._coalesced_stream
+        if held is not None:
+            IOLoop.current().remove_timeout(held.timeout)
+            self._coalesced_stream = None
         # unregister myself as an open session (only if it's really me)
         if self._open_sessions.get(self.session_key) is self.websocket_handler:
             self._open_sessions.pop(self.session_key)
@@ -491,8 +726,14 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
                 self.kernel_id in self.multi_kernel_manager._kernel_connections
                 and self.multi_kernel_manager._kernel_connections[self.kernel_id] == 0
             ):
+                kwargs = {}
+                if held is not None:
+                    # the stream messages held were read from the channels already
+                    _, parts = self._merge_coalesced_stream(held)
+                    msg_list = [DELIM, self.session.sign(parts[:4]), *parts]
+                    kwargs["messages"] = [("iopub", msg_list)]
                 self.multi_kernel_manager.start_buffering(
-                    self.kernel_id, self.session_key, self.channels
+                    self.kernel_id, self.session_key, self.channels, **kwargs
                 )
                 ZMQChannelsWebsocketConnection._open_sockets.remove(self)
                 self._close_future.set_result(None)
@@ -530,7 +771,7 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
             if isinstance(ws_msg, bytes):  # type:ignore[unreachable]
                 msg = deserialize_binary_message(ws_msg)  # type:ignore[unreachable]
             else:
-                msg = json.loads(ws_msg)
+                msg = jsonutil.loads(ws_msg)
             msg_list = []
             channel = msg.pop("channel", None)
 
@@ -563,10 +804,13 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
         msg_list = outgoing_msg
         _, fed_msg_list = self.session.feed_identities(msg_list)
 
+        peeked = None
         if self.subprotocol == "v1.kernel.websocket.jupyter.org":
             msg = {"header": None, "parent_header": None, "content": None}
         else:
-            msg = self.session.deserialize(fed_msg_list)
+            peeked = msg = self._peek_message(fed_msg_list)
+            if msg is None:
+                msg = self.session.deserialize(fed_msg_list)
 
         if isinstance(stream, str):
             stream = self.channels[stream]
@@ -576,14 +820,112 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
 
         self._on_error(channel, msg, parts)
 
+        if self._send_queue_full and channel == "iopub":
+            header = self.get_part("header", msg["header"], parts)
+            msg["header"] = header
+            if header["msg_type"] in OUTPUT_MSG_TYPES:
+                if not self._send_queue_dropped:
+                    self._send_queue_dropped_parent = self.get_part(
+                        "parent_header", msg["parent_header"], parts
+                    )
+                self._send_queue_dropped += 1
+                return
+
+        if self.stream_coalesce_window > 0 and self._coalesce_stream(
+            stream, channel, msg, parts, peeked
+        ):
+            return
+        self._send_outgoing_message(stream, channel, msg, parts, peeked)
+
+    def _send_outgoing_message(self, stream, channel, msg, parts, peeked):
+        """Send a message from a ZMQ socket to the websocket, unless rate limited."""
         if self._limit_rate(channel, msg, parts):
             return
 
         if self.subprotocol == "v1.kernel.websocket.jupyter.org":
             self._on_zmq_reply(stream, parts)
+        elif peeked is not None:
+            self._on_zmq_reply(stream, msg, parts)
         else:
             self._on_zmq_reply(stream, msg)
 
+    def _coalesce_stream(self, stream, channel, msg, parts, peeked):
+        """Hold a stream message to merge it with the next ones, and return whether it was held.
+
+        The messages held are sent as one when stream_coalesce_window has
+        passed since the first one, when their text reaches
+        stream_coalesce_max_bytes, or before any other message.
+        """
+        key = None
+        if channel == "iopub":
+            msg["header"] = self.get_part("header", msg["header"], parts)
+            if msg["header"]["msg_type"] == "stream":
+                msg["parent_header"] = self.get_part("parent_header", msg["parent_header"], parts)
+                msg["content"] = self.get_part("content", msg["content"], parts)
+                key = (msg["parent_header"].get("msg_id"), msg["content"].get("name"))
+
+        pending = self._coalesced_stream
+        if pending is not None and pending.key != key:
+            self._flush_coalesced_stream()
+            pending = None
+        if key is None:
+            return False
+
+        if pending is None:
+            pending = _CoalescedStream(key, stream, msg, parts, peeked)
+            pending.timeout = IOLoop.current().call_later(
+                self.stream_coalesce_window, self._flush_coalesced_stream
+            )
+            self._coalesced_stream = pending
+        text = msg["content"].get("text", "")
+        pending.texts.append(text)
+        pending.nbytes += len(text)
+        if pending.nbytes >= self.stream_coalesce_max_bytes:
+            self._flush_coalesced_stream()
+        return True
+
+    def _flush_coalesced_stream(self):
+        """Send the stream messages held, merged into one."""
+        pending = self._coalesced_stream
+        if pending is None:
+            return
+        self._coalesced_stream = None
+        IOLoop.current().remove_timeout(pending.timeout)
+        msg, parts = self._merge_coalesced_stream(pending)
+        self._send_outgoing_message(pending.stream, "iopub", msg, parts, pending.peeked)
+
+    def _merge_coalesced_stream(self, pending):
+        """Merge the stream messages held, and return the message and its packed parts."""
+        msg, parts = pending.msg, pending.parts
+        if len(pending.texts) > 1:
+            msg["content"] = dict(msg["content"], text="".join(pending.texts))
+            parts = [*parts[:3], self.session.pack(msg["content"]), *parts[4:]]
+        return msg, parts
+
+    def _peek_message(self, msg_list):
+        """Check the signature of a message and unpack its header only.
+
+        The other parts are unpacked by get_part when they are needed, and
+        the message is serialized for the websocket by splicing its packed
+        parts, which _on_error replaces when it changes them.
+
+        Returns None when the message must be deserialized: when the session
+        does not pack messages as JSON, or the message is from another version
+        of the protocol and has to be adapted.
+        """
+        session = self.session
+        if session.packer not in JSON_PACKERS or session.unpacker not in JSON_PACKERS:
+            return None
+        if len(msg_list) < 5:
+            return None
+        header = session.unpack(msg_list[1])
+        version = str(header.get("version", "")).split(".")[0]
+        if "date" not in header or version != client_protocol_version.split(".")[0]:
+            # Session.deserialize checks the signature
+            return None
+        _check_signature(session, msg_list)
+        return {"header": header, "parent_header": None, "content": None}
+
     def get_part(self, field, value, msg_list):
         """Get a part of a message."""
         if value is None:
@@ -618,10 +960,21 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
             buf = serialize_binary_message(msg)
             return buf
         else:
-            return json.dumps(msg, default=json_default)
+            return jsonutil.dumps(msg)
+
+    def _splice_reply(self, msg, parts, channel=None):
+        """Serialize a message returned by _peek_message for the legacy protocol.
 
-    def _on_zmq_reply(self, stream, msg_list):
-        """Handle a zmq reply."""
+        Returns the serialized message, and whether it is binary.
+        """
+        return splice_legacy_message(msg["header"], parts, channel)
+
+    def _on_zmq_reply(self, stream, msg_list, parts=None):
+        """Handle a zmq reply.
+
+        For the legacy protocol, parts are the packed parts of a message
+        returned by _peek_message, to be spliced into the reply.
+        """
         # Sometimes this gets triggered when the on_close method is scheduled in the
         # eventloop but hasn't been called.
         if stream.closed():
@@ -631,15 +984,20 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
         channel = getattr(stream, "channel", None)
         if self.subprotocol == "v1.kernel.websocket.jupyter.org":
             bin_msg = serialize_msg_to_ws_v1(msg_list, channel)
-            self.write_message(bin_msg, binary=True)
+            self._write_message(bin_msg, binary=True, channel=channel, header=msg_list[0])
         else:
             try:
-                msg = self._reserialize_reply(msg_list, channel=channel)
+                if parts is not None:
+                    msg, binary = self._splice_reply(msg_list, parts, channel=channel)
+                else:
+                    msg = self._reserialize_reply(msg_list, channel=channel)
+                    binary = isinstance(msg, bytes)
             except Exception:
                 self.log.critical("Malformed message: %r" % msg_list, exc_info=True)
             else:
+                header = msg_list.get("header") if isinstance(msg_list, dict) else None
                 try:
-                    self.write_message(msg, binary=isinstance(msg, bytes))
+                    self._write_message(msg, binary=binary, channel=channel, header=header)
                 except WebSocketClosedError as e:
                     self.log.warning(str(e))
 
@@ -715,125 +1073,115 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
         )
         if self.subprotocol == "v1.kernel.websocket.jupyter.org":
             bin_msg = serialize_msg_to_ws_v1(err_msg, "iopub", self.session.pack)
-            self.write_message(bin_msg, binary=True)
+            self._write_message(bin_msg, binary=True, channel="iopub", header=err_msg["header"])
         else:
             err_msg["channel"] = "iopub"
-            self.write_message(json.dumps(err_msg, default=json_default))
+            self._write_message(jsonutil.dumps(err_msg), channel="iopub", header=err_msg["header"])
+
+    def _get_rate_limiter(self):
+        """Get the rate limiter of the connection, shared in the scope of the limits."""
+        if self._rate_limiter is not None:
+            return self._rate_limiter
+        key = None
+        if self.rate_limit_scope == "kernel":
+            key = f"kernel:{self.kernel_id}"
+        elif self.rate_limit_scope == "user":
+            user = self.websocket_handler.current_user
+            key = f"user:{getattr(user, 'username', user)}"
+        limiter = self._rate_limiters.get(key) if key else None
+        if limiter is None:
+            limiter = self.rate_limiter_class(
+                msg_rate_limit=self.iopub_msg_rate_limit,
+                data_rate_limit=self.iopub_data_rate_limit,
+                window=self.rate_limit_window,
+            )
+            if key:
+                self._rate_limiters[key] = limiter
+        self._rate_limiter = limiter
+        return limiter
 
     def _limit_rate(self, channel, msg, msg_list):
         """Limit the message rate on a channel."""
         if not (self.limit_rate and channel == "iopub"):
             return False
+        if self.iopub_msg_rate_limit <= 0 and self.iopub_data_rate_limit <= 0:
+            # no need to look at the message
+            return False
 
         msg["header"] = self.get_part("header", msg["header"], msg_list)
+        limiter = self._get_rate_limiter()
 
         msg_type = msg["header"]["msg_type"]
-        if msg_type == "status":
+        if msg_type == "status" and self.rate_limit_scope != "user":
             msg["content"] = self.get_part("content", msg["content"], msg_list)
             if msg["content"].get("execution_state") == "idle":
                 # reset rate limit counter on status=idle,
                 # to avoid 'Run All' hitting limits prematurely.
-                self._iopub_window_byte_queue = []
-                self._iopub_window_msg_count = 0
-                self._iopub_window_byte_count = 0
+                limiter.reset()
                 self._iopub_msgs_exceeded = False
                 self._iopub_data_exceeded = False
 
         if msg_type not in {"status", "comm_open", "execute_input"}:
-            # Remove the counts queued for removal.
-            now = IOLoop.current().time()
-            while len(self._iopub_window_byte_queue) > 0:
-                queued = self._iopub_window_byte_queue[0]
-                if now >= queued[0]:
-                    self._iopub_window_byte_count -= queued[1]
-                    self._iopub_window_msg_count -= 1
-                    del self._iopub_window_byte_queue[0]
-                else:
-                    # This part of the queue hasn't be reached yet, so we can
-                    # abort the loop.
-                    break
-
-            # Increment the bytes and message count
-            self._iopub_window_msg_count += 1
             byte_count = sum(len(x) for x in msg_list) if msg_type == "stream" else 0
-            self._iopub_window_byte_count += byte_count
-
-            # Queue a removal of the byte and message count for a time in the
-            # future, when we are no longer interested in it.
-            self._iopub_window_byte_queue.append((now + self.rate_limit_window, byte_count))
-
-            # Check the limits, set the limit flags, and reset the
-            # message and data counts.
-            msg_rate = float(self._iopub_window_msg_count) / self.rate_limit_window
-            data_rate = float(self._iopub_window_byte_count) / self.rate_limit_window
-
-            # Check the msg rate
-            if self.iopub_msg_rate_limit > 0 and msg_rate > self.iopub_msg_rate_limit:
-                if not self._iopub_msgs_exceeded:
-                    self._iopub_msgs_exceeded = True
-                    msg["parent_header"] = self.get_part(
-                        "parent_header", msg["parent_header"], msg_list
-                    )
-                    self.write_stderr(
-                        dedent(
-                            f"""\
-                    IOPub message rate exceeded.
-                    The Jupyter server will temporarily stop sending output
-                    to the client in order to avoid crashing it.
-                    To change this limit, set the config variable
-                    `--ServerApp.iopub_msg_rate_limit`.
-
-                    Current values:
-                    ServerApp.iopub_msg_rate_limit={self.iopub_msg_rate_limit} (msgs/sec)
-                    ServerApp.rate_limit_window={self.rate_limit_window} (secs)
-                    """
-                        ),
-                        msg["parent_header"],
-                    )
-            # resume once we've got some headroom below the limit
-            elif self._iopub_msgs_exceeded and msg_rate < (0.8 * self.iopub_msg_rate_limit):
+            # a message is counted once by the limiters shared by the connections
+            msg_id = msg["header"].get("msg_id") if self.rate_limit_scope != "connection" else None
+            allowed = limiter.consume(byte_count, IOLoop.current().time(), msg_id)
+
+            # Tell the client when the limits are exceeded, and log when they are not anymore
+            if limiter.msgs_exceeded and not self._iopub_msgs_exceeded:
+                self._iopub_msgs_exceeded = True
+                msg["parent_header"] = self.get_part(
+                    "parent_header", msg["parent_header"], msg_list
+                )
+                self.write_stderr(
+                    dedent(
+                        f"""\
+                IOPub message rate exceeded.
+                The Jupyter server will temporarily stop sending output
+                to the client in order to avoid crashing it.
+                To change this limit, set the config variable
+                `--ServerApp.iopub_msg_rate_limit`.
+
+                Current values:
+                ServerApp.iopub_msg_rate_limit={self.iopub_msg_rate_limit} (msgs/sec)
+                ServerApp.rate_limit_window={self.rate_limit_window} (secs)
+                """
+                    ),
+                    msg["parent_header"],
+                )
+            elif not limiter.msgs_exceeded and self._iopub_msgs_exceeded:
                 self._iopub_msgs_exceeded = False
                 if not self._iopub_data_exceeded:
                     self.log.warning("iopub messages resumed")
 
-            # Check the data rate
-            if self.iopub_data_rate_limit > 0 and data_rate > self.iopub_data_rate_limit:
-                if not self._iopub_data_exceeded:
-                    self._iopub_data_exceeded = True
-                    msg["parent_header"] = self.get_part(
-                        "parent_header", msg["parent_header"], msg_list
-                    )
-                    self.write_stderr(
-                        dedent(
-                            f"""\
-                    IOPub data rate exceeded.
-                    The Jupyter server will temporarily stop sending output
-                    to the client in order to avoid crashing it.
-                    To change this limit, set the config variable
-                    `--ServerApp.iopub_data_rate_limit`.
-
-                    Current values:
-                    ServerApp.iopub_data_rate_limit={self.iopub_data_rate_limit} (bytes/sec)
-                    ServerApp.rate_limit_window={self.rate_limit_window} (secs)
-                    """
-                        ),
-                        msg["parent_header"],
-                    )
-            # resume once we've got some headroom below the limit
-            elif self._iopub_data_exceeded and data_rate < (0.8 * self.iopub_data_rate_limit):
+            if limiter.data_exceeded and not self._iopub_data_exceeded:
+                self._iopub_data_exceeded = True
+                msg["parent_header"] = self.get_part(
+                    "parent_header", msg["parent_header"], msg_list
+                )
+                self.write_stderr(
+                    dedent(
+                        f"""\
+                IOPub data rate exceeded.
+                The Jupyter server will temporarily stop sending output
+                to the client in order to avoid crashing it.
+                To change this limit, set the config variable
+                `--ServerApp.iopub_data_rate_limit`.
+
+                Current values:
+                ServerApp.iopub_data_rate_limit={self.iopub_data_rate_limit} (bytes/sec)
+                ServerApp.rate_limit_window={self.rate_limit_window} (secs)
+                """
+                    ),
+                    msg["parent_header"],
+                )
+            elif not limiter.data_exceeded and self._iopub_data_exceeded:
                 self._iopub_data_exceeded = False
                 if not self._iopub_msgs_exceeded:
                     self.log.warning("iopub messages resumed")
 
-            # If either of the limit flags are set, do not send the message.
-            if self._iopub_msgs_exceeded or self._iopub_data_exceeded:
-                # we didn't send it, remove the current message from the calculus
-                self._iopub_window_msg_count -= 1
-                self._iopub_window_byte_count -= byte_count
-                self._iopub_window_byte_queue.pop(-1)
-                return True
-
-            return False
+            return not allowed
+        return False
 
     def _send_status_message(self, status):
         """Send a status message."""
@@ -843,13 +1191,14 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
             # ensures proper ordering on the IOPub channel
             # that all messages from the stopped kernel have been delivered
             iopub.flush()
+        self._flush_coalesced_stream()
         msg = self.session.msg("status", {"execution_state": status})
         if self.subprotocol == "v1.kernel.websocket.jupyter.org":
             bin_msg = serialize_msg_to_ws_v1(msg, "iopub", self.session.pack)
-            self.write_message(bin_msg, binary=True)
+            self._write_message(bin_msg, binary=True, channel="iopub", header=msg["header"])
         else:
             msg["channel"] = "iopub"
-            self.write_message(json.dumps(msg, default=json_default))
+            self._write_message(jsonutil.dumps(msg), channel="iopub", header=msg["header"])
 
     def on_kernel_restarted(self):
         """Handle a kernel restart."""
@@ -872,9 +1221,10 @@ class ZMQChannelsWebsocketConnection(BaseKernelWebsocketConnection):
                 msg["content"] = self.get_part("content", msg["content"], msg_list)
                 msg["content"]["ename"] = "ExecutionError"
                 msg["content"]["evalue"] = "Execution error"
-                msg["content"]["traceback"] = [self.kernel_manager.traceback_replacement_message]
-                if self.subprotocol == "v1.kernel.websocket.jupyter.org":
-                    msg_list[3] = self.session.pack(msg["content"])
+                msg["content"]["traceback"] = [
+                    self.multi_kernel_manager.traceback_replacement_message
+                ]
+                msg_list[3] = self.session.pack(msg["content"])
 
 
 KernelWebsocketConnectionABC.register(ZMQChannelsWebsocketConnection)
@@ -0,0 +1,135 @@
+"""Per-message compression of the frames of kernel websockets."""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import typing as t
+from collections import deque
+
+from tornado.concurrent import Future, chain_future
+from tornado.escape import utf8
+from tornado.ioloop import IOLoop
+from tornado.iostream import StreamClosedError
+from tornado.websocket import WebSocketClosedError, WebSocketHandler
+
+from jupyter_server.prometheus.metrics import KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL
+
+# the private attributes of tornado's websocket protocol used to write frames
+PROTOCOL_ATTRIBUTES = ("_compressor", "_write_frame", "_message_bytes_out", "RSV1")
+
+
+class CompressingWriter:
+    """Write messages to a websocket, compressing only those worth it.
+
+    Tornado compresses every message of a websocket for which the client
+    negotiated permessage-deflate. The protocol allows uncompressed messages
+    too, so messages smaller than min_size, or for which compress is False,
+    are sent as they are. Messages of at least thread_size bytes (0 for none)
+    are compressed in a thread, while the messages written after them wait, in
+    order, as the state of the compressor is shared by the messages.
+
+    The bytes of the messages compressed, before and after compression, are
+    counted in bytes_in and bytes_out.
+
+    Frames are written with private attributes of tornado's websocket protocol.
+    If a version of tornado does not have them, every message is written with
+    write_message, and compressed as tornado does.
+    """
+
+    def __init__(self, handler: WebSocketHandler, min_size: int = 0, thread_size: int = 0):
+        self.handler = handler
+        self.min_size = min_size
+        self.thread_size = thread_size
+        self.bytes_in = 0
+        self.bytes_out = 0
+        # the frames waiting for a frame being compressed in a thread
+        self._waiting: deque[tuple[bytes, bool, bool, Future[t.Any]]] | None = None
+        # whether the websocket protocol has PROTOCOL_ATTRIBUTES, once connected
+        self._supported: bool | None = None
+
+    def write(
+        self, message: str | bytes, binary: bool = False, compress: bool = True
+    ) -> Future[t.Any]:
+        """Write a message to the websocket, compressed or not.
+
+        Returns a future resolved when the message has been written.
+        """
+        ws = self.handler.ws_connection
+        if ws is None or ws.is_closing():
+            raise WebSocketClosedError()
+        if self._supported is None:
+            self._supported = all(hasattr(ws, name) for name in PROTOCOL_ATTRIBUTES)
+        if not self._supported or ws._compressor is None:  # type:ignore[attr-defined]
+            # permessage-deflate was not negotiated
+            return self.handler.write_message(message, binary=binary)
+        data = utf8(message)
+        if self._waiting is not None:
+            future: Future[t.Any] = Future()
+            self._waiting.append((data, binary, compress, future))
+            return future
+        return self._write(data, binary, compress)
+
+    def _write(self, data: bytes, binary: bool, compress: bool) -> Future[t.Any]:
+        compressor = self.handler.ws_connection._compressor  # type:ignore[union-attr]
+        if not compress or len(data) < self.min_size:
+            return self._write_frame(data, binary, len(data), compressed=False)
+        if self.thread_size and len(data) >= self.thread_size:
+            self._waiting = deque()
+            written: Future[t.Any] = Future()
+            compressed = IOLoop.current().run_in_executor(None, compressor.compress, data)
+            compressed.add_done_callback(lambda f: self._compressed(f, data, binary, written))
+            return written
+        return self._write_frame(compressor.compress(data), binary, len(data), compressed=True)
+
+    def _compressed(
+        self, compressed: t.Any, data: bytes, binary: bool, written: Future[t.Any]
+    ) -> None:
+        """Write a frame compressed in a thread, and the frames waiting for it."""
+        waiting = self._take_waiting()
+        # the future of the frame being written
+        current = written
+        try:
+            ws = self.handler.ws_connection
+            if ws is None or ws.is_closing():
+                raise WebSocketClosedError()
+            chain_future(
+                self._write_frame(compressed.result(), binary, len(data), compressed=True),
+                written,
+            )
+            while waiting and self._waiting is None:
+                next_data, next_binary, next_compress, current = waiting.popleft()
+                chain_future(self._write(next_data, next_binary, next_compress), current)
+        except Exception as e:
+            for future in [current, *(frame[-1] for frame in waiting)]:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        if self._waiting is not None:
+            # another frame is being compressed
+            self._waiting.extend(waiting)
+
+    def _take_waiting(self) -> deque[tuple[bytes, bool, bool, Future[t.Any]]]:
+        """Return the frames waiting for the frame compressed in a thread, and stop holding them."""
+        waiting = self._waiting or deque()
+        self._waiting = None
+        return waiting
+
+    def _write_frame(self, data: bytes, binary: bool, size: int, compressed: bool) -> Future[t.Any]:
+        ws = t.cast(t.Any, self.handler.ws_connection)
+        ws._message_bytes_out += size
+        if compressed:
+            self.bytes_in += size
+            self.bytes_out += len(data)
+            KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL.labels(stage="uncompressed").inc(size)
+            KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL.labels(stage="compressed").inc(len(data))
+        opcode = 0x2 if binary else 0x1
+        try:
+            future: Future[t.Any] = ws._write_frame(
+                True, opcode, data, flags=ws.RSV1 if compressed else 0
+            )
+        except StreamClosedError:
+            raise WebSocketClosedError() from None
+        # the stream may close before the frame is written
+        future.add_done_callback(lambda f: f.exception())
+        return future
@@ -7,14 +7,10 @@ Preliminary documentation at https://github.com/ipython/ipython/wiki/IPEP-16%3A-
 # Distributed under the terms of the Modified BSD License.
 import json
 
-try:
-    from jupyter_client.jsonutil import json_default
-except ImportError:
-    from jupyter_client.jsonutil import date_default as json_default
-
 from jupyter_core.utils import ensure_async
 from tornado import web
 
+from jupyter_server import jsonutil
 from jupyter_server.auth.decorator import authorized
 from jupyter_server.utils import url_escape, url_path_join
 
@@ -39,7 +35,7 @@ class MainKernelHandler(KernelsAPIHandler):
         """Get the list of running kernels."""
         km = self.kernel_manager
         kernels = await ensure_async(km.list_kernels())
-        self.finish(json.dumps(kernels, default=json_default))
+        self.finish(jsonutil.dumps(kernels))
 
     @web.authenticated
     @authorized
@@ -63,7 +59,7 @@ class MainKernelHandler(KernelsAPIHandler):
         location = url_path_join(self.base_url, "api", "kernels", url_escape(kernel_id))
         self.set_header("Location", location)
         self.set_status(201)
-        self.finish(json.dumps(model, default=json_default))
+        self.finish(jsonutil.dumps(model))
 
 
 class KernelHandler(KernelsAPIHandler):
@@ -75,7 +71,7 @@ class KernelHandler(KernelsAPIHandler):
         """Get a kernel model."""
         km = self.kernel_manager
         model = await ensure_async(km.kernel_model(kernel_id))
-        self.finish(json.dumps(model, default=json_default))
+        self.finish(jsonutil.dumps(model))
 
     @web.authenticated
     @authorized
@@ -105,7 +101,7 @@ class KernelActionHandler(KernelsAPIHandler):
                 raise web.HTTPError(500, "Exception restarting kernel") from e
             else:
                 model = await ensure_async(km.kernel_model(kernel_id))
-                self.write(json.dumps(model, default=json_default))
+                self.write(jsonutil.dumps(model))
         self.finish()
 
 
@@ -0,0 +1,147 @@
+"""
+An IOPub subscription to a kernel, shared by all the clients of the kernel.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import logging
+import typing as t
+
+if t.TYPE_CHECKING:
+    from zmq.eventloop.zmqstream import ZMQStream
+
+
+class IOPubChannel:
+    """A client of an :class:`IOPubMultiplexer`, used in place of a ZMQStream.
+
+    It has the part of the ZMQStream API used for IOPub: on_recv,
+    on_recv_stream, stop_on_recv, flush, closed and close. Callbacks get the
+    frames of each message as received by the multiplexer.
+    """
+
+    channel = "iopub"
+
+    def __init__(self, multiplexer: IOPubMultiplexer):
+        self._multiplexer = multiplexer
+        self._callback: t.Callable[[list[bytes]], t.Any] | None = None
+        self._closed = False
+
+    def on_recv(self, callback: t.Callable[[list[bytes]], t.Any] | None, copy: bool = True) -> None:
+        """Register a callback for the messages, or None to stop receiving them."""
+        if self.closed():
+            msg = "Stream is closed"
+            raise OSError(msg)
+        self._callback = callback
+        if callback is None:
+            self._multiplexer._remove(self)
+        else:
+            self._multiplexer._add(self)
+
+    def on_recv_stream(
+        self, callback: t.Callable[[IOPubChannel, list[bytes]], t.Any] | None, copy: bool = True
+    ) -> None:
+        """Register a callback for the messages, called with this channel too."""
+        if callback is None:
+            self.on_recv(None)
+        else:
+            self.on_recv(lambda msg_list: callback(self, msg_list))
+
+    def stop_on_recv(self) -> None:
+        """Stop receiving messages."""
+        self.on_recv(None)
+
+    def flush(self, *args: t.Any, **kwargs: t.Any) -> int:
+        """Deliver the messages already received by the multiplexer."""
+        return self._multiplexer.flush()
+
+    def closed(self) -> bool:
+        return self._closed or self._multiplexer.closed
+
+    def close(self, linger: int | None = None) -> None:
+        """Stop receiving messages, for good."""
+        self._callback = None
+        self._closed = True
+        self._multiplexer._remove(self)
+
+
+class IOPubMultiplexer:
+    """One IOPub subscription to a kernel, whose messages go to several clients.
+
+    IOPub messages are the same for all the clients of a kernel, so instead of
+    each client subscribing with a socket of its own, which receives and copies
+    every message again, the frames received on one socket are passed to the
+    :class:`IOPubChannel` of each client. ``connect`` returns a new ZMQStream
+    subscribed to the IOPub channel of the kernel, e.g. ``KernelManager.connect_iopub``.
+    """
+
+    def __init__(
+        self,
+        connect: t.Callable[..., t.Any],
+        log: logging.Logger | logging.LoggerAdapter[t.Any] | None = None,
+    ):
+        self._connect = connect
+        self.log = log or logging.getLogger(__name__)
+        self._stream: ZMQStream | None = None
+        self._channels: dict[IOPubChannel, None] = {}
+        self.closed = False
+
+    def channel(self) -> IOPubChannel:
+        """Return a new client of the subscription."""
+        return IOPubChannel(self)
+
+    @property
+    def clients(self) -> int:
+        """The number of clients receiving messages."""
+        return len(self._channels)
+
+    def _add(self, channel: IOPubChannel) -> None:
+        self._channels[channel] = None
+        if self._stream is None:
+            self._stream = self._connect()
+            self._stream.on_recv(self._dispatch)
+
+    def _remove(self, channel: IOPubChannel) -> None:
+        self._channels.pop(channel, None)
+
+    def _dispatch(self, msg_list: list[bytes]) -> None:
+        # a copy, since the callbacks may add or remove channels
+        for channel in list(self._channels):
+            callback = channel._callback
+            if callback is None:
+                continue
+            try:
+                callback(msg_list)
+            except Exception:
+                # the other clients still get the message
+                self.log.exception("Error handling an IOPub message")
+
+    def flush(self) -> int:
+        """Deliver the messages already received to the clients."""
+        if self._stream is None or self._stream.closed():
+            return 0
+        flushed: int = self._stream.flush()
+        return flushed
+
+    def reconnect(self) -> None:
+        """Subscribe again, after the ports of the kernel changed."""
+        self._close_stream()
+        if self._channels and not self.closed:
+            self._stream = self._connect()
+            self._stream.on_recv(self._dispatch)
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            if not self._stream.closed():
+                self._stream.stop_on_recv()
+                self._stream.close()
+            self._stream = None
+
+    def close(self) -> None:
+        """Close the subscription, and the channels of all the clients."""
+        self.closed = True
+        for channel in list(self._channels):
+            channel._callback = None
+        self._channels.clear()
+        self._close_stream()
@@ -52,6 +52,8 @@ from traitlets import (
 from jupyter_server import DEFAULT_EVENTS_SCHEMA_PATH
 from jupyter_server._tz import isoformat, utcnow
 from jupyter_server.prometheus.metrics import KERNEL_CURRENTLY_RUNNING_TOTAL
+from jupyter_server.services.kernels.iopub import IOPubMultiplexer
+from jupyter_server.services.kernels.messagebuffer import MessageBuffer
 from jupyter_server.utils import ApiPath, import_item, to_os_path
 
 
@@ -86,6 +88,8 @@ class MappingKernelManager(MultiKernelManager):
 
     _kernel_ports: dict[str, list[int]] = Dict()  # type: ignore[assignment]
 
+    _iopub_multiplexers: dict[str, IOPubMultiplexer] = Dict()  # type: ignore[assignment]
+
     _culler_callback = None
 
     _initialized_culler = False
@@ -149,6 +153,39 @@ class MappingKernelManager(MultiKernelManager):
         """,
     )
 
+    buffer_max_messages = Integer(
+        10000,
+        config=True,
+        help="""The maximum number of messages of a kernel buffered in memory
+        while no frontend is connected (0 for no limit).
+
+        When the buffer is full, the oldest messages are moved to disk, up to
+        buffer_max_spill_bytes, and then dropped, stream and display outputs first.
+        Frontends are told how many messages were dropped when they reconnect.
+        """,
+    )
+
+    buffer_max_bytes = Integer(
+        64 * 1024 * 1024,
+        config=True,
+        help="""The maximum size (in bytes) of the messages of a kernel buffered in memory
+        while no frontend is connected (0 for no limit).""",
+    )
+
+    buffer_max_spill_bytes = Integer(
+        0,
+        config=True,
+        help="""The maximum size (in bytes) of the messages of a kernel moved to a
+        temporary file when its buffer is full (0 to drop them instead).""",
+    )
+
+    buffer_spill_dir = Unicode(
+        "",
+        config=True,
+        help="""The directory of the temporary files of kernel message buffers
+        (the default temporary directory if empty).""",
+    )
+
     kernel_info_timeout = Float(
         60,
         config=True,
@@ -207,6 +244,7 @@ class MappingKernelManager(MultiKernelManager):
         """notice that a kernel died"""
         self.log.warning("Kernel %s died, removing from map.", kernel_id)
         self.remove_kernel(kernel_id)
+        self._close_iopub(kernel_id)
 
     def cwd_for_path(self, path, **kwargs):
         """Turn API path into absolute OS path."""
@@ -335,6 +373,7 @@ class MappingKernelManager(MultiKernelManager):
         """
         changed_ports = self._get_changed_ports(kernel_id)
         if changed_ports:
+            self._reconnect_iopub(kernel_id)
             # If changed, update captured ports and return True, else return False.
             self.log.debug("Port change detected for kernel: %s", kernel_id)
             self._kernel_ports[kernel_id] = changed_ports
@@ -357,7 +396,7 @@ class MappingKernelManager(MultiKernelManager):
             return km.ports
         return None
 
-    def start_buffering(self, kernel_id, session_key, channels):
+    def start_buffering(self, kernel_id, session_key, channels, messages=()):
         """Start buffering messages for a kernel
 
         Parameters
@@ -370,6 +409,9 @@ class MappingKernelManager(MultiKernelManager):
             the buffer will be returned.
         channels : dict({'channel': ZMQStream})
             The zmq channels whose messages should be buffered.
+        messages : list of (channel, msg_parts)
+            The messages already read from the channels and not sent,
+            buffered first.
         """
 
         if not self.buffer_offline_messages:
@@ -384,9 +426,16 @@ class MappingKernelManager(MultiKernelManager):
         buffer_info = self._kernel_buffers[kernel_id]
         # record the session key because only one session can buffer
         buffer_info["session_key"] = session_key
-        # TODO: the buffer should likely be a memory bounded queue, we're starting with a list to keep it simple
-        buffer_info["buffer"] = []
+        buffer_info["buffer"] = MessageBuffer(
+            max_messages=self.buffer_max_messages,
+            max_bytes=self.buffer_max_bytes,
+            max_spill_bytes=self.buffer_max_spill_bytes,
+            spill_dir=self.buffer_spill_dir,
+            unpack=self.get_kernel(kernel_id).session.unpack,
+        )
         buffer_info["channels"] = channels
+        for message in messages:
+            buffer_info["buffer"].append(message)
 
         # forward any future messages to the internal buffer
         def buffer_msg(channel, msg_parts):
@@ -437,7 +486,7 @@ class MappingKernelManager(MultiKernelManager):
         buffer_info = self._kernel_buffers.pop(kernel_id)
         # close buffering streams
         for stream in buffer_info["channels"].values():
-            if not stream.socket.closed:
+            if not stream.closed():
                 stream.on_recv(None)
                 stream.close()
 
@@ -448,6 +497,7 @@ class MappingKernelManager(MultiKernelManager):
                 len(msg_buffer),
                 buffer_info["session_key"],
             )
+        msg_buffer.clear()
 
     async def _async_shutdown_kernel(self, kernel_id, now=False, restart=False):
         """Shutdown a kernel by kernel_id"""
@@ -463,6 +513,7 @@ class MappingKernelManager(MultiKernelManager):
 
         self.stop_watching_activity(kernel_id)
         self.stop_buffering(kernel_id)
+        self._close_iopub(kernel_id)
 
         return await self.pinned_superclass._async_shutdown_kernel(
             self, kernel_id, now=now, restart=restart
@@ -514,6 +565,7 @@ class MappingKernelManager(MultiKernelManager):
         # Re-establish activity watching if ports have changed...
         if self._get_changed_ports(kernel_id) is not None:
             self.stop_watching_activity(kernel_id)
+            self._reconnect_iopub(kernel_id)
             self.execution_state = "starting"
             self.start_watching_activity(kernel_id)
         return future
@@ -615,7 +667,7 @@ class MappingKernelManager(MultiKernelManager):
         # add busy/activity markers:
         kernel.reason = ""
         kernel.last_activity = utcnow()
-        kernel._activity_stream = kernel.connect_iopub()
+        kernel._activity_stream = self.connect_shared_iopub(kernel_id)
         session = Session(
             config=kernel.session.config,
             key=kernel.session.key,
@@ -656,11 +708,36 @@ class MappingKernelManager(MultiKernelManager):
 
         kernel._activity_stream.on_recv(record_activity)
 
+    def connect_shared_iopub(self, kernel_id):
+        """Return a ZMQStream-like IOPub channel of a kernel.
+
+        The IOPub channels of a kernel, for its websocket connections and the
+        tracking of its activity, share one ZMQ subscription.
+        """
+        multiplexer = self._iopub_multiplexers.get(kernel_id)
+        if multiplexer is None:
+            kernel = self.get_kernel(kernel_id)
+            multiplexer = IOPubMultiplexer(kernel.connect_iopub, self.log)
+            self._iopub_multiplexers[kernel_id] = multiplexer
+        return multiplexer.channel()
+
+    def _reconnect_iopub(self, kernel_id):
+        """Subscribe to the IOPub channel of a kernel again, on new ports."""
+        multiplexer = self._iopub_multiplexers.get(kernel_id)
+        if multiplexer is not None:
+            multiplexer.reconnect()
+
+    def _close_iopub(self, kernel_id):
+        """Close the IOPub subscription of a kernel."""
+        multiplexer = self._iopub_multiplexers.pop(kernel_id, None)
+        if multiplexer is not None:
+            multiplexer.close()
+
     def stop_watching_activity(self, kernel_id):
         """Stop watching IOPub messages on a kernel for activity."""
         kernel = self._kernels[kernel_id]
         if getattr(kernel, "_activity_stream", None):
-            if not kernel._activity_stream.socket.closed:
+            if not kernel._activity_stream.closed():
                 kernel._activity_stream.close()
             kernel._activity_stream = None
         if getattr(kernel, "_pending_restart_cleanup", None):
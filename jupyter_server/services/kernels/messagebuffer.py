@@ -0,0 +1,287 @@
+"""
+A bounded buffer of the messages of a kernel, kept while no client is connected.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+import io
+import struct
+import tempfile
+import typing as t
+from collections import OrderedDict
+
+from jupyter_client.session import DELIM
+
+from jupyter_server.prometheus.metrics import (
+    KERNEL_MESSAGE_BUFFER_BYTES,
+    KERNEL_MESSAGE_BUFFER_DROPPED_TOTAL,
+)
+
+# the IOPub messages that may be dropped when the buffer is full
+OUTPUT_MSG_TYPES = {"stream", "display_data", "update_display_data"}
+
+# the distinct parents for which dropped messages are reported
+MAX_DROPPED_PARENTS = 100
+
+_COUNT = struct.Struct("<I")
+_SIZE = struct.Struct("<Q")
+
+
+class _Entry:
+    __slots__ = ("channel", "display_id", "msg_parts", "parent_id", "size")
+
+    def __init__(
+        self,
+        channel: str,
+        msg_parts: list[bytes],
+        size: int,
+        parent_id: str | None,
+        display_id: str | None,
+    ):
+        self.channel = channel
+        self.msg_parts = msg_parts
+        self.size = size
+        # the id of the parent of an output message, None for other messages
+        self.parent_id = parent_id
+        self.display_id = display_id
+
+
+class MessageBuffer:
+    """The messages received from a kernel, in order, as (channel, msg_parts) pairs.
+
+    The buffer holds at most max_messages messages and max_bytes bytes in memory,
+    with 0 meaning no limit. Beyond that, the oldest messages are moved to a
+    temporary file in spill_dir, up to max_spill_bytes, and then dropped, output
+    messages (stream, display_data and update_display_data on IOPub) first.
+
+    Output messages that no frontend would show are dropped when they arrive:
+    the earlier updates of the same display, and the outputs of a request
+    followed by a clear_output message for it. With ``wait=True``, the outputs
+    are only cleared by the next output of the request, so they are dropped
+    when that output arrives. The number of dropped messages,
+    and the parent headers of the dropped output messages, are recorded so that
+    the client can be told.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = 0,
+        max_bytes: int = 0,
+        max_spill_bytes: int = 0,
+        spill_dir: str | None = None,
+        unpack: t.Callable[[bytes], t.Any] | None = None,
+    ):
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_spill_bytes = max_spill_bytes
+        self.spill_dir = spill_dir or None
+        self._unpack = unpack
+        self.dropped = 0
+        self.dropped_parents: OrderedDict[str, tuple[dict[str, t.Any], int]] = OrderedDict()
+        self._entries: OrderedDict[int, _Entry] = OrderedDict()
+        self._outputs: OrderedDict[int, None] = OrderedDict()
+        self._outputs_by_parent: dict[str, dict[int, None]] = {}
+        self._displays: dict[str, int] = {}
+        # the clear_output messages with wait=True awaiting the next output of their parent
+        self._pending_clears: dict[str, int] = {}
+        # the parent headers of the outputs held in memory, with their number
+        self._parents: dict[str, list[t.Any]] = {}
+        self._seq = 0
+        self._bytes = 0
+        self._spill: t.IO[bytes] | None = None
+        self._spilled = 0
+        self._spilled_bytes = 0
+
+    def __len__(self) -> int:
+        return self._spilled + len(self._entries)
+
+    def __bool__(self) -> bool:
+        return len(self) > 0
+
+    @property
+    def nbytes(self) -> int:
+        """The bytes of the messages held in memory."""
+        return self._bytes
+
+    @property
+    def spilled_bytes(self) -> int:
+        """The bytes of the messages moved to disk."""
+        return self._spilled_bytes
+
+    def __iter__(self) -> t.Iterator[tuple[str, list[bytes]]]:
+        if self._spill is not None:
+            self._spill.flush()
+            self._spill.seek(0)
+            for _ in range(self._spilled):
+                yield self._read_spilled()
+        for entry in list(self._entries.values()):
+            yield entry.channel, entry.msg_parts
+
+    def _inspect(
+        self, channel: str, msg_parts: list[bytes]
+    ) -> tuple[str, dict[str, t.Any] | None, str | None, bool]:
+        """Return the type, parent header, display id and wait flag of an IOPub message.
+
+        The display id is the one of an update_display_data message, and the wait
+        flag the one of a clear_output message.
+        """
+        if channel != "iopub" or self._unpack is None:
+            return "", None, None, False
+        try:
+            idx = msg_parts.index(DELIM)
+            msg_type = self._unpack(msg_parts[idx + 2])["msg_type"]
+            if msg_type not in OUTPUT_MSG_TYPES and msg_type != "clear_output":
+                return msg_type, None, None, False
+            parent = self._unpack(msg_parts[idx + 3]) or {}
+            display_id = None
+            wait = False
+            if msg_type == "update_display_data":
+                content = self._unpack(msg_parts[idx + 5])
+                display_id = content.get("transient", {}).get("display_id")
+            elif msg_type == "clear_output":
+                wait = bool(self._unpack(msg_parts[idx + 5]).get("wait"))
+            return msg_type, parent, display_id, wait
+        except Exception:
+            # not a message we can make sense of, keep it as it is
+            return "", None, None, False
+
+    def append(self, item: tuple[str, list[bytes]]) -> None:
+        """Add a (channel, msg_parts) pair to the buffer."""
+        channel, msg_parts = item
+        size = sum(len(part) for part in msg_parts)
+        msg_type, parent, display_id, wait = self._inspect(channel, msg_parts)
+        parent_id = parent.get("msg_id", "") if parent is not None else None
+
+        if msg_type == "clear_output" and parent_id and not wait:
+            # the outputs of the request before it will be cleared anyway
+            for seq in list(self._outputs_by_parent.get(parent_id, ())):
+                self._discard(seq, "coalesced")
+            self._pending_clears.pop(parent_id, None)
+        elif msg_type in ("stream", "display_data") and parent_id in self._pending_clears:
+            # this output clears the outputs of the request before the last clear_output
+            clear_seq = self._pending_clears.pop(parent_id)
+            for seq in list(self._outputs_by_parent.get(parent_id, ())):
+                if seq < clear_seq:
+                    self._discard(seq, "coalesced")
+        if display_id is not None and display_id in self._displays:
+            # only the last update of a display is shown
+            self._discard(self._displays[display_id], "coalesced")
+
+        if self.max_bytes and size > self.max_bytes:
+            self._record_dropped(parent, "overflow")
+            return
+
+        self._seq += 1
+        seq = self._seq
+        self._entries[seq] = _Entry(channel, msg_parts, size, parent_id, display_id)
+        self._bytes += size
+        KERNEL_MESSAGE_BUFFER_BYTES.labels(storage="memory").inc(size)
+        if parent_id is not None:
+            self._outputs[seq] = None
+            if parent_id:
+                self._parents.setdefault(parent_id, [parent, 0])[1] += 1
+                if msg_type != "update_display_data":
+                    # updates of displays are not in the outputs of their parent
+                    self._outputs_by_parent.setdefault(parent_id, {})[seq] = None
+        if display_id is not None:
+            self._displays[display_id] = seq
+        if msg_type == "clear_output" and parent_id and wait:
+            self._pending_clears[parent_id] = seq
+
+        while (self.max_messages and len(self._entries) > self.max_messages) or (
+            self.max_bytes and self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if self._spilled_bytes + self._entries[oldest].size <= self.max_spill_bytes:
+                self._spill_entry(oldest)
+            elif self._outputs:
+                self._discard(next(iter(self._outputs)), "overflow")
+            else:
+                self._discard(oldest, "overflow")
+
+    def _discard(self, seq: int, reason: str) -> None:
+        """Drop a message held in memory."""
+        entry = self._entries[seq]
+        parent = self._parents[entry.parent_id][0] if entry.parent_id else None
+        self._remove(seq)
+        self._record_dropped(parent, reason)
+
+    def _remove(self, seq: int) -> _Entry:
+        entry = self._entries.pop(seq)
+        self._bytes -= entry.size
+        KERNEL_MESSAGE_BUFFER_BYTES.labels(storage="memory").dec(entry.size)
+        self._outputs.pop(seq, None)
+        if entry.parent_id:
+            seqs = self._outputs_by_parent.get(entry.parent_id, {})
+            if seqs.pop(seq, False) is None and not seqs:
+                del self._outputs_by_parent[entry.parent_id]
+            self._parents[entry.parent_id][1] -= 1
+            if not self._parents[entry.parent_id][1]:
+                del self._parents[entry.parent_id]
+        if entry.display_id is not None and self._displays.get(entry.display_id) == seq:
+            del self._displays[entry.display_id]
+        if entry.parent_id and self._pending_clears.get(entry.parent_id) == seq:
+            # the outputs before it are gone from memory too
+            del self._pending_clears[entry.parent_id]
+        return entry
+
+    def _record_dropped(self, parent: dict[str, t.Any] | None, reason: str) -> None:
+        KERNEL_MESSAGE_BUFFER_DROPPED_TOTAL.labels(reason=reason).inc()
+        if reason == "coalesced":
+            # nothing a frontend would show was lost
+            return
+        self.dropped += 1
+        parent = parent or {}
+        key = parent.get("msg_id", "")
+        if key in self.dropped_parents:
+            parent, count = self.dropped_parents[key]
+            self.dropped_parents[key] = (parent, count + 1)
+        elif len(self.dropped_parents) < MAX_DROPPED_PARENTS:
+            self.dropped_parents[key] = (parent, 1)
+
+    def _spill_entry(self, seq: int) -> None:
+        """Move the oldest message held in memory to disk."""
+        entry = self._remove(seq)
+        if self._spill is None:
+            # closed by clear()
+            self._spill = tempfile.TemporaryFile(  # noqa: SIM115
+                prefix="jupyter-kernel-buffer-", dir=self.spill_dir
+            )
+        frames = [entry.channel.encode("utf-8"), *entry.msg_parts]
+        chunks = [_COUNT.pack(len(frames))]
+        for frame in frames:
+            chunks.append(_SIZE.pack(len(frame)))
+            chunks.append(bytes(frame))
+        self._spill.seek(0, io.SEEK_END)
+        self._spill.write(b"".join(chunks))
+        self._spilled += 1
+        self._spilled_bytes += entry.size
+        KERNEL_MESSAGE_BUFFER_BYTES.labels(storage="disk").inc(entry.size)
+
+    def _read_spilled(self) -> tuple[str, list[bytes]]:
+        assert self._spill is not None
+        (count,) = _COUNT.unpack(self._spill.read(_COUNT.size))
+        frames = []
+        for _ in range(count):
+            (size,) = _SIZE.unpack(self._spill.read(_SIZE.size))
+            frames.append(self._spill.read(size))
+        return frames[0].decode("utf-8"), frames[1:]
+
+    def clear(self) -> None:
+        """Remove all the messages, and the temporary file."""
+        KERNEL_MESSAGE_BUFFER_BYTES.labels(storage="memory").dec(self._bytes)
+        KERNEL_MESSAGE_BUFFER_BYTES.labels(storage="disk").dec(self._spilled_bytes)
+        self._entries.clear()
+        self._outputs.clear()
+        self._outputs_by_parent.clear()
+        self._displays.clear()
+        self._pending_clears.clear()
+        self._parents.clear()
+        self._bytes = 0
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+        self._spilled = 0
+        self._spilled_bytes = 0
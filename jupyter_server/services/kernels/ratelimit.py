@@ -0,0 +1,93 @@
+"""
+Limits on the rate of the IOPub messages sent to the clients of kernels.
+"""
+# Copyright (c) Jupyter Development Team.
+# Distributed under the terms of the Modified BSD License.
+
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+
+# the decisions remembered for the messages of shared limiters
+MAX_DECISIONS = 1000
+
+
+class RateLimiter:
+    """Limits on the rate of messages and data over a sliding time window.
+
+    Each message sent is counted until it leaves the window, window seconds
+    later. Once a limit is exceeded, the messages are held back until the rate
+    falls below 80% of the limit. A limit of 0 means no limit.
+
+    A limiter shared by the connections to a kernel, or of a user, is given
+    every message of a kernel once per connection. With the msg_id of the
+    message, it is counted once, and all the connections make the same
+    decision for it.
+
+    The connections use the msgs_exceeded and data_exceeded flags to tell the
+    client when they stop and resume sending messages. Subclasses may count
+    differently by overriding :meth:`consume` and :meth:`reset`.
+    """
+
+    def __init__(
+        self, msg_rate_limit: float = 0, data_rate_limit: float = 0, window: float = 3
+    ) -> None:
+        self.msg_rate_limit = msg_rate_limit
+        self.data_rate_limit = data_rate_limit
+        self.window = window
+        self.msgs_exceeded = False
+        self.data_exceeded = False
+        self._msg_count = 0
+        self._byte_count = 0
+        # (time to leave the window, byte count) of the messages sent
+        self._queue: deque[tuple[float, int]] = deque()
+        # msg_id -> whether the message was sent
+        self._decisions: OrderedDict[str, bool] = OrderedDict()
+
+    def reset(self) -> None:
+        """Forget the messages sent, and lift the limits."""
+        self._queue.clear()
+        self._msg_count = 0
+        self._byte_count = 0
+        self.msgs_exceeded = False
+        self.data_exceeded = False
+
+    def consume(self, byte_count: int, now: float, msg_id: str | None = None) -> bool:
+        """Count a message of byte_count bytes at time now, and return whether to send it.
+
+        The messages that are not sent are not counted. A message with the
+        msg_id of a message already counted is not counted again.
+        """
+        if msg_id is not None:
+            if msg_id in self._decisions:
+                return self._decisions[msg_id]
+            allowed = self.consume(byte_count, now)
+            self._decisions[msg_id] = allowed
+            if len(self._decisions) > MAX_DECISIONS:
+                self._decisions.popitem(last=False)
+            return allowed
+
+        queue = self._queue
+        while queue and queue[0][0] <= now:
+            _, expired = queue.popleft()
+            self._msg_count -= 1
+            self._byte_count -= expired
+
+        msg_rate = (self._msg_count + 1) / self.window
+        data_rate = (self._byte_count + byte_count) / self.window
+        if self.msg_rate_limit > 0 and msg_rate > self.msg_rate_limit:
+            self.msgs_exceeded = True
+        elif self.msgs_exceeded and msg_rate < 0.8 * self.msg_rate_limit:
+            # resume once we've got some headroom below the limit
+            self.msgs_exceeded = False
+        if self.data_rate_limit > 0 and data_rate > self.data_rate_limit:
+            self.data_exceeded = True
+        elif self.data_exceeded and data_rate < 0.8 * self.data_rate_limit:
+            self.data_exceeded = False
+
+        if self.msgs_exceeded or self.data_exceeded:
+            return False
+        self._msg_count += 1
+        self._byte_count += byte_count
+        queue.append((now + self.window, byte_count))
+        return True
@@ -8,16 +8,12 @@ Preliminary documentation at https://github.com/ipython/ipython/wiki/IPEP-16%3A-
 import asyncio
 import json
 
-try:
-    from jupyter_client.jsonutil import json_default
-except ImportError:
-    from jupyter_client.jsonutil import date_default as json_default
-
 from jupyter_client.kernelspec import NoSuchKernel
 from jupyter_client.multikernelmanager import DuplicateKernelError
 from jupyter_core.utils import ensure_async
 from tornado import web
 
+from jupyter_server import jsonutil
 from jupyter_server.auth.decorator import authorized
 from jupyter_server.utils import url_path_join
 
@@ -41,7 +37,7 @@ class SessionRootHandler(SessionsAPIHandler):
         """Get a list of running sessions."""
         sm = self.session_manager
         sessions = await ensure_async(sm.list_sessions())
-        self.finish(json.dumps(sessions, default=json_default))
+        self.finish(jsonutil.dumps(sessions))
 
     @web.authenticated
     @authorized
@@ -113,7 +109,7 @@ class SessionRootHandler(SessionsAPIHandler):
         location = url_path_join(self.base_url, "api", "sessions", s_model["id"])
         self.set_header("Location", location)
         self.set_status(201)
-        self.finish(json.dumps(s_model, default=json_default))
+        self.finish(jsonutil.dumps(s_model))
 
 
 class SessionHandler(SessionsAPIHandler):
@@ -125,7 +121,7 @@ class SessionHandler(SessionsAPIHandler):
         """Get the JSON model for a single session."""
         sm = self.session_manager
         model = await sm.get_session(session_id=session_id)
-        self.finish(json.dumps(model, default=json_default))
+        self.finish(jsonutil.dumps(model))
 
     @web.authenticated
     @authorized
@@ -199,7 +195,7 @@ class SessionHandler(SessionsAPIHandler):
             # If we are not using pending kernels, wait for the kernel to shut down
             if not getattr(km, "use_pending_kernels", None):
                 await fut
-        self.finish(json.dumps(s_model, default=json_default))
+        self.finish(jsonutil.dumps(s_model))
 
     @web.authenticated
     @authorized
@@ -1,6 +1,9 @@
+import asyncio
 import json
+import os
 import pathlib
 import sys
+import time
 import warnings
 from base64 import decodebytes, encodebytes
 from unicodedata import normalize
@@ -28,6 +31,12 @@ def suppress_deprecation_warnings():
         yield
 
 
+def age(path):
+    """Make a file look modified long enough ago for it to have an ETag."""
+    mtime = time.time() - 10
+    os.utime(path, (mtime, mtime))
+
+
 def notebooks_only(dir_model):
     return [nb for nb in dir_model["content"] if nb["type"] == "notebook"]
 
@@ -224,6 +233,106 @@ async def test_get_text_file_hash(jp_fetch, contents, path, name):
     assert model["type"] == "file"
 
 
+async def test_get_partial_contents(jp_fetch, contents, contents_dir):
+    contents_dir.joinpath("partial.txt").write_text("héllo world", encoding="utf-8")
+
+    r = await jp_fetch(
+        "api", "contents", "partial.txt", method="GET", params=dict(offset="7", length="5")
+    )
+    model = json.loads(r.body.decode())
+    assert model["format"] == "text"
+    assert model["content"] == "world"
+    assert model["size"] == len("héllo world".encode())
+
+    # a multi-byte character cut by the end of the range is left out
+    r = await jp_fetch("api", "contents", "partial.txt", method="GET", params=dict(length="2"))
+    model = json.loads(r.body.decode())
+    assert model["format"] == "text"
+    assert model["content"] == "h"
+
+    r = await jp_fetch(
+        "api", "contents", "partial.txt", method="GET", params=dict(length="2", format="base64")
+    )
+    model = json.loads(r.body.decode())
+    assert model["format"] == "base64"
+    assert decodebytes(model["content"].encode("ascii")) == "héllo".encode()[:2]
+
+    r = await jp_fetch("api", "contents", "inroot.blob", method="GET", params=dict(offset="2"))
+    model = json.loads(r.body.decode())
+    assert model["format"] == "base64"
+    assert decodebytes(model["content"].encode("ascii")) == b"root\xff"
+
+    for params in [dict(offset="-1"), dict(length="x"), dict(length="1", type="directory")]:
+        path = "" if params.get("type") else "partial.txt"
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await jp_fetch("api", "contents", path, method="GET", params=params)
+        assert expected_http_error(e, 400)
+
+
+async def test_get_paginated_contents(jp_fetch, contents, contents_dir):
+    listing = contents_dir / "listing"
+    listing.mkdir()
+    for i, name in enumerate(["b.txt", "a.txt", "c.ipynb", "d.txt"]):
+        listing.joinpath(name).write_text("x" * i)
+
+    async def list_names(**params):
+        r = await jp_fetch("api", "contents", "listing", method="GET", params=params)
+        model = json.loads(r.body.decode())
+        assert model["type"] == "directory"
+        assert model["format"] == "json"
+        return [entry["name"] for entry in model["content"]]
+
+    assert await list_names(sort="name") == ["a.txt", "b.txt", "c.ipynb", "d.txt"]
+    assert await list_names(sort="-name", limit="2") == ["d.txt", "c.ipynb"]
+    assert await list_names(sort="name", offset="3", limit="2") == ["d.txt"]
+    assert await list_names(sort="size", filter="*.txt") == ["b.txt", "a.txt", "d.txt"]
+    assert await list_names(sort="name", filter="c*") == ["c.ipynb"]
+    assert len(await list_names(limit="3")) == 3
+
+    for params in [dict(limit="-1"), dict(limit="x"), dict(sort="color")]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await jp_fetch("api", "contents", "listing", method="GET", params=params)
+        assert expected_http_error(e, 400)
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await jp_fetch("api", "contents", "listing/a.txt", method="GET", params=dict(limit="1"))
+    assert expected_http_error(e, 400)
+
+
+async def test_get_not_modified(jp_fetch, contents, contents_dir):
+    nb_path = "foo/a.ipynb"
+    age(contents_dir / nb_path)
+    r = await jp_fetch("api", "contents", nb_path, method="GET")
+    etag = r.headers["ETag"]
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await jp_fetch("api", "contents", nb_path, method="GET", headers={"If-None-Match": etag})
+    assert expected_http_error(e, 304)
+
+    # trusting a notebook changes its model without changing its file
+    await jp_fetch(
+        "api", "contents", nb_path, "trust", method="POST", allow_nonstandard_methods=True
+    )
+    r = await jp_fetch("api", "contents", nb_path, method="GET", headers={"If-None-Match": etag})
+    assert r.code == 200
+    etag = r.headers["ETag"]
+
+    nb = json.loads(r.body.decode())
+    nb["content"]["cells"].append(new_markdown_cell("changed"))
+    await jp_fetch("api", "contents", nb_path, method="PUT", body=json.dumps(nb))
+    r = await jp_fetch("api", "contents", nb_path, method="GET", headers={"If-None-Match": etag})
+    assert r.code == 200
+    assert r.headers["ETag"] != etag
+    assert json.loads(r.body.decode())["content"]["cells"][-1]["source"] == "changed"
+
+    # directories have no validator, their listings change with their contents
+    r = await jp_fetch("api", "contents", "foo", method="GET")
+    contents_dir.joinpath("foo", "new.txt").write_text("new")
+    r2 = await jp_fetch(
+        "api", "contents", "foo", method="GET", headers={"If-None-Match": r.headers["ETag"]}
+    )
+    assert r2.code == 200
+
+
 async def test_get_404_hidden(jp_fetch, contents, contents_dir):
     # Create text files
     hidden_dir = contents_dir / ".hidden"
@@ -752,6 +861,97 @@ async def test_delete_hidden_file(jp_fetch, contents):
     assert expected_http_error(e, 400)
 
 
+async def test_save_patch(jp_fetch, contents, contents_dir):
+    nb_path = "foo/a.ipynb"
+    age(contents_dir / nb_path)
+    r = await jp_fetch("api", "contents", nb_path, method="GET", params=dict(hash="1"))
+    model = json.loads(r.body.decode())
+    etag = r.headers["ETag"]
+    cell = new_markdown_cell("patched")
+
+    async def save_patch(patch, headers=None, **body):
+        return await jp_fetch(
+            "api",
+            "contents",
+            nb_path,
+            method="PATCH",
+            body=json.dumps({"patch": patch, **body}),
+            headers=headers or {},
+        )
+
+    async def get_etag():
+        age(contents_dir / nb_path)
+        r = await jp_fetch("api", "contents", nb_path, method="GET", params=dict(content="0"))
+        return r.headers["ETag"]
+
+    r = await save_patch(
+        [{"op": "add", "path": "/cells/-", "value": cell}], headers={"If-Match": etag}
+    )
+    assert r.code == 200
+    assert json.loads(r.body.decode())["path"] == nb_path
+    # the notebook was just saved, it may change again without its ETag changing
+    assert "ETag" not in r.headers
+    nb = json.loads((contents_dir / nb_path).read_text(encoding="utf-8"))
+    assert len(nb["cells"]) == len(model["content"]["cells"]) + 1
+    assert "".join(nb["cells"][-1]["source"]) == "patched"
+
+    etag = await get_etag()
+    r = await save_patch(
+        [{"op": "replace", "path": "/cells/0/source", "value": "changed"}],
+        headers={"If-Match": etag},
+    )
+    nb = json.loads((contents_dir / nb_path).read_text(encoding="utf-8"))
+    assert "".join(nb["cells"][0]["source"]) == "changed"
+
+    # the notebook has changed since these versions
+    age(contents_dir / nb_path)
+    for headers, body in [({"If-Match": etag}, {}), ({}, {"hash": model["hash"]})]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await save_patch([], headers=headers, **body)
+        assert expected_http_error(e, 412)
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await save_patch([])
+    assert expected_http_error(e, 428)
+
+    etag = await get_etag()
+    for bad_patch in [{"op": "add"}, [{"op": "move", "path": "/cells/0", "from": "/cells/1"}]]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await save_patch(bad_patch, headers={"If-Match": etag})
+        assert expected_http_error(e, 400)
+
+
+async def test_concurrent_save_patches(jp_fetch, contents, contents_dir):
+    nb_path = "foo/a.ipynb"
+    r = await jp_fetch("api", "contents", nb_path, method="GET", params=dict(hash="1"))
+    model = json.loads(r.body.decode())
+
+    async def save_patch(source):
+        cell = new_markdown_cell(source)
+        try:
+            r = await jp_fetch(
+                "api",
+                "contents",
+                nb_path,
+                method="PATCH",
+                body=json.dumps(
+                    {
+                        "patch": [{"op": "add", "path": "/cells/0", "value": cell}],
+                        "hash": model["hash"],
+                    }
+                ),
+            )
+        except tornado.httpclient.HTTPClientError as e:
+            return e.code
+        return r.code
+
+    # only one of the patches of the same version applies
+    codes = await asyncio.gather(*(save_patch(f"patch {i}") for i in range(4)))
+    assert sorted(codes) == [200, 412, 412, 412]
+    nb = json.loads((contents_dir / nb_path).read_text(encoding="utf-8"))
+    assert len(nb["cells"]) == len(model["content"]["cells"]) + 1
+
+
 async def test_rename(jp_fetch, jp_base_url, contents, contents_dir):
     path = "foo"
     name = "a.ipynb"
@@ -1123,3 +1323,130 @@ async def test_regression_is_hidden(m1, m2, jp_fetch, jp_serverapp, contents, _c
             ".hidden",
         )
     assert expected_http_error(e, 500)
+
+
+async def test_search(jp_fetch, contents, contents_dir):
+    (contents_dir / "searchable" / "sub").mkdir(parents=True)
+    (contents_dir / "searchable" / "one.txt").write_text("hay\nneedle\n")
+    (contents_dir / "searchable" / "sub" / "two.TXT").write_text("hay\n")
+
+    async def search(**params):
+        r = await jp_fetch("api", "search", method="GET", params=params)
+        return json.loads(r.body.decode())
+
+    data = await search(path="searchable", pattern="*.txt")
+    assert [m["path"] for m in data["results"]] == [
+        "searchable/one.txt",
+        "searchable/sub/two.TXT",
+    ]
+    assert data["results"][0]["type"] == "file"
+    assert data["results"][0]["content"] is None
+    assert not data["truncated"]
+
+    data = await search(path="searchable", pattern="*.txt", limit="1")
+    assert [m["path"] for m in data["results"]] == ["searchable/one.txt"]
+    assert data["truncated"]
+
+    data = await search(pattern="searchable/*", content="NEEDLE")
+    assert [m["path"] for m in data["results"]] == ["searchable/one.txt"]
+    assert data["results"][0]["matches"] == [{"line": 2, "text": "needle"}]
+
+    for params, code in [
+        (dict(limit="0"), 400),
+        (dict(limit="x"), 400),
+        (dict(path="nonexistent"), 404),
+    ]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await search(**params)
+        assert expected_http_error(e, code)
+
+
+async def test_batch(jp_fetch, contents, contents_dir):
+    batch_dir = contents_dir / "batch"
+    batch_dir.mkdir()
+    for i in range(40):
+        (batch_dir / f"f{i}.txt").write_text(str(i))
+    (batch_dir / "out").mkdir()
+
+    async def batch(operations):
+        r = await jp_fetch(
+            "api", "batch", method="POST", body=json.dumps({"operations": operations})
+        )
+        assert r.code == 200
+        return json.loads(r.body.decode())["results"]
+
+    results = await batch(
+        [{"op": "delete", "path": f"batch/f{i}.txt"} for i in range(30)]
+        + [{"op": "rename", "path": "batch/f30.txt", "new_path": "batch/out/renamed.txt"}]
+        + [{"op": "copy", "path": "batch/out", "copy_from": "batch/f31.txt"}]
+        + [{"op": "get", "path": "batch/f32.txt", "content": True, "hash": True}]
+        + [
+            {"op": "delete", "path": "batch/missing.txt"},
+            {"op": "rename", "path": "batch/f33.txt"},
+            {"op": "unknown", "path": "batch/f33.txt"},
+            {"op": "get", "path": "batch/.hidden"},
+            "not an operation",
+        ]
+    )
+    assert [r["status"] for r in results[:30]] == [204] * 30
+    assert results[30]["model"]["path"] == "batch/out/renamed.txt"
+    assert results[31]["status"] == 201
+    assert results[31]["model"]["path"] == "batch/out/f31.txt"
+    assert results[32]["model"]["content"] == "32"
+    assert results[32]["model"]["hash"]
+    assert [r["status"] for r in results[33:]] == [404, 400, 400, 404, 400]
+    assert all(r["error"] for r in results[33:])
+    assert sorted(p.name for p in batch_dir.iterdir() if not p.name.startswith(".")) == sorted(
+        [f"f{i}.txt" for i in range(31, 40)] + ["out"]
+    )
+
+    for body in [{}, {"operations": "x"}, []]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await jp_fetch("api", "batch", method="POST", body=json.dumps(body))
+        assert expected_http_error(e, 400)
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar.gz"])
+async def test_archive(jp_fetch, jp_serverapp, contents, contents_dir, archive_format):
+    import io
+    import tarfile
+    import zipfile
+
+    tree = contents_dir / "tree"
+    (tree / "sub" / "empty").mkdir(parents=True)
+    (tree / ".hidden").write_text("secret")
+    (tree / "a.txt").write_text("a" * 100_000)
+    (tree / "sub" / "b.bin").write_bytes(bytes(range(256)) * 10)
+    if sys.platform != "win32":
+        # a link to a parent directory is not walked again
+        (tree / "sub" / "loop").symlink_to(tree, target_is_directory=True)
+
+    r = await jp_fetch("api", "archive", "tree", method="GET", params={"format": archive_format})
+    assert r.headers["Content-Disposition"].endswith(f"tree.{archive_format}")
+    if archive_format == "zip":
+        with zipfile.ZipFile(io.BytesIO(r.body)) as archive:
+            names = [name.rstrip("/") for name in archive.namelist()]
+            files = {name: archive.read(name) for name in names if name in archive.namelist()}
+    else:
+        with tarfile.open(fileobj=io.BytesIO(r.body)) as archive:
+            names = archive.getnames()
+            files = {m.name: archive.extractfile(m).read() for m in archive if m.isfile()}
+    expected = ["tree/a.txt", "tree/sub", "tree/sub/b.bin", "tree/sub/empty"]
+    if sys.platform != "win32":
+        expected.append("tree/sub/loop")
+    assert sorted(names) == expected
+    assert files["tree/a.txt"] == b"a" * 100_000
+    assert files["tree/sub/b.bin"] == bytes(range(256)) * 10
+
+    jp_serverapp.contents_manager.max_archive_size_mb = 1
+    (tree / "big.bin").write_bytes(b"0" * 2 * 1024 * 1024)
+    for args, params, code in [
+        (["tree"], {"format": archive_format}, 413),
+        (["tree"], {"format": "rar"}, 400),
+        (["tree", "a.txt"], {}, 400),
+        (["tree", ".hidden"], {}, 404),
+        (["missing"], {}, 404),
+    ]:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await jp_fetch("api", "archive", *args, method="GET", params=params)
+        assert expected_http_error(e, code)
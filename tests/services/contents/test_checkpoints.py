@@ -1,11 +1,16 @@
+import os
+
 import pytest
 from jupyter_core.utils import ensure_async
 from nbformat import from_dict
 from nbformat.v4 import new_markdown_cell
+from tornado.web import HTTPError
 
 from jupyter_server.services.contents.filecheckpoints import (
+    AsyncBlobCheckpoints,
     AsyncFileCheckpoints,
     AsyncGenericFileCheckpoints,
+    BlobCheckpoints,
     FileCheckpoints,
     GenericFileCheckpoints,
 )
@@ -19,6 +24,8 @@ param_pairs = [
     (LargeFileManager, GenericFileCheckpoints),
     (AsyncLargeFileManager, AsyncFileCheckpoints),
     (AsyncLargeFileManager, AsyncGenericFileCheckpoints),
+    (LargeFileManager, BlobCheckpoints),
+    (AsyncLargeFileManager, AsyncBlobCheckpoints),
 ]
 
 
@@ -128,3 +135,61 @@ async def test_file_checkpoints(contents_manager):
 
     cps = await ensure_async(cm.list_checkpoints(path))
     assert cps == []
+
+
+@pytest.fixture(
+    params=[(LargeFileManager, BlobCheckpoints), (AsyncLargeFileManager, AsyncBlobCheckpoints)]
+)
+def blob_contents_manager(request, contents, tmp_path):
+    file_manager, checkpoints_class = request.param
+    return file_manager(
+        root_dir=str(contents["contents_dir"]),
+        checkpoints_class=checkpoints_class,
+        checkpoints_kwargs={"max_checkpoints": 3, "store_dir": str(tmp_path / "checkpoints")},
+    )
+
+
+async def test_blob_checkpoints(blob_contents_manager):
+    cm: LargeFileManager = blob_contents_manager
+    path = "foo/a.ipynb"
+    model = await ensure_async(cm.get(path))
+    nb = from_dict(model["content"])
+    blobs_dir = os.path.join(cm.checkpoints.store_dir, "blobs")
+
+    def count_blobs():
+        return sum(len(files) for _, _, files in os.walk(blobs_dir))
+
+    # several checkpoints per file, the oldest ones being dropped
+    cps = []
+    for i in range(4):
+        nb.cells.append(new_markdown_cell(f"cell {i}"))
+        await ensure_async(cm.save({"content": nb, "type": "notebook"}, path))
+        cps.append(await ensure_async(cm.create_checkpoint(path)))
+    assert await ensure_async(cm.list_checkpoints(path)) == cps[1:]
+    with pytest.raises(HTTPError):
+        await ensure_async(cm.restore_checkpoint(cps[0]["id"], path))
+    # the unchanged cells are stored once: 3 notebooks of 2 to 4 cells
+    assert count_blobs() == 3 + 4
+
+    await ensure_async(cm.restore_checkpoint(cps[1]["id"], path))
+    model = await ensure_async(cm.get(path))
+    assert [cell.source for cell in model["content"].cells] == ["cell 0", "cell 1"]
+
+    # checkpoints follow the files of renamed directories
+    await ensure_async(cm.rename("foo", "bar"))
+    assert await ensure_async(cm.list_checkpoints("bar/a.ipynb")) == cps[1:]
+    assert await ensure_async(cm.list_checkpoints(path)) == []
+
+    await ensure_async(cm.delete_checkpoint(cps[1]["id"], "bar/a.ipynb"))
+    with pytest.raises(HTTPError):
+        await ensure_async(cm.delete_checkpoint(cps[1]["id"], "bar/a.ipynb"))
+    assert count_blobs() == 2 + 4
+
+    # a file with the same content as a notebook cell shares nothing with it
+    text_cp = await ensure_async(cm.create_checkpoint("bar/a.txt"))
+    await ensure_async(cm.delete("bar"))
+    assert await ensure_async(cm.list_checkpoints("bar/a.ipynb")) == []
+    assert await ensure_async(cm.list_checkpoints("bar/a.txt")) == []
+    assert text_cp["id"] not in {cp["id"] for cp in cps}
+    assert count_blobs() == 0
+    cm.checkpoints._store.close()
@@ -1,4 +1,5 @@
 import contextlib
+import hashlib
 import json
 import logging
 import os
@@ -15,7 +16,9 @@ from tornado.web import HTTPError
 from jupyter_server.services.contents.fileio import (
     AsyncFileManagerMixin,
     FileManagerMixin,
+    atomic_replace,
     atomic_writing,
+    hash_file,
     path_to_intermediate,
     path_to_invalid,
 )
@@ -70,6 +73,55 @@ def test_atomic_writing(tmp_path):
             assert f.read() == "written from symlink"
 
 
+@pytest.mark.parametrize("fsync", ["file", "directory", "none"])
+def test_atomic_replace(tmp_path, fsync):
+    f1 = tmp_path / "penguin"
+    f1.write_text("Before")
+    if os.name != "nt":
+        os.chmod(str(f1), 0o701)
+
+    atomic_replace(str(f1), b"Overwritten", fsync=fsync)
+    assert f1.read_bytes() == b"Overwritten"
+    if os.name != "nt":
+        assert stat.S_IMODE(os.stat(str(f1)).st_mode) == 0o701
+
+    f2 = tmp_path / "flamingo"
+    with contextlib.suppress(AttributeError, NotImplementedError, OSError):
+        os.symlink(str(f1), str(f2))
+        # writing over a file preserves a symlink
+        atomic_replace(str(f2), b"written from symlink", fsync=fsync)
+        assert f2.is_symlink()
+        assert f1.read_bytes() == b"written from symlink"
+
+    # a failed write leaves the file and no temporary file behind
+    with pytest.raises(TypeError):
+        atomic_replace(str(f1), "not bytes", fsync=fsync)
+    assert f1.read_bytes() in {b"Overwritten", b"written from symlink"}
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        ["penguin"] + (["flamingo"] if f2.is_symlink() else [])
+    )
+
+
+def test_hash_file(tmp_path):
+    f = tmp_path / "data"
+    data = os.urandom(3000) * 100
+    f.write_bytes(data)
+    hexdigest, st = hash_file(str(f), "sha256", chunk_size=4096)
+    assert hexdigest == hashlib.sha256(data).hexdigest()
+    assert st.st_size == len(data)
+
+    f.write_bytes(b"")
+    assert hash_file(str(f), "md5")[0] == hashlib.md5(b"").hexdigest()
+
+
+@pytest.mark.skipif(sys.platform.startswith("win"), reason="Windows")
+def test_atomic_replace_umask(handle_umask, tmp_path):
+    os.umask(0o057)
+    f1 = str(tmp_path / "1")
+    atomic_replace(f1, b"1")
+    assert stat.S_IMODE(os.stat(f1).st_mode) == 0o620
+
+
 @pytest.fixture
 def handle_umask():
     global umask
@@ -1,7 +1,11 @@
+import json
+import os
+
 import pytest
 import tornado
 from jupyter_core.utils import ensure_async
 
+from jupyter_server.services.contents.filemanager import FileContentsManager
 from jupyter_server.services.contents.largefilemanager import (
     AsyncLargeFileManager,
     LargeFileManager,
@@ -110,3 +114,160 @@ async def test_save_in_subdirectory(jp_large_contents_manager, tmp_path):
     assert "path" in model
     assert model["name"] == "Untitled.ipynb"
     assert model["path"] == "foo/Untitled.ipynb"
+
+
+async def test_resumable_upload(jp_large_contents_manager, tmp_path):
+    cm = jp_large_contents_manager
+    saved = []
+    cm.register_post_save_hook(lambda model, os_path, **kwargs: saved.append(model["path"]))
+    (tmp_path / "foo").mkdir()
+    (tmp_path / "foo" / "data.bin").write_bytes(b"old content")
+    data = os.urandom(1000)
+
+    upload = await ensure_async(cm.new_upload("foo/data.bin"))
+    assert upload["path"] == "foo/data.bin"
+    assert upload["offset"] == 0
+    upload_id = upload["id"]
+
+    fileobj = await ensure_async(cm.open_upload(upload_id, 0))
+    await ensure_async(cm.write_upload(fileobj, data[:600]))
+    await ensure_async(cm.close_upload(fileobj))
+    assert (await ensure_async(cm.get_upload(upload_id)))["offset"] == 600
+    # the target is untouched until the upload is committed
+    assert (tmp_path / "foo" / "data.bin").read_bytes() == b"old content"
+    assert [m["name"] for m in (await ensure_async(cm.get("foo")))["content"]] == ["data.bin"]
+
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await ensure_async(cm.open_upload(upload_id, 500))
+    assert expected_http_error(e, 409)
+
+    fileobj = await ensure_async(cm.open_upload(upload_id, 600))
+    await ensure_async(cm.write_upload(fileobj, data[600:]))
+    await ensure_async(cm.close_upload(fileobj))
+    model = await ensure_async(cm.finish_upload(upload_id))
+    assert model["path"] == "foo/data.bin"
+    assert model["size"] == len(data)
+    assert (tmp_path / "foo" / "data.bin").read_bytes() == data
+    assert os.listdir(tmp_path / "foo") == ["data.bin"]
+    assert saved == ["foo/data.bin"]
+
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await ensure_async(cm.get_upload(upload_id))
+    assert expected_http_error(e, 404)
+
+
+async def test_abort_upload(jp_large_contents_manager, tmp_path):
+    cm = jp_large_contents_manager
+    upload = await ensure_async(cm.new_upload("data.bin"))
+    await ensure_async(cm.delete_upload(upload["id"]))
+    assert os.listdir(tmp_path) == []
+
+    for path, code in [("missing/data.bin", 404), (".hidden.bin", 400)]:
+        with pytest.raises(tornado.web.HTTPError) as e:
+            await ensure_async(cm.new_upload(path))
+        assert expected_http_error(e, code)
+
+
+async def test_concurrent_upload_writes(jp_large_contents_manager):
+    cm = jp_large_contents_manager
+    upload_id = (await ensure_async(cm.new_upload("data.bin")))["id"]
+    fileobj = await ensure_async(cm.open_upload(upload_id, 0))
+    # a retry while the first request is still writing
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await ensure_async(cm.open_upload(upload_id, 0))
+    assert expected_http_error(e, 409)
+
+    await ensure_async(cm.write_upload(fileobj, b"data"))
+    await ensure_async(cm.close_upload(fileobj))
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await ensure_async(cm.open_upload(upload_id, 0))
+    assert expected_http_error(e, 409)
+    fileobj = await ensure_async(cm.open_upload(upload_id, 4))
+    # a request that fails closes its file without close_upload
+    fileobj.close()
+    fileobj = await ensure_async(cm.open_upload(upload_id, 4))
+    await ensure_async(cm.close_upload(fileobj))
+
+
+async def test_upload_expiry(jp_large_contents_manager, tmp_path):
+    cm = jp_large_contents_manager
+    cm.upload_expiry = 60
+    stale = await ensure_async(cm.new_upload("stale.bin"))
+    active = await ensure_async(cm.new_upload("active.bin"))
+    for upload in cm._uploads.values():
+        upload["last_activity"] -= 120
+        os.utime(upload["tmp_path"], (upload["last_activity"],) * 2)
+    # writing data to an upload is activity
+    fileobj = await ensure_async(cm.open_upload(active["id"], 0))
+    await ensure_async(cm.write_upload(fileobj, b"data"))
+    await ensure_async(cm.close_upload(fileobj))
+
+    # the expired uploads are aborted when an upload starts
+    await ensure_async(cm.new_upload("new.bin"))
+    with pytest.raises(tornado.web.HTTPError) as e:
+        await ensure_async(cm.get_upload(stale["id"]))
+    assert expected_http_error(e, 404)
+    assert (await ensure_async(cm.get_upload(active["id"])))["offset"] == 4
+    assert len(os.listdir(tmp_path)) == 2
+
+    await ensure_async(cm.abort_uploads())
+    assert cm._uploads == {}
+    assert os.listdir(tmp_path) == []
+
+
+async def test_upload_api_not_supported(jp_fetch, jp_serverapp, jp_root_dir, monkeypatch):
+    settings = jp_serverapp.web_app.settings
+    monkeypatch.setitem(
+        settings, "contents_manager", FileContentsManager(root_dir=str(jp_root_dir))
+    )
+    requests = [
+        ("POST", ("api", "uploads"), json.dumps({"path": "data.bin"})),
+        ("GET", ("api", "uploads", "abc"), None),
+        ("PUT", ("api", "uploads", "abc"), b"data"),
+        ("DELETE", ("api", "uploads", "abc"), None),
+    ]
+    for method, path, body in requests:
+        with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+            await jp_fetch(*path, method=method, body=body)
+        assert expected_http_error(e, 501)
+
+
+async def test_upload_api(jp_fetch, jp_root_dir):
+    data = os.urandom(300 * 1024)
+
+    r = await jp_fetch("api", "uploads", method="POST", body=json.dumps({"path": "data.bin"}))
+    assert r.code == 201
+    upload = json.loads(r.body.decode())
+    assert upload["offset"] == 0
+    upload_id = upload["id"]
+
+    r = await jp_fetch(
+        "api", "uploads", upload_id, method="PUT", body=data[:1000], params={"offset": "0"}
+    )
+    assert json.loads(r.body.decode())["offset"] == 1000
+
+    # resuming at the wrong offset is refused
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await jp_fetch("api", "uploads", upload_id, method="PUT", body=b"x", params={"offset": "0"})
+    assert expected_http_error(e, 409)
+
+    r = await jp_fetch("api", "uploads", upload_id, method="GET")
+    offset = json.loads(r.body.decode())["offset"]
+    assert offset == 1000
+
+    r = await jp_fetch(
+        "api",
+        "uploads",
+        upload_id,
+        method="PUT",
+        body=data[offset:],
+        params={"offset": str(offset), "final": "1"},
+    )
+    model = json.loads(r.body.decode())
+    assert model["path"] == "data.bin"
+    assert model["type"] == "file"
+    assert (jp_root_dir / "data.bin").read_bytes() == data
+
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await jp_fetch("api", "uploads", upload_id, method="GET")
+    assert expected_http_error(e, 404)
@@ -11,14 +11,22 @@ from jupyter_core.utils import ensure_async
 from nbformat import ValidationError
 from nbformat import v4 as nbformat
 from nbformat.sign import NotebookNotary
+from prometheus_client import REGISTRY
 from tornado.web import HTTPError
 from traitlets import TraitError
 
+from jupyter_server.services.contents.fileio import TreeCopy
 from jupyter_server.services.contents.filemanager import (
     AsyncFileContentsManager,
     FileContentsManager,
     _get_created_timestamp,
 )
+from jupyter_server.services.contents.manager import (
+    AsyncContentsManager,
+    ContentsManager,
+    _page_models,
+    apply_json_patch,
+)
 
 from ...utils import expected_http_error
 
@@ -88,6 +96,13 @@ def _make_big_dir(contents_manager, api_path):
         print("Directory already exists", err)
 
 
+async def _read_stream(stream):
+    """Collect the chunks of a sync or async contents stream."""
+    if hasattr(stream, "__aiter__"):
+        return [chunk async for chunk in stream]
+    return list(stream)
+
+
 def symlink(jp_contents_manager, src, dst):
     """Make a symlink to src from dst
 
@@ -670,6 +685,304 @@ async def test_get(jp_contents_manager):
         await ensure_async(cm.get("foo", type="file"))
 
 
+async def test_dir_listing_matches_get(jp_file_contents_manager_class, tmp_path):
+    cm = jp_file_contents_manager_class(root_dir=str(tmp_path))
+    _make_dir(cm, "listing/sub")
+    await ensure_async(cm.new(path="listing/a.ipynb"))
+    await ensure_async(cm.new(path="listing/b.txt"))
+    await ensure_async(cm.new(path="listing/c"))
+    (tmp_path / "listing" / ".hidden").write_text("x")
+    symlink(cm, "listing/b.txt", "listing/link.txt")
+    symlink(cm, "listing/sub", "listing/link_dir")
+
+    model = await ensure_async(cm.get("listing"))
+    contents = {entry["name"]: entry for entry in model["content"]}
+    assert sorted(contents) == ["a.ipynb", "b.txt", "c", "link.txt", "link_dir", "sub"]
+    for name, entry in contents.items():
+        assert entry == await ensure_async(cm.get(f"listing/{name}", content=False))
+
+    cm.allow_hidden = True
+    model = await ensure_async(cm.get("listing"))
+    assert ".hidden" in {entry["name"] for entry in model["content"]}
+
+
+async def test_is_writable_override(jp_file_contents_manager_class, tmp_path):
+    class ReadOnlyManager(jp_file_contents_manager_class):
+        def is_writable(self, path):
+            return not path.endswith(".txt")
+
+    cm = ReadOnlyManager(root_dir=str(tmp_path))
+    await ensure_async(cm.new(path="a.ipynb"))
+    await ensure_async(cm.new(path="b.txt"))
+
+    assert (await ensure_async(cm.get("a.ipynb", content=False)))["writable"]
+    assert not (await ensure_async(cm.get("b.txt", content=False)))["writable"]
+    model = await ensure_async(cm.get(""))
+    writable = {entry["name"]: entry["writable"] for entry in model["content"]}
+    assert writable == {"a.ipynb": True, "b.txt": False}
+
+
+@pytest.mark.parametrize("sort", [None, "name", "-name", "mtime", "-mtime", "size", "-size"])
+async def test_list_dir(jp_file_contents_manager_class, tmp_path, sort):
+    cm = jp_file_contents_manager_class(root_dir=str(tmp_path))
+    _make_dir(cm, "listing/sub")
+    for i, name in enumerate(["b.txt", "a.txt", "c.ipynb", "d.txt", ".hidden"]):
+        (tmp_path / "listing" / name).write_text("x" * i)
+        os.utime(tmp_path / "listing" / name, (1e9 - i, 1e9 - i))
+
+    model = await ensure_async(cm.get("listing"))
+    expected = _page_models(model["content"], 0, None, sort, None)
+    if sort is not None:
+        assert await ensure_async(cm.list_dir("listing", sort=sort)) == expected
+    else:
+        assert await ensure_async(cm.list_dir("listing")) == model["content"]
+    assert await ensure_async(cm.list_dir("listing", 1, 2, sort)) == expected[1:3]
+    assert await ensure_async(cm.list_dir("listing", 4, 2, sort)) == expected[4:]
+    assert await ensure_async(cm.list_dir("listing", sort=sort, pattern="*.txt")) == [
+        entry for entry in expected if entry["name"].endswith(".txt")
+    ]
+
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.list_dir("listing", sort="color"))
+    assert expected_http_error(e, 400)
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.list_dir("listing/a.txt"))
+    assert expected_http_error(e, 404)
+
+
+async def test_model_cache(jp_file_contents_manager_class, tmp_path):
+    cm = jp_file_contents_manager_class(root_dir=str(tmp_path), model_cache_size=10)
+    _make_dir(cm, "cached")
+    await ensure_async(cm.new(path="cached/nb.ipynb"))
+    await ensure_async(cm.new(path="cached/a.txt"))
+
+    def cache_requests(kind, result):
+        return REGISTRY.get_sample_value(
+            "jupyter_server_contents_cache_requests_total", {"kind": kind, "result": result}
+        )
+
+    first = await ensure_async(cm.get("cached"))
+    hits = cache_requests("entry", "hit") or 0
+    assert await ensure_async(cm.get("cached")) == first
+    assert cache_requests("entry", "hit") == hits + 2
+
+    # changes made outside of the manager are noticed
+    (tmp_path / "cached" / "a.txt").write_text("changed")
+    contents = {m["name"]: m for m in (await ensure_async(cm.get("cached")))["content"]}
+    assert contents["a.txt"]["size"] == len("changed")
+
+    nb_model = await ensure_async(cm.get("cached/nb.ipynb"))
+    hits = cache_requests("notebook", "hit") or 0
+    cached_model = await ensure_async(cm.get("cached/nb.ipynb"))
+    assert cache_requests("notebook", "hit") == hits + 1
+    assert cached_model["content"] == nb_model["content"]
+    # the cached notebook is not shared with the callers
+    cached_model["content"].cells.append(nbformat.new_code_cell("x = 1"))
+    assert (await ensure_async(cm.get("cached/nb.ipynb")))["content"] == nb_model["content"]
+
+    nb_model["content"].cells.append(nbformat.new_code_cell("y = 2"))
+    await ensure_async(cm.save(nb_model, "cached/nb.ipynb"))
+    saved = await ensure_async(cm.get("cached/nb.ipynb"))
+    assert saved["content"].cells[-1].source == "y = 2"
+
+    await ensure_async(cm.rename_file("cached", "renamed"))
+    assert len(cm._entry_cache) == 0
+    assert len(cm._notebook_cache) == 0
+
+    cm.model_cache_size = 1
+    await ensure_async(cm.get("renamed"))
+    assert len(cm._entry_cache) == 1
+
+
+def test_apply_json_patch():
+    doc = {"cells": [{"source": "a"}, {"source": "b"}], "metadata": {"a/b": 1}}
+    apply_json_patch(
+        doc,
+        [
+            {"op": "test", "path": "/cells/1/source", "value": "b"},
+            {"op": "replace", "path": "/cells/0/source", "value": "c"},
+            {"op": "add", "path": "/cells/1", "value": {"source": "d"}},
+            {"op": "add", "path": "/cells/-", "value": {"source": "e"}},
+            {"op": "remove", "path": "/metadata/a~1b"},
+            {"op": "add", "path": "/metadata/kernelspec", "value": {}},
+        ],
+    )
+    assert doc == {
+        "cells": [{"source": "c"}, {"source": "d"}, {"source": "b"}, {"source": "e"}],
+        "metadata": {"kernelspec": {}},
+    }
+
+    for op, status in [
+        ({"op": "remove", "path": "/cells/4"}, 400),
+        ({"op": "replace", "path": "/metadata/missing", "value": 1}, 400),
+        ({"op": "add", "path": "cells"}, 400),
+        ({"op": "copy", "path": "/cells/0", "from": "/cells/1"}, 400),
+        ({"op": "test", "path": "/cells/0/source", "value": "x"}, 412),
+    ]:
+        with pytest.raises(HTTPError) as e:
+            apply_json_patch(doc, [op])
+        assert expected_http_error(e, status)
+
+
+async def test_search(jp_file_contents_manager_class, tmp_path):
+    cm = jp_file_contents_manager_class(root_dir=str(tmp_path), search_index_interval=3600)
+    base_search = (
+        AsyncContentsManager.search
+        if isinstance(cm, AsyncContentsManager)
+        else ContentsManager.search
+    )
+    for path, text in [
+        ("a/notes.txt", "hello world\nHello again"),
+        ("a/b/data.csv", "x,y"),
+        ("a/.hidden.txt", "hello"),
+        (".hidden/secret.txt", "hello"),
+        ("compiled.pyc", "hello"),
+        ("top.txt", "bye"),
+        ("a/z.txt", ""),
+        ("a/y/deeper/d.txt", ""),
+    ]:
+        (tmp_path / path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / path).write_text(text)
+    await ensure_async(cm.new(path="a/b/deep.ipynb"))
+
+    async def search(*args, **kwargs):
+        results = await ensure_async(cm.search(*args, **kwargs))
+        # the index finds the same results as walking the tree
+        assert results == await ensure_async(base_search(cm, *args, **kwargs))
+        return [model["path"] for model in results]
+
+    assert await search(pattern="*.txt") == [
+        "top.txt",
+        "a/notes.txt",
+        "a/z.txt",
+        "a/y/deeper/d.txt",
+    ]
+    assert await search(pattern="NOTES*") == ["a/notes.txt"]
+    assert await search("a/b") == ["a/b/data.csv", "a/b/deep.ipynb"]
+    assert await search(pattern="a/*/*.csv") == ["a/b/data.csv"]
+    assert await search("a", pattern="*/*.csv") == ["a/b/data.csv"]
+    assert await search(pattern="*", limit=2) == ["a", "top.txt"]
+    results = await ensure_async(cm.search(content="HELLO"))
+    assert [model["path"] for model in results] == ["a/notes.txt"]
+    assert results[0]["type"] == "file"
+    assert results[0]["matches"] == [
+        {"line": 1, "text": "hello world"},
+        {"line": 2, "text": "Hello again"},
+    ]
+    model = (await ensure_async(cm.search("a/b", pattern="*.ipynb")))[0]
+    assert model == await ensure_async(cm.get("a/b/deep.ipynb", content=False))
+
+    # changes made through the contents manager are indexed right away
+    await ensure_async(cm.save({"type": "file", "format": "text", "content": "new"}, "a/new.txt"))
+    await ensure_async(cm.rename("a/b", "a/c"))
+    await ensure_async(cm.delete("top.txt"))
+    assert await search(pattern="*.txt") == [
+        "a/new.txt",
+        "a/notes.txt",
+        "a/z.txt",
+        "a/y/deeper/d.txt",
+    ]
+    assert await search(pattern="*.csv") == ["a/c/data.csv"]
+
+    # other changes once the index is checked again
+    (tmp_path / "a" / "c" / "outside.txt").write_text("")
+    assert await ensure_async(cm.search(pattern="outside*")) == []
+    cm.search_index_interval = 0
+    # the index is checked in the background, and used meanwhile
+    await ensure_async(cm.search(pattern="outside*"))
+    cm._search_index._refresh_thread.join()
+    cm.search_index_interval = 3600
+    assert await search(pattern="outside*") == ["a/c/outside.txt"]
+
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.search("missing"))
+    assert e.value.status_code == 404
+
+
+async def test_save_patch(jp_file_contents_manager_class, tmp_path, monkeypatch):
+    cm = jp_file_contents_manager_class(root_dir=str(tmp_path), model_cache_size=10)
+    await ensure_async(cm.new(path="nb.ipynb"))
+    model = await ensure_async(cm.get("nb.ipynb", require_hash=True))
+
+    cell = nbformat.new_code_cell(["x = 1\n", "y = 2"])
+    saved = await ensure_async(
+        cm.save_patch("nb.ipynb", [{"op": "add", "path": "/cells/-", "value": cell}], model["hash"])
+    )
+    assert saved["type"] == "notebook"
+    # the next patch applies to the copy of the saved notebook in the cache
+    assert len(cm._notebook_cache) == 1
+    await ensure_async(
+        cm.save_patch("nb.ipynb", [{"op": "replace", "path": "/cells/0/outputs", "value": []}])
+    )
+    nb = (await ensure_async(cm.get("nb.ipynb")))["content"]
+    assert [c.source for c in nb.cells] == ["x = 1\ny = 2"]
+
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.save_patch("nb.ipynb", [], model["hash"]))
+    assert expected_http_error(e, 412)
+
+    # the validator is checked against the version patched
+    os_path = cm._get_os_path("nb.ipynb")
+    os.utime(os_path, (1e9, 1e9))
+    etag = await ensure_async(cm.get_etag("nb.ipynb"))
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.save_patch("nb.ipynb", [], expected_etag="other"))
+    assert expected_http_error(e, 412)
+
+    # the notebook changes while it is read
+    etags = iter([etag, "changed"])
+
+    def get_etag(path):
+        return next(etags)
+
+    async def async_get_etag(path):
+        return get_etag(path)
+
+    is_async = isinstance(cm, AsyncContentsManager)
+    monkeypatch.setattr(cm, "get_etag", async_get_etag if is_async else get_etag)
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.save_patch("nb.ipynb", [], expected_etag=etag))
+    assert expected_http_error(e, 412)
+    monkeypatch.undo()
+
+    cell = nbformat.new_markdown_cell("z")
+    patch = [{"op": "add", "path": "/cells/-", "value": cell}]
+    await ensure_async(cm.save_patch("nb.ipynb", patch, expected_etag=etag))
+    assert len((await ensure_async(cm.get("nb.ipynb")))["content"].cells) == 2
+
+
+async def test_get_stream(jp_contents_manager):
+    cm = jp_contents_manager
+    data = os.urandom(1000)
+    with open(cm._get_os_path("data.bin"), "wb") as f:
+        f.write(data)
+
+    chunks = await _read_stream(cm.get_stream("data.bin", chunk_size=300))
+    assert [len(chunk) for chunk in chunks] == [300, 300, 300, 100]
+    assert b"".join(chunks) == data
+
+    chunks = await _read_stream(cm.get_stream("data.bin", offset=250, length=500, chunk_size=300))
+    assert b"".join(chunks) == data[250:750]
+    assert await _read_stream(cm.get_stream("data.bin", offset=2000)) == []
+
+    # the default implementation slices the full model
+    base = AsyncContentsManager if isinstance(cm, AsyncContentsManager) else ContentsManager
+    chunks = await _read_stream(
+        base.get_stream(cm, "data.bin", offset=250, length=500, chunk_size=300)
+    )
+    assert [len(chunk) for chunk in chunks] == [300, 200]
+    assert b"".join(chunks) == data[250:750]
+
+    with pytest.raises(HTTPError) as e:
+        await _read_stream(cm.get_stream("missing.bin"))
+    assert expected_http_error(e, 404)
+
+    _make_dir(cm, "foo")
+    with pytest.raises(HTTPError) as e:
+        await _read_stream(cm.get_stream("foo"))
+    assert expected_http_error(e, 400)
+
+
 async def test_update(jp_contents_manager):
     cm = jp_contents_manager
     # Create a notebook.
@@ -959,6 +1272,74 @@ async def test_copy_big_dir(jp_contents_manager):
     assert exc_info.type is HTTPError
 
 
+async def test_check_folder_size(jp_contents_manager):
+    cm = jp_contents_manager
+    cm.max_copy_folder_size_mb = 1
+    _make_dir(cm, "small")
+    with open(cm._get_os_path("small/data.bin"), "wb") as f:
+        f.write(b"x" * 1000)
+    assert await ensure_async(cm.check_folder_size("small")) is None
+
+    with open(cm._get_os_path("small/big.bin"), "wb") as f:
+        f.write(b"x" * 2 * 1024 * 1024)
+    with pytest.raises(HTTPError) as exc_info:
+        await ensure_async(cm.check_folder_size("small"))
+    assert exc_info.value.status_code == 400
+
+
+async def test_copy_dir_steps(jp_contents_manager, monkeypatch):
+    cm = jp_contents_manager
+    monkeypatch.setattr(TreeCopy, "step_size", 1000)
+    events = []
+    monkeypatch.setattr(cm, "emit", lambda data: events.append(data))
+
+    files = {
+        "a.txt": b"a" * 2500,
+        "empty": b"",
+        ".hidden": b"h",
+        "sub/b.bin": os.urandom(1500),
+        "sub/deeper/c.txt": b"c" * 10,
+    }
+    root = cm._get_os_path("src")
+    for rel_path, data in files.items():
+        os.makedirs(os.path.join(root, os.path.dirname(rel_path)), exist_ok=True)
+        with open(os.path.join(root, rel_path), "wb") as f:
+            f.write(data)
+    os.makedirs(os.path.join(root, "empty dir"))
+
+    copy = await ensure_async(cm.copy("src", "dst"))
+    assert copy["path"] == "dst/src"
+    copied_root = cm._get_os_path("dst/src")
+    for rel_path, data in files.items():
+        with open(os.path.join(copied_root, rel_path), "rb") as f:
+            assert f.read() == data
+    assert os.path.isdir(os.path.join(copied_root, "empty dir"))
+
+    total = sum(len(data) for data in files.values())
+    progress = [e for e in events if e["action"] == "copy_progress"]
+    assert len(progress) > 1
+    assert all(e["path"] == "dst/src" and e["total_bytes"] == total for e in progress)
+    assert [e["copied_bytes"] for e in progress] == sorted(e["copied_bytes"] for e in progress)
+    assert progress[-1]["copied_bytes"] == total
+    assert events[-1] == {"action": "copy", "path": "dst/src", "source_path": "src"}
+
+    # a failed copy is undone
+    calls = []
+
+    def fail_second_step(self, *args):
+        calls.append(None)
+        if len(calls) > 1:
+            raise OSError("disk full")
+        return original_copy_chunk(self, *args)
+
+    original_copy_chunk = TreeCopy._copy_chunk
+    monkeypatch.setattr(TreeCopy, "_copy_chunk", fail_second_step)
+    with pytest.raises(HTTPError) as e:
+        await ensure_async(cm.copy("src", "failed"))
+    assert e.value.status_code == 400
+    assert not os.path.exists(cm._get_os_path("failed/src"))
+
+
 async def test_mark_trusted_cells(jp_contents_manager):
     cm = jp_contents_manager
     nb, name, path = await new_notebook(cm)
@@ -1452,3 +1833,90 @@ async def test_base_model_invalid_timestamp_fallback(jp_contents_manager):
     unix_epoch = datetime(1970, 1, 1, 0, 0, tzinfo=tz.UTC)
     assert result["created"] == unix_epoch
     assert result["last_modified"] == unix_epoch
+
+
+def test_is_hidden_cache(tmp_path):
+    from jupyter_core.paths import is_hidden
+
+    cm = FileContentsManager(root_dir=str(tmp_path))
+    deep = tmp_path.joinpath("a", "b", "c", "d")
+    deep.mkdir(parents=True)
+    tmp_path.joinpath("a", ".h", "e").mkdir(parents=True)
+    for name in ["x.txt", ".y.txt"]:
+        (deep / name).write_text("")
+    paths = [p for p in tmp_path.rglob("*")] + [tmp_path, tmp_path / "a" / "missing" / "f"]
+    for p in paths:
+        assert cm._is_hidden(str(p)) == is_hidden(str(p), str(tmp_path)), p
+    with pytest.raises(ValueError):
+        cm._is_hidden(str(tmp_path.parent))
+
+    # the ancestors are only checked once per directory
+    def ancestor_checks(stat):
+        return sum(str(call.args[0]) == str(tmp_path / "a") for call in stat.call_args_list)
+
+    cm._hidden_dirs.clear()
+    with patch("os.stat", wraps=os.stat) as stat:
+        for name in ["x.txt", ".y.txt", "x.txt"]:
+            assert cm._is_hidden(str(deep / name)) == name.startswith(".")
+    walk = ancestor_checks(stat)
+    assert walk > 0
+
+    # and for every path when the cache is disabled
+    cm.hidden_cache_ttl = 0
+    cm._hidden_dirs.clear()
+    with patch("os.stat", wraps=os.stat) as stat:
+        for name in ["x.txt", ".y.txt", "x.txt"]:
+            assert cm._is_hidden(str(deep / name)) == name.startswith(".")
+    assert ancestor_checks(stat) == 3 * walk
+
+
+async def test_hash_cache(jp_file_contents_manager_class, tmp_path):
+    db_path = str(tmp_path / "hashes.sqlite")
+    root = tmp_path / "root"
+    root.mkdir()
+    cm = jp_file_contents_manager_class(root_dir=str(root), hash_cache_file=db_path)
+    nb = nbformat.new_notebook(cells=[nbformat.new_markdown_cell("x")])
+    await ensure_async(cm.save({"type": "notebook", "content": nb}, "nb.ipynb"))
+    await ensure_async(cm.save({"type": "file", "format": "text", "content": "a"}, "a.txt"))
+
+    def get_hash(cm, path):
+        return ensure_async(cm.get(path, content=False, require_hash=True))
+
+    def age(path):
+        mtime = time.time() - 10
+        os.utime(root / path, (mtime, mtime))
+
+    no_hashing = patch(
+        "jupyter_server.services.contents.filemanager.hash_file", side_effect=AssertionError
+    )
+    for path in ["nb.ipynb", "a.txt"]:
+        age(path)
+    expected = {path: (await get_hash(cm, path))["hash"] for path in ["nb.ipynb", "a.txt"]}
+    # the files are hashed once, not read again
+    with no_hashing:
+        for path, hexdigest in expected.items():
+            assert (await get_hash(cm, path))["hash"] == hexdigest
+
+    # files changed outside of the server are hashed again, but not cached
+    # while they may change again without their modification time changing
+    (root / "a.txt").write_text("b" * 3_000_000)
+    model = await get_hash(cm, "a.txt")
+    assert model["hash"] == (await ensure_async(cm.get("a.txt", require_hash=True)))["hash"]
+    assert model["hash"] != expected["a.txt"]
+    with no_hashing, pytest.raises(AssertionError):
+        await get_hash(cm, "a.txt")
+    age("a.txt")
+    assert (await get_hash(cm, "a.txt"))["hash"] == model["hash"]
+
+    # the hashes outlive the manager in the database
+    cm2 = jp_file_contents_manager_class(root_dir=str(root), hash_cache_file=db_path)
+    with no_hashing:
+        assert (await get_hash(cm2, "a.txt"))["hash"] == model["hash"]
+        assert (await get_hash(cm2, "nb.ipynb"))["hash"] == expected["nb.ipynb"]
+    cm2.hash_algorithm = "md5"
+    assert (await get_hash(cm2, "a.txt"))["hash_algorithm"] == "md5"
+
+    await ensure_async(cm.delete("a.txt"))
+    assert len(cm2._hash_cache._execute("SELECT * FROM hashes", ())) == 1
+    cm._hash_cache.close()
+    cm2._hash_cache.close()
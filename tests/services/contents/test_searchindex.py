@@ -0,0 +1,42 @@
+import threading
+
+from jupyter_server.services.contents.searchindex import ContentsIndex
+
+
+def _paths(index):
+    return [api_path for api_path, _, _ in index.iter_entries()]
+
+
+def test_background_refresh(tmp_path):
+    (tmp_path / "a.txt").write_text("")
+    started = threading.Event()
+    release = threading.Event()
+
+    def include(entry):
+        # the full refresh in the background is held until released
+        if threading.current_thread().name == "ContentsIndex-refresh":
+            started.set()
+            release.wait(5)
+        return True
+
+    index = ContentsIndex(str(tmp_path), include)
+    index.refresh()
+    assert _paths(index) == ["a.txt"]
+
+    thread = index.refresh_in_background()
+    assert started.wait(5)
+    assert index.refresh_in_background() is thread
+
+    # the index is searched and refreshed incrementally meanwhile
+    (tmp_path / "b.txt").write_text("")
+    index.invalidate("b.txt")
+    index.refresh(full=False)
+    assert _paths(index) == ["a.txt", "b.txt"]
+
+    release.set()
+    thread.join(5)
+    assert not thread.is_alive()
+    # the directories refreshed meanwhile are refreshed again
+    assert index.dirty
+    index.refresh(full=False)
+    assert _paths(index) == ["a.txt", "b.txt"]
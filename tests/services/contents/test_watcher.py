@@ -0,0 +1,111 @@
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+import tornado
+
+from jupyter_server.services.contents.manager import ContentsManager
+from jupyter_server.services.contents.watcher import ContentsWatcher
+
+from ...utils import expected_http_error
+
+
+async def _next_changes(queue):
+    return [
+        (change["type"], change["path"], change.get("old_path"))
+        for change in await asyncio.wait_for(queue.get(), 10)
+    ]
+
+
+@pytest.mark.parametrize(
+    "use_inotify",
+    [
+        pytest.param(
+            True,
+            marks=pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify"),
+        ),
+        False,
+    ],
+)
+async def test_watcher(tmp_path, use_inotify):
+    watcher = ContentsWatcher(
+        str(tmp_path),
+        include=lambda name: not name.startswith("."),
+        debounce=0.05,
+        # long enough for the bursts below to happen between two listings
+        poll_interval=0.5,
+        use_inotify=use_inotify,
+    )
+    d = tmp_path / "d"
+    d.mkdir()
+    (d / "a.txt").write_text("a")
+    queue: asyncio.Queue = asyncio.Queue()
+    watcher.watch("d", queue.put_nowait)
+    assert watcher.uses_inotify == use_inotify
+    # the first listing of the directory
+    await asyncio.sleep(0.2)
+
+    (d / "b.txt").write_text("b")
+    assert await _next_changes(queue) == [("created", "d/b.txt", None)]
+
+    (d / "a.txt").write_text("aa")
+    assert await _next_changes(queue) == [("modified", "d/a.txt", None)]
+
+    os.rename(d / "b.txt", d / "c.txt")
+    if use_inotify:
+        assert await _next_changes(queue) == [("renamed", "d/c.txt", "d/b.txt")]
+    else:
+        assert sorted(await _next_changes(queue)) == [
+            ("created", "d/c.txt", None),
+            ("deleted", "d/b.txt", None),
+        ]
+
+    # bursts are coalesced, and excluded entries are not reported
+    for i in range(20):
+        (d / "a.txt").write_text("a" * i)
+        (d / ".hidden").write_text("a" * i)
+    (d / "tmp").write_text("")
+    (d / "tmp").unlink()
+    assert await _next_changes(queue) == [("modified", "d/a.txt", None)]
+
+    watcher.unwatch("d", queue.put_nowait)
+    (d / "c.txt").unlink()
+    await asyncio.sleep(0.7)
+    assert queue.empty()
+    watcher.stop()
+
+
+async def test_watch_websocket(jp_ws_fetch, jp_serverapp, jp_root_dir):
+    jp_serverapp.contents_manager.watch_debounce = 0.05
+    jp_serverapp.contents_manager.watch_poll_interval = 0.05
+    (jp_root_dir / "sub").mkdir()
+    ws = await jp_ws_fetch("api", "watch")
+
+    async def read():
+        return json.loads(await asyncio.wait_for(ws.read_message(), 10))
+
+    await ws.write_message(json.dumps({"watch": "sub"}))
+    assert await read() == {"watch": "sub"}
+    # the first listing of the directory, when it is polled
+    await asyncio.sleep(0.2)
+
+    (jp_root_dir / "sub" / "new.txt").write_text("x")
+    assert await read() == {"changes": [{"type": "created", "path": "sub/new.txt"}]}
+
+    await ws.write_message(json.dumps({"watch": "missing"}))
+    message = await read()
+    assert message["path"] == "missing"
+    assert "does not exist" in message["error"]
+
+    await ws.write_message("not json")
+    assert "error" in await read()
+    ws.close()
+
+
+async def test_watch_websocket_not_supported(jp_ws_fetch, jp_serverapp, monkeypatch):
+    monkeypatch.setitem(jp_serverapp.web_app.settings, "contents_manager", ContentsManager())
+    with pytest.raises(tornado.httpclient.HTTPClientError) as e:
+        await jp_ws_fetch("api", "watch")
+    assert expected_http_error(e, 400)
@@ -0,0 +1,103 @@
+import json
+import uuid
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from jupyter_client.kernelspec import NATIVE_KERNEL_NAME
+from traitlets.config import Config
+
+from jupyter_server.prometheus.metrics import KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL
+from jupyter_server.services.kernels.connection.compression import CompressingWriter
+
+
+@pytest.fixture
+def jp_server_config():
+    return Config(
+        {
+            "ServerApp": {"websocket_compression_options": {}},
+            "ZMQChannelsWebsocketConnection": {
+                "compression_min_size": 100,
+                "compression_rules": {"iopub.status": False, "control": False},
+                "compression_thread_size": 1000,
+            },
+        }
+    )
+
+
+def _request(msg_type, content):
+    msg_id = uuid.uuid4().hex
+    return {
+        "header": {
+            "msg_id": msg_id,
+            "msg_type": msg_type,
+            "username": "",
+            "session": "test",
+            "date": "",
+            "version": "5.3",
+        },
+        "parent_header": {},
+        "metadata": {},
+        "content": content,
+        "buffers": [],
+        "channel": "shell",
+    }
+
+
+async def test_compression_rules(jp_fetch, jp_ws_fetch):
+    r = await jp_fetch(
+        "api", "kernels", method="POST", body=json.dumps({"name": NATIVE_KERNEL_NAME})
+    )
+    kid = json.loads(r.body.decode())["id"]
+    ws = await jp_ws_fetch("api", "kernels", kid, "channels", compression_options={})
+    compressed_before = KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL.labels(
+        stage="compressed"
+    )._value.get()
+
+    # record the messages the client had to decompress
+    decompressor = ws.protocol._decompressor
+    decompressed = []
+    decompress = decompressor.decompress
+
+    def record(data, *args):
+        result = decompress(data, *args)
+        decompressed.append(result)
+        return result
+
+    decompressor.decompress = record
+
+    request = _request("execute_request", {"code": "print('x' * 5000); print('y' * 500)"})
+    await ws.write_message(json.dumps(request))
+    received = []
+    while True:
+        message = await ws.read_message()
+        msg = json.loads(message)
+        received.append((message, msg))
+        if (
+            msg["msg_type"] == "status"
+            and msg["parent_header"].get("msg_id") == request["header"]["msg_id"]
+            and msg["content"]["execution_state"] == "idle"
+        ):
+            break
+    ws.close()
+
+    texts = "".join(msg["content"]["text"] for _, msg in received if msg["msg_type"] == "stream")
+    assert texts == "x" * 5000 + "\n" + "y" * 500 + "\n"
+    for message, msg in received:
+        compressed = message.encode() in decompressed
+        assert compressed == (msg["msg_type"] != "status"), msg["msg_type"]
+    compressed_after = KERNEL_WEBSOCKET_COMPRESSION_BYTES_TOTAL.labels(
+        stage="compressed"
+    )._value.get()
+    assert compressed_after > compressed_before
+
+
+def test_fallback_without_protocol_attributes():
+    # a websocket protocol negotiating compression, without the private write methods
+    handler = MagicMock()
+    handler.ws_connection = SimpleNamespace(_compressor=object(), is_closing=lambda: False)
+    writer = CompressingWriter(handler, min_size=10)
+    for message in ["x" * 100, "y"]:
+        assert writer.write(message, compress=True) is handler.write_message.return_value
+    assert [call.args[0] for call in handler.write_message.call_args_list] == ["x" * 100, "y"]
+    assert writer.bytes_in == writer.bytes_out == 0
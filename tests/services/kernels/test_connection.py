@@ -12,6 +12,10 @@ from tornado.httpserver import HTTPRequest
 from zmq.eventloop.zmqstream import ZMQStream
 
 from jupyter_server.serverapp import ServerApp
+from jupyter_server.services.kernels.connection.base import (
+    deserialize_binary_message,
+    deserialize_msg_from_ws_v1,
+)
 from jupyter_server.services.kernels.connection.channels import ZMQChannelsWebsocketConnection
 from jupyter_server.services.kernels.websocket import KernelWebsocketHandler
 
@@ -259,3 +263,299 @@ async def test_disconnect_resolves_orphaned_kernel_info_future(jp_serverapp: Ser
     conn2.session.key = kernel.session.key
     conn2.kernel_info_timeout = 0.2
     await asyncio.wait_for(asyncio.wrap_future(conn2.request_kernel_info()), timeout=1.0)
+
+
+async def test_replay_reports_dropped_messages(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    km = app.kernel_manager
+    km.buffer_max_messages = 2
+    kernel_id = await km.start_kernel()
+    kernel = km.get_kernel(kernel_id)
+    session: Session = kernel.session
+
+    conn1 = _make_connection(app, kernel, session_id="buffered-session")
+    conn1.create_stream()
+    conn1.session_key = f"{kernel_id}:buffered-session"
+    ZMQChannelsWebsocketConnection._open_sockets.add(conn1)
+    km._kernel_connections[kernel_id] = 1
+    conn1.disconnect()
+    buffer = km._kernel_buffers[kernel_id]["buffer"]
+    request = session.msg("execute_request")
+    for i in range(5):
+        msg = session.msg("stream", {"name": "stdout", "text": str(i)}, parent=request)
+        buffer.append(("iopub", session.serialize(msg)))
+    assert len(buffer) == 2
+
+    conn2 = _make_connection(app, kernel, session_id="buffered-session", timeout=5)
+    conn2.session.key = session.key
+    conn2.session_key = conn1.session_key
+    with (
+        patch.object(conn2, "handle_outgoing_message") as outgoing,
+        patch.object(conn2, "write_stderr") as write_stderr,
+    ):
+        await conn2.connect()
+        await asyncio.sleep(0)
+    assert outgoing.call_count >= 2
+    write_stderr.assert_called_once()
+    text, parent = write_stderr.call_args.args
+    assert text.startswith("3 messages")
+    assert parent["msg_id"] == request["header"]["msg_id"]
+    assert len(buffer) == 0
+    conn2.disconnect()
+
+
+async def test_legacy_messages_are_spliced(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    conn = _make_connection(app, kernel)
+    conn.session.key = session.key
+    app.kernel_manager.allow_tracebacks = False
+    stream = MagicMock(channel="iopub")
+    stream.closed.return_value = False
+    parent = session.msg("execute_request", {"code": "1"})
+    messages = [
+        session.msg("stream", {"name": "stdout", "text": "é"}, parent=parent),
+        session.msg("comm_msg", {"data": {}}, parent=parent, metadata={"a": 1}),
+        session.msg("error", {"ename": "E", "evalue": "v", "traceback": ["t"]}, parent=parent),
+    ]
+    buffers = {1: [b"abc", b"defgh"]}
+    with (
+        patch.object(conn.websocket_handler, "write_message") as write_message,
+        patch.object(conn.session, "deserialize") as deserialize,
+    ):
+        for i, msg in enumerate(messages):
+            conn.handle_outgoing_message(
+                stream,
+                session.serialize(msg) + buffers.get(i, []),  # type:ignore[operator]
+            )
+    deserialize.assert_not_called()
+    assert write_message.call_count == len(messages)
+
+    for i, (msg, call) in enumerate(zip(messages, write_message.call_args_list, strict=True)):
+        frame = call.args[0]
+        assert isinstance(frame, bytes)
+        assert call.kwargs["binary"] == (i in buffers)
+        if i in buffers:
+            sent = deserialize_binary_message(frame)
+            assert [bytes(buf) for buf in sent["buffers"]] == buffers[i]
+        else:
+            sent = json.loads(frame)
+            assert sent["buffers"] == []
+        assert sent["channel"] == "iopub"
+        assert sent["msg_id"] == msg["header"]["msg_id"]
+        assert sent["msg_type"] == msg["header"]["msg_type"]
+        assert sent["parent_header"]["msg_id"] == parent["header"]["msg_id"]
+        assert sent["metadata"] == msg["metadata"]
+        if msg["msg_type"] == "error":
+            # the traceback is scrubbed
+            assert sent["content"]["evalue"] == "Execution error"
+        else:
+            assert sent["content"] == msg["content"]
+
+
+async def test_legacy_messages_from_other_protocol_versions_are_adapted(
+    jp_serverapp: ServerApp,
+) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    conn = _make_connection(app, kernel)
+    conn.session.key = session.key
+    stream = MagicMock(channel="iopub")
+    stream.closed.return_value = False
+    msg = session.msg("pyout", {"data": {}, "execution_count": 1})
+    msg["header"]["version"] = "4.1"
+    with patch.object(conn.websocket_handler, "write_message") as write_message:
+        conn.handle_outgoing_message(stream, session.serialize(msg))
+    frame = write_message.call_args.args[0]
+    assert json.loads(frame)["msg_type"] == "execute_result"
+
+
+@pytest.mark.parametrize("version", [None, "4.1"])
+async def test_legacy_messages_with_bad_signatures_are_refused(
+    jp_serverapp: ServerApp, version
+) -> None:
+    # the message is either peeked at, or deserialized by the session for another version
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    conn = _make_connection(app, kernel)
+    conn.session.key = session.key
+    stream = MagicMock(channel="iopub")
+    stream.closed.return_value = False
+
+    def serialize():
+        if version is None:
+            return session.serialize(session.msg("stream", {"name": "stdout", "text": "x"}))
+        msg = session.msg("pyout", {"data": {}, "execution_count": 1})
+        msg["header"]["version"] = version
+        return session.serialize(msg)
+
+    msg_list = serialize()
+    with patch.object(conn.websocket_handler, "write_message") as write_message:
+        conn.handle_outgoing_message(stream, msg_list)
+        with pytest.raises(ValueError, match="Duplicate Signature"):
+            conn.handle_outgoing_message(stream, msg_list)
+
+        msg_list = serialize()
+        msg_list[-1] = session.pack({"tampered": True})
+        with pytest.raises(ValueError, match="Invalid Signature"):
+            conn.handle_outgoing_message(stream, msg_list)
+    assert write_message.call_count == 1
+
+
+@pytest.mark.parametrize("subprotocol", [None, "v1.kernel.websocket.jupyter.org"])
+async def test_stream_messages_are_coalesced(jp_serverapp: ServerApp, subprotocol) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    conn = _make_connection(app, kernel)
+    conn.session.key = session.key
+    conn.websocket_handler.ws_connection.selected_subprotocol = subprotocol
+    conn.stream_coalesce_window = 0.05
+    conn.stream_coalesce_max_bytes = 20
+    stream = MagicMock(channel="iopub")
+    stream.closed.return_value = False
+    parent = session.msg("execute_request", {"code": "1"})
+
+    def send(msg_type, content):
+        msg = session.msg(msg_type, content, parent=parent)
+        conn.handle_outgoing_message(stream, session.serialize(msg))
+
+    def sent(call):
+        frame = call.args[0]
+        if subprotocol:
+            parts = deserialize_msg_from_ws_v1(frame)[1]
+            return session.unpack(parts[0])["msg_type"], session.unpack(parts[3])
+        msg = json.loads(frame)
+        return msg["msg_type"], msg["content"]
+
+    with patch.object(conn.websocket_handler, "write_message") as write_message:
+        for i in range(5):
+            send("stream", {"name": "stdout", "text": str(i)})
+        send("stream", {"name": "stderr", "text": "e"})
+        send("execute_result", {"data": {}, "execution_count": 1, "metadata": {}})
+        # the merged text reaches stream_coalesce_max_bytes
+        for _ in range(3):
+            send("stream", {"name": "stdout", "text": "x" * 10})
+        send("stream", {"name": "stdout", "text": "y"})
+        assert [sent(call) for call in write_message.call_args_list] == [
+            ("stream", {"name": "stdout", "text": "01234"}),
+            ("stream", {"name": "stderr", "text": "e"}),
+            ("execute_result", {"data": {}, "execution_count": 1, "metadata": {}}),
+            ("stream", {"name": "stdout", "text": "x" * 20}),
+        ]
+        # the end of the window
+        await asyncio.sleep(0.1)
+        assert write_message.call_count == 5
+        assert sent(write_message.call_args_list[4]) == (
+            "stream",
+            {"name": "stdout", "text": "x" * 10 + "y"},
+        )
+
+
+async def test_send_queue_backpressure(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    conn = _make_connection(app, kernel)
+    conn.session.key = session.key
+    conn.send_queue_max_bytes = 1000
+    streams = {}
+    for name in ("shell", "iopub"):
+        streams[name] = MagicMock(channel=name)
+        streams[name].closed.return_value = False
+    conn.channels = streams
+    parent = session.msg("execute_request", {"code": "1"})
+    loop = asyncio.get_running_loop()
+    writes = []
+
+    def write_message(message, binary=False):
+        writes.append((message, loop.create_future()))
+        return writes[-1][1]
+
+    def send(channel, msg_type, content):
+        msg = session.msg(msg_type, content, parent=parent)
+        conn.handle_outgoing_message(streams[channel], session.serialize(msg))
+
+    with patch.object(conn.websocket_handler, "write_message", side_effect=write_message):
+        send("iopub", "stream", {"name": "stdout", "text": "x" * 2000})
+        # the client is slow
+        assert conn._send_queue_full
+        streams["shell"].stop_on_recv.assert_called_once()
+        streams["iopub"].stop_on_recv.assert_not_called()
+        send("iopub", "stream", {"name": "stdout", "text": "dropped"})
+        send("iopub", "status", {"execution_state": "idle"})
+        send("shell", "execute_reply", {"status": "ok"})
+        assert [json.loads(message)["msg_type"] for message, _ in writes] == [
+            "stream",
+            "status",
+            "execute_reply",
+        ]
+
+        # the messages are written
+        for _, future in writes:
+            future.set_result(None)
+        await asyncio.sleep(0)
+        assert not conn._send_queue_full
+        streams["shell"].on_recv_stream.assert_called_once_with(conn.handle_outgoing_message)
+        notice = json.loads(writes[-1][0])
+        assert notice["content"]["text"].startswith("1 output messages")
+        assert notice["parent_header"]["msg_id"] == parent["header"]["msg_id"]
+
+
+async def test_send_queue_counts_bytes(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    conn = _make_connection(app, kernel)
+    conn.send_queue_max_bytes = 1000
+    conn.channels = {"shell": MagicMock(channel="shell")}
+    future = asyncio.get_running_loop().create_future()
+    with patch.object(conn.websocket_handler, "write_message", return_value=future):
+        # 600 characters, encoded to 1200 bytes
+        conn._write_message("é" * 600)
+    assert conn._send_queue_bytes == 1200
+    assert conn._send_queue_full
+    future.set_result(None)
+    await asyncio.sleep(0)
+    assert conn._send_queue_bytes == 0
+
+
+async def test_held_stream_messages_are_buffered_on_disconnect(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    km = app.kernel_manager
+    kernel_id = await km.start_kernel()
+    kernel = km.get_kernel(kernel_id)
+    session: Session = kernel.session
+
+    conn = _make_connection(app, kernel, session_id="held-session")
+    conn.session.key = session.key
+    conn.stream_coalesce_window = 10
+    conn.create_stream()
+    conn.session_key = f"{kernel_id}:held-session"
+    ZMQChannelsWebsocketConnection._open_sockets.add(conn)
+    km._kernel_connections[kernel_id] = 1
+    parent = session.msg("execute_request")
+    with patch.object(conn.websocket_handler, "write_message") as write_message:
+        for i in range(3):
+            msg = session.msg("stream", {"name": "stdout", "text": str(i)}, parent=parent)
+            conn.handle_outgoing_message("iopub", session.serialize(msg))
+    write_message.assert_not_called()
+    conn.disconnect()
+
+    buffer = km._kernel_buffers[kernel_id]["buffer"]
+    [(channel, msg_list)] = list(buffer)
+    assert channel == "iopub"
+    # a signed message, with the text of the three
+    msg = Session(key=session.key).deserialize(session.feed_identities(msg_list)[1])
+    assert msg["msg_type"] == "stream"
+    assert msg["content"]["text"] == "012"
+    assert msg["parent_header"]["msg_id"] == parent["header"]["msg_id"]
+    km.stop_buffering(kernel_id)
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+import zmq
+from jupyter_client.session import Session
+from zmq.eventloop.zmqstream import ZMQStream
+
+from jupyter_server.serverapp import ServerApp
+from jupyter_server.services.kernels.iopub import IOPubMultiplexer
+
+
+@pytest.fixture
+def publisher():
+    context = zmq.Context.instance()
+    pub = context.socket(zmq.PUB)
+    port = pub.bind_to_random_port("tcp://127.0.0.1")
+    connected = []
+
+    def connect():
+        sub = context.socket(zmq.SUB)
+        sub.setsockopt(zmq.SUBSCRIBE, b"")
+        sub.connect(f"tcp://127.0.0.1:{port}")
+        connected.append(sub)
+        return ZMQStream(sub)
+
+    yield pub, connect, connected
+    pub.close(linger=0)
+
+
+async def _publish(pub, session, received, count):
+    """Publish messages until the subscription is established and count are received."""
+    for _ in range(200):
+        session.send(pub, "status", {"execution_state": "idle"})
+        await asyncio.sleep(0.01)
+        if all(len(r) >= count for r in received):
+            return
+    raise AssertionError("messages not received")
+
+
+async def test_iopub_multiplexer(publisher):
+    pub, connect, connected = publisher
+    session = Session()
+    multiplexer = IOPubMultiplexer(connect)
+    first, second, failing = multiplexer.channel(), multiplexer.channel(), multiplexer.channel()
+    received_first: list = []
+    received_second: list = []
+
+    def fail(msg_list):
+        raise ValueError
+
+    first.on_recv(received_first.append)
+    second.on_recv_stream(lambda stream, msg_list: received_second.append((stream, msg_list)))
+    failing.on_recv(fail)
+    assert multiplexer.clients == 3
+    await _publish(pub, session, [received_first, received_second], 1)
+    # one subscription for all the clients, which get the same frames
+    assert len(connected) == 1
+    assert received_second[-1][0] is second
+    assert received_second[-1][1] is received_first[-1]
+
+    second.stop_on_recv()
+    count = len(received_second)
+    await _publish(pub, session, [received_first], len(received_first) + 1)
+    assert len(received_second) == count
+    second.close()
+    assert second.closed()
+    with pytest.raises(OSError):
+        second.on_recv(received_second.append)
+
+    multiplexer.reconnect()
+    assert len(connected) == 2
+    assert connected[0].closed
+    await _publish(pub, session, [received_first], len(received_first) + 1)
+
+    multiplexer.close()
+    assert first.closed()
+    assert connected[1].closed
+    assert multiplexer.clients == 0
+
+
+async def test_shared_iopub(jp_serverapp: ServerApp) -> None:
+    km = jp_serverapp.kernel_manager
+    kernel_id = await km.start_kernel()
+    kernel = km.get_kernel(kernel_id)
+    await asyncio.sleep(1)
+    multiplexer = km._iopub_multiplexers[kernel_id]
+    # the activity of the kernel is tracked on the shared subscription
+    assert kernel._activity_stream._multiplexer is multiplexer
+
+    channels = [km.connect_shared_iopub(kernel_id) for _ in range(3)]
+    received: list[list] = [[] for _ in channels]
+    for channel, messages in zip(channels, received, strict=True):
+        channel.on_recv(messages.append)
+    assert multiplexer.clients == 4
+    client = kernel.client()
+    client.kernel_info()
+    for _ in range(100):
+        if all(received):
+            break
+        await asyncio.sleep(0.05)
+    client.stop_channels()
+    assert all(messages == received[0] for messages in received)
+
+    await km.shutdown_kernel(kernel_id)
+    assert kernel_id not in km._iopub_multiplexers
+    assert all(channel.closed() for channel in channels)
@@ -0,0 +1,120 @@
+import json
+
+from jupyter_client.session import Session
+
+from jupyter_server.services.kernels.messagebuffer import MessageBuffer
+
+
+def _msg(session, msg_type, content=None, parent=None):
+    msg = session.msg(msg_type, content=content or {}, parent=parent or {})
+    return "iopub", session.serialize(msg)
+
+
+def _types(buffer):
+    return [json.loads(parts[2])["msg_type"] for _, parts in buffer]
+
+
+def test_message_buffer_limits():
+    session = Session()
+    buffer = MessageBuffer(max_messages=3, unpack=session.unpack)
+    request = session.msg("execute_request")
+    buffer.append(_msg(session, "status", {"execution_state": "busy"}, request))
+    for i in range(3):
+        buffer.append(_msg(session, "stream", {"name": "stdout", "text": str(i)}, request))
+    buffer.append(_msg(session, "status", {"execution_state": "idle"}, request))
+    # the oldest outputs are dropped first
+    assert _types(buffer) == ["status", "stream", "status"]
+    assert buffer.dropped == 2
+    assert list(buffer.dropped_parents) == [request["header"]["msg_id"]]
+    assert buffer.dropped_parents[request["header"]["msg_id"]][1] == 2
+
+    # then the oldest messages
+    buffer.append(_msg(session, "status", {"execution_state": "busy"}))
+    buffer.append(_msg(session, "status", {"execution_state": "idle"}))
+    assert len(buffer) == 3
+    assert buffer.dropped == 4
+    assert buffer.dropped_parents[""][1] == 1
+
+    size = buffer.nbytes
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.nbytes == 0
+    assert size > 0
+
+    # messages larger than the buffer are dropped when they arrive
+    buffer = MessageBuffer(max_bytes=1000, unpack=session.unpack)
+    buffer.append(_msg(session, "status", {"execution_state": "busy"}))
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "x" * 1000}, request))
+    assert _types(buffer) == ["status"]
+    assert buffer.dropped == 1
+
+
+def test_message_buffer_coalesce():
+    session = Session()
+    buffer = MessageBuffer(unpack=session.unpack)
+    first = session.msg("execute_request")
+    second = session.msg("execute_request")
+    display = {"data": {"text/plain": "0"}, "metadata": {}, "transient": {"display_id": "d"}}
+    buffer.append(_msg(session, "display_data", display, first))
+    for i in range(5):
+        display = {"data": {"text/plain": str(i)}, "metadata": {}, "transient": {"display_id": "d"}}
+        buffer.append(_msg(session, "update_display_data", display, second))
+        buffer.append(_msg(session, "stream", {"name": "stdout", "text": str(i)}, second))
+        buffer.append(_msg(session, "clear_output", {"wait": True}, second))
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "last"}, second))
+
+    # only the last update of the display, and the outputs after the last clear, are kept
+    assert _types(buffer) == ["display_data", "update_display_data", "clear_output", "stream"]
+    replayed = [session.deserialize(session.feed_identities(parts)[1]) for _, parts in buffer]
+    assert replayed[1]["content"]["data"] == {"text/plain": "4"}
+    assert replayed[3]["content"]["text"] == "last"
+    # nothing a frontend would show was lost
+    assert buffer.dropped == 0
+
+
+def test_message_buffer_clear_output_wait():
+    session = Session()
+    buffer = MessageBuffer(unpack=session.unpack)
+    first = session.msg("execute_request")
+    second = session.msg("execute_request")
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "a"}, first))
+    buffer.append(_msg(session, "clear_output", {"wait": True}, first))
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "b"}, second))
+    buffer.append(_msg(session, "status", {"execution_state": "idle"}, first))
+    # the outputs stay shown until the next output of the same request
+    assert _types(buffer) == ["stream", "clear_output", "stream", "status"]
+
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "c"}, first))
+    assert _types(buffer) == ["clear_output", "stream", "status", "stream"]
+    buffer.append(_msg(session, "stream", {"name": "stdout", "text": "d"}, first))
+    assert len(buffer) == 5
+
+    # without wait, the outputs are cleared right away
+    buffer.append(_msg(session, "clear_output", {"wait": False}, second))
+    assert _types(buffer) == ["clear_output", "status", "stream", "stream", "clear_output"]
+    assert buffer.dropped == 0
+
+
+def test_message_buffer_spill(tmp_path):
+    session = Session()
+    buffer = MessageBuffer(
+        max_messages=2, max_spill_bytes=10000, spill_dir=str(tmp_path), unpack=session.unpack
+    )
+    messages = [
+        _msg(session, "stream", {"name": "stdout", "text": str(i)}, session.msg("execute_request"))
+        for i in range(50)
+    ]
+    for message in messages:
+        buffer.append(message)
+    assert 0 < buffer.spilled_bytes <= 10000
+    spilled = len(buffer) - 2
+    assert 0 < spilled < 48
+    assert buffer.dropped == 50 - len(buffer)
+    # the spilled messages are replayed first, in order
+    replayed = list(buffer)
+    assert replayed == messages[:spilled] + messages[-2:]
+    assert list(buffer) == replayed
+
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.spilled_bytes == 0
@@ -0,0 +1,111 @@
+import time
+from unittest.mock import MagicMock, patch
+
+from jupyter_client.session import Session
+
+from jupyter_server.serverapp import ServerApp
+from jupyter_server.services.kernels.connection.channels import ZMQChannelsWebsocketConnection
+from jupyter_server.services.kernels.ratelimit import RateLimiter
+
+from .test_connection import _make_connection
+
+
+def test_rate_limiter_window():
+    limiter = RateLimiter(msg_rate_limit=2, data_rate_limit=100, window=1)
+    assert limiter.consume(10, 0.0)
+    assert limiter.consume(10, 0.1)
+    # a third message in the window exceeds 2 msgs/sec, and is not counted
+    assert not limiter.consume(10, 0.2)
+    assert limiter.msgs_exceeded
+    # the first message left the window, but 2 messages are above 80% of the limit
+    assert not limiter.consume(10, 1.0)
+    # both left the window
+    assert limiter.consume(10, 1.5)
+    assert not limiter.msgs_exceeded
+
+    assert not limiter.consume(200, 1.6)
+    assert limiter.data_exceeded
+    assert not limiter.msgs_exceeded
+    limiter.reset()
+    assert not limiter.data_exceeded
+    assert limiter.consume(50, 1.7)
+
+
+def test_rate_limiter_without_limits():
+    limiter = RateLimiter()
+    assert all(limiter.consume(1000, i) for i in range(1000))
+
+
+def test_rate_limiter_output_storm():
+    """A million messages in 10 seconds go through in linear time."""
+    limiter = RateLimiter(msg_rate_limit=1000, data_rate_limit=1000000, window=3)
+    messages = 10**6
+    start = time.perf_counter()
+    sent = sum(limiter.consume(100, i * 1e-5) for i in range(messages))
+    elapsed = time.perf_counter() - start
+    # at most 1000 msgs/sec over the 10 seconds, plus a window's worth
+    assert 0 < sent <= 13000
+    assert elapsed < 10
+
+    # with no limit, the window holds all the messages, and they leave it in bulk
+    limiter = RateLimiter(window=3)
+    start = time.perf_counter()
+    assert sum(limiter.consume(100, i * 1e-5) for i in range(messages)) == messages
+    assert time.perf_counter() - start < 10
+
+
+async def test_rate_limit_scopes(jp_serverapp: ServerApp) -> None:
+    app = jp_serverapp
+    kernel_id = await app.kernel_manager.start_kernel()
+    kernel = app.kernel_manager.get_kernel(kernel_id)
+    session: Session = kernel.session
+    parent = session.msg("execute_request")
+
+    def stream_message():
+        msg = session.msg("stream", {"name": "stdout", "text": "x"}, parent=parent)
+        return session.feed_identities(session.serialize(msg))[1][1:]
+
+    def limited(conn, msg_list=None):
+        msg = {"header": None, "parent_header": None, "content": None}
+        return conn._limit_rate("iopub", msg, list(msg_list or stream_message()))
+
+    connections = []
+    for scope in ("connection", "kernel", "user"):
+        conns = [_make_connection(app, kernel) for _ in range(2)]
+        for conn in conns:
+            conn.rate_limit_scope = scope
+            conn.iopub_msg_rate_limit = 1
+            conn.rate_limit_window = 2
+            conn.websocket_handler.current_user = MagicMock(username="someone")
+        connections.append(conns)
+        with patch.object(ZMQChannelsWebsocketConnection, "write_stderr") as write_stderr:
+            assert not limited(conns[0])
+            assert not limited(conns[0])
+            assert limited(conns[0])
+            # the second connection has its own budget, or shares the first's
+            assert limited(conns[1]) == (scope != "connection")
+        assert write_stderr.call_count == (1 if scope == "connection" else 2)
+        shared = conns[0]._get_rate_limiter() is conns[1]._get_rate_limiter()
+        assert shared == (scope != "connection")
+
+    # each message of the kernel is sent to both connections, and counted once
+    # not the limiter of the connections above
+    ZMQChannelsWebsocketConnection._rate_limiters.clear()
+    conns = [_make_connection(app, kernel) for _ in range(2)]
+    for conn in conns:
+        conn.rate_limit_scope = "kernel"
+        conn.iopub_msg_rate_limit = 1
+        conn.rate_limit_window = 2
+    with patch.object(ZMQChannelsWebsocketConnection, "write_stderr"):
+        decisions = []
+        for _ in range(3):
+            msg_list = stream_message()
+            decisions.append([limited(conn, msg_list) for conn in conns])
+    assert decisions == [[False, False], [False, False], [True, True]]
+
+    # the idle status of the kernel resets the limits of the connection
+    conn = connections[0][0]
+    idle = session.serialize(session.msg("status", {"execution_state": "idle"}))
+    msg = {"header": None, "parent_header": None, "content": None}
+    assert not conn._limit_rate("iopub", msg, session.feed_identities(idle)[1][1:])
+    assert not limited(conn)
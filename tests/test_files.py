@@ -1,5 +1,6 @@
 import json
 import os
+import time
 from pathlib import Path
 from unittest.mock import patch
 
@@ -8,6 +9,8 @@ from nbformat import writes
 from nbformat.v4 import new_code_cell, new_markdown_cell, new_notebook, new_output
 from tornado.httpclient import HTTPClientError
 
+from jupyter_server.files.handlers import FilesHandler
+
 from .utils import expected_http_error
 
 
@@ -143,6 +146,56 @@ async def test_contents_manager(jp_fetch, jp_serverapp, jp_root_dir):
     assert r.body.decode() == "foobar"
 
 
+async def test_range_and_etag(jp_fetch, jp_serverapp, jp_root_dir):
+    data = os.urandom(200 * 1024)
+    path = jp_root_dir.joinpath("test.bin")
+    path.write_bytes(data)
+    # files modified too recently have no ETag
+    r = await jp_fetch("files/test.bin", method="GET")
+    assert "Etag" not in r.headers
+    mtime = time.time() - 10
+    os.utime(path, (mtime, mtime))
+
+    r = await jp_fetch("files/test.bin", method="GET")
+    assert r.code == 200
+    assert r.body == data
+    assert int(r.headers["Content-Length"]) == len(data)
+
+    r = await jp_fetch("files/test.bin", method="GET", headers={"Range": "bytes=100-199"})
+    assert r.code == 206
+    assert r.body == data[100:200]
+    assert r.headers["Content-Range"] == f"bytes 100-199/{len(data)}"
+
+    if jp_serverapp.contents_manager.files_handler_class is not FilesHandler:
+        # AuthenticatedFileHandler computes no ETag
+        assert "Etag" not in r.headers
+        return
+    etag = r.headers["Etag"]
+    r = await jp_fetch(
+        "files/test.bin", method="GET", headers={"If-None-Match": etag}, raise_error=False
+    )
+    assert r.code == 304
+    assert r.body == b""
+
+    path.write_bytes(data + b"more")
+    r = await jp_fetch("files/test.bin", method="GET", headers={"If-None-Match": etag})
+    assert r.code == 200
+    assert r.body == data + b"more"
+
+
+async def test_streamed_content_type(jp_fetch, jp_serverapp, jp_root_dir):
+    if jp_serverapp.contents_manager.files_handler_class is not FilesHandler:
+        pytest.skip("only FilesHandler sniffs the content of extension-less files")
+    jp_root_dir.joinpath("noext").write_text("plain text")
+    jp_root_dir.joinpath("noext.bin2").write_bytes(b"\xff\xfe" + os.urandom(10))
+
+    r = await jp_fetch("files/noext", method="GET")
+    assert r.headers["content-type"] == "text/plain; charset=UTF-8"
+
+    r = await jp_fetch("files/noext.bin2", method="GET")
+    assert r.headers["content-type"] == "application/octet-stream"
+
+
 async def test_save_hooks(jp_fetch, jp_serverapp):
     # define a first pre-save hook that will change the content of the file before saving
     def pre_save_hook1(model, **kwargs):
@@ -0,0 +1,68 @@
+"""Test the configurable JSON backend"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+import nbformat
+import pytest
+from nbformat.v4 import new_code_cell, new_notebook
+
+from jupyter_server import jsonutil
+from jupyter_server.serverapp import ServerApp
+
+
+@pytest.fixture(params=jsonutil.JSON_BACKENDS)
+def json_backend(request):
+    if request.param != "json":
+        pytest.importorskip(request.param)
+    jsonutil.set_json_backend(request.param)
+    yield request.param
+    jsonutil.set_json_backend("json")
+
+
+def test_dumps(json_backend):
+    obj = {
+        "utc": datetime(2024, 1, 2, 3, 4, 5, 6, tzinfo=timezone.utc),
+        "offset": datetime(2024, 1, 2, tzinfo=timezone(timedelta(hours=2))),
+        "bytes": b"\x00\xff",
+        "set": {1},
+        "tuple": (1, "é"),
+        1: "int key",
+        "big": 2**70,
+    }
+    assert jsonutil.get_json_backend() == json_backend
+    assert json.loads(jsonutil.dumps(obj)) == {
+        "utc": "2024-01-02T03:04:05.000006Z",
+        "offset": "2024-01-02T00:00:00+02:00",
+        "bytes": "AP8=",
+        "set": [1],
+        "tuple": [1, "é"],
+        "1": "int key",
+        "big": 2**70,
+    }
+    with pytest.raises(TypeError):
+        jsonutil.dumps({"obj": object()})
+
+
+def test_loads(json_backend):
+    assert jsonutil.loads('{"a": [1, 2.5, "é", null]}') == {"a": [1, 2.5, "é", None]}
+    assert jsonutil.loads(b'{"a": 1}') == {"a": 1}
+    assert jsonutil.loads('{"a": NaN}')["a"] != 0
+    with pytest.raises(ValueError):
+        jsonutil.loads("{")
+
+
+def test_read_notebook(json_backend):
+    nb = new_notebook(cells=[new_code_cell("print('é')")])
+    text = nbformat.writes(nb)
+    assert nbformat.reads(text, as_version=4, cls=jsonutil.JSONDecoder) == nbformat.reads(
+        text, as_version=4
+    )
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        jsonutil.set_json_backend("yaml")
+    assert jsonutil.get_json_backend() == "json"
+    with pytest.raises(Exception, match="json_backend"):
+        ServerApp(json_backend="yaml")